@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+from common.geo import location_geohash
+
+
+def fill_geohash(apps, schema_editor):
+    Event = apps.get_model("broadcast_module", "Event")
+    rows = list(Event.objects.filter(location_lat__isnull=False, location_lng__isnull=False).only("location_lat", "location_lng"))
+    for row in rows:
+        row.geohash = location_geohash(row.location_lat, row.location_lng)
+    Event.objects.bulk_update(rows, ["geohash"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broadcast_module', '0007_media_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['geohash'], name='broadcast_event_geohash'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,14 @@
 import uuid
 from django.db import models
 from django.utils import timezone
+from common.choices import MediaStatus
+from common.geo import location_geohash
 from common.models import Sport
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
 from common.utils.validator_image import validate_image_size
 from django.db.models import Q
+from common.cache import bump_namespace
 
 class Event(models.Model):
     """
@@ -20,10 +23,13 @@ class Event(models.Model):
         sport (ForeignKey): The sport associated with the event.
         title (CharField): Title of the event.
         description (TextField): Description of the event.
+        image (CloudinaryField): Cover image of the event.
+        image_status (CharField): Upload state of ``image`` (see ``common.media``).
         is_pinned (BooleanField): Indicates if the event is pinned.
         location_name (CharField): Name of the event location.
         location_lat (DecimalField): Latitude of the event location.
         location_lng (DecimalField): Longitude of the event location.
+        geohash (CharField): Geohash of the event location, maintained by ``save`` (see ``common.geo``).
         start_time (DateTimeField): Start time of the event.
         end_time (DateTimeField): End time of the event.
         fee (BigIntegerField): Fee for attending the event.
@@ -31,9 +37,11 @@ class Event(models.Model):
         created_at (DateTimeField): Timestamp when the event was created.
         updated_at (DateTimeField): Timestamp when the event was last updated.
     Meta:
-        Ensures only one event can be pinned at a time using a unique constraint.
+        Ensures only one event can be pinned at a time using a unique constraint,
+        and indexes ``geohash`` for nearby-event queries.
     Methods:
-        save(): If the event is pinned, unpins all other events before saving.
+        save(): Updates ``geohash``; if the event is pinned, unpins all other events before saving, then invalidates cached event lists.
+        delete(): Deletes the event and invalidates cached event lists.
         __str__(): Returns the title of the event.
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -42,11 +50,13 @@ class Event(models.Model):
     author_avatar_url = models.TextField(blank=True, null=True)
     author_badges_url = models.TextField(blank=True, null=True)
     image = CloudinaryField("image", validators=[validate_image_size], null=True, blank=True)
+    image_status = models.CharField(max_length=10, choices=MediaStatus.choices, default=MediaStatus.READY)
     description = models.TextField(blank=True, null=True)
     is_pinned = models.BooleanField(default=False)
     location_name = models.CharField(max_length=120, blank=True, null=True)
     location_lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     location_lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField(null=True, blank=True)
     fee = models.BigIntegerField(null=True, blank=True)
@@ -59,6 +69,7 @@ class Event(models.Model):
         """
         Meta class for model constraints.
         This Meta class defines a unique constraint on the 'is_pinned' field, ensuring that only one instance can have 'is_pinned=True' at any given time. This is useful for scenarios where only one event or object should be marked as pinned.
+        It also indexes ``geohash`` for nearby-event queries.
         """
         constraints = [
             models.UniqueConstraint(
@@ -67,11 +78,28 @@ class Event(models.Model):
                 name='unique_pinned_event'
             )
         ]
+        indexes = [
+            models.Index(fields=['geohash'], name='broadcast_event_geohash'),
+        ]
 
     def save(self, *args, **kwargs):
         """
-        Overrides the save method to ensure only one event can be pinned at a time.
+        Overrides the save method to ensure only one event can be pinned at a time
+        and to invalidate cached event lists.
         """
+        self.geohash = location_geohash(self.location_lat, self.location_lng)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"location_lat", "location_lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
         if self.is_pinned:
             Event.objects.exclude(pk=self.pk).filter(is_pinned=True).update(is_pinned=False)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+        bump_namespace("events")
+
+    def delete(self, *args, **kwargs):
+        """
+        Overrides the delete method to invalidate cached event lists.
+        """
+        result = super().delete(*args, **kwargs)
+        bump_namespace("events")
+        return result
\ No newline at end of file
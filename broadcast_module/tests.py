@@ -1,9 +1,14 @@
+import tempfile
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from .models import Event
 from django.utils import timezone
 from profile_module.models import Profile
+from common.counters import flush_counters
+from common.media import process_pending_uploads
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 User = get_user_model()
 
@@ -33,6 +38,58 @@ class BroadcastModuleTests(TestCase):
 		response = self.client.post(reverse('broadcast_module:create'), self.event_data)
 		self.assertEqual(response.status_code, 401)
 
+	def test_api_create_event_image_uploaded_in_background(self):
+		# Gambar diunggah di background; status pending sampai job selesai
+		self.client.login(username='user1', password='testpass')
+		data = self.event_data.copy()
+		data['image'] = SimpleUploadedFile('event.png', b'png-bytes', content_type='image/png')
+		with tempfile.TemporaryDirectory() as tmp, self.settings(
+			MEDIA_BACKEND='common.media.LocalBackend', MEDIA_SPOOL_DIR=tmp, MEDIA_LOCAL_BACKEND_DIR=tmp, MEDIA_UPLOAD_WORKERS=0,
+		):
+			response = self.client.post(reverse('broadcast_module:api_create_event'), data)
+			self.assertEqual(response.status_code, 201)
+			self.assertEqual(response.json()['event']['image_status'], 'pending')
+
+			self.assertEqual(process_pending_uploads(), 1)
+		event = Event.objects.get(description='Test Event')
+		self.assertEqual(event.image_status, 'ready')
+		self.assertTrue(event.image)
+
+	def test_api_create_event_rejects_bad_base64_image(self):
+		# Gambar base64 yang rusak ditolak, bukan dibuang diam-diam
+		self.client.login(username='user1', password='testpass')
+		data = dict(self.event_data, image_data='data:image/png;base64,not*base64')
+		response = self.client.post(reverse('broadcast_module:api_create_event'), data, content_type='application/json')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.json()['error'], 'invalid_image')
+
+		data['image_data'] = 'no-data-uri-header'
+		response = self.client.post(reverse('broadcast_module:api_create_event'), data, content_type='application/json')
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(Event.objects.filter(description='Test Event').exists())
+
+	def test_api_nearby_events(self):
+		# Hanya event yang belum selesai dan berada dalam radius, urut dari yang terdekat
+		now = timezone.now()
+		def make(description, lat, lng, start):
+			return Event.objects.create(
+				user=self.user, description=description, location_name='Jakarta',
+				location_lat=lat, location_lng=lng, start_time=start, fee=0,
+			)
+		make('Dekat', '-6.180000', '106.830000', now + timezone.timedelta(days=1))
+		make('Agak jauh', '-6.200000', '106.845000', now + timezone.timedelta(days=2))
+		make('Bandung', '-6.917500', '107.619100', now + timezone.timedelta(days=1))
+		make('Sudah lewat', '-6.175400', '106.827200', now - timezone.timedelta(days=1))
+
+		url = reverse('broadcast_module:api_nearby_events')
+		data = self.client.get(url, {'lat': '-6.175392', 'lng': '106.827153', 'radius': '10'}).json()
+		self.assertEqual([e['description'] for e in data['results']], ['Dekat', 'Agak jauh'])
+		self.assertIn('distance_km', data['results'][0])
+		self.assertFalse(data['has_next'])
+
+		# Tanpa koordinat
+		self.assertEqual(self.client.get(url).status_code, 400)
+
 	def test_event_creation_missing_required(self):
 		self.client.login(username='user1', password='testpass')
 		data = self.event_data.copy()
@@ -125,6 +182,8 @@ class BroadcastModuleTests(TestCase):
 		old_clicks = event.total_click
 		resp = self.client.post(url)
 		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.json()['total_click'], old_clicks + 1)
+		flush_counters()
 		event.refresh_from_db()
 		# Check apakah total_click terupdate
 		self.assertEqual(event.total_click, old_clicks + 1)
@@ -202,3 +261,32 @@ class BroadcastModuleTests(TestCase):
 		response = self.client.post(reverse('broadcast_module:create'), data)
 		self.assertEqual(response.status_code, 200)
 
+
+
+class BroadcastCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='cacher', password='testpass')
+		self.url = reverse('broadcast_module:api_latest')
+
+	def _create_event(self, description):
+		return Event.objects.create(
+			user=self.user,
+			description=description,
+			start_time=timezone.now() + timezone.timedelta(days=1),
+		)
+
+	def test_latest_list_is_served_from_cache(self):
+		self._create_event('Cached Event')
+		self.client.get(self.url)
+
+		with self.assertNumQueries(0):
+			response = self.client.get(self.url)
+		self.assertEqual(response.json()['results'][0]['description'], 'Cached Event')
+
+	def test_saving_event_invalidates_cached_lists(self):
+		self.client.get(self.url)
+		self._create_event('Fresh Event')
+
+		response = self.client.get(self.url)
+		self.assertEqual([e['description'] for e in response.json()['results']], ['Fresh Event'])
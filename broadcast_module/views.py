@@ -1,5 +1,5 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
@@ -9,13 +9,52 @@ from .models import Event
 from .forms import EventForm
 from typing import Any
 from django.core.files.base import ContentFile
-import cloudinary.uploader
 import base64
+import logging
 import time
 from django.contrib.auth.models import User
-from profile_module.models import Follow
+from profile_module.selectors import suggested_accounts
 from feeds_module.models import Hashtag
+from common.cache import get_or_set
+from common.counters import increment, read_counters
+from common.geo import nearby, parse_point
+from common.media import enqueue_upload, validate_image
+from django.core.exceptions import ValidationError
 import json
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PAGE_SIZE = 10
+EVENTS_CACHE_TIMEOUT = 60
+
+
+def _upcoming_events():
+    """Events that have not ended yet (or, without an end time, not started yet)."""
+    now = timezone.now()
+    return Event.objects.filter(Q(end_time__gt=now) | (Q(end_time__isnull=True) & Q(start_time__gte=now)))
+
+
+def _get_events_page(ordering: str, page: Any) -> tuple[list, bool, int]:
+    """Return ``(events, has_next, num_pages)`` for one page of upcoming events.
+    Pages are cached under the ``"events"`` namespace, which ``Event.save`` bumps;
+    click counts only refresh when the short timeout expires.
+    Raises:
+        InvalidPage: If ``page`` is out of range or not a number.
+    """
+    def compute():
+        events = (
+            _upcoming_events()
+            .select_related('user', 'user__profile')
+            .annotate(user_is_verified=F('user__profile__is_verified'))
+            .order_by(ordering)
+        )
+        paginator = Paginator(events, EVENTS_PAGE_SIZE)
+        events_page = paginator.page(page)
+        return list(events_page.object_list), events_page.has_next(), paginator.num_pages
+
+    return get_or_set('events', (ordering, page), compute, EVENTS_CACHE_TIMEOUT)
+
 
 @require_http_methods(["GET"])
 def broadcast_list(request) -> Any:
@@ -35,11 +74,7 @@ def broadcast_list(request) -> Any:
     except Exception:
         events_page = paginator.page(1)
 
-    if request.user.is_authenticated:
-        following_users_ids = Follow.objects.filter(follower=request.user).values_list('followee_id', flat=True)
-        suggested_followers = User.objects.exclude(id__in=list(following_users_ids) + [request.user.id]).order_by('?')[:2]
-    else:
-        suggested_followers = User.objects.order_by('?')[:2]
+    suggested_followers = suggested_accounts(request.user)
 
     # from django.db.models import Q
     upcoming_event = Event.objects.filter(
@@ -61,36 +96,23 @@ def broadcast_list(request) -> Any:
 @require_http_methods(["GET"])
 def get_trending_events(request):
     page = request.GET.get('page', 1)
-    now = timezone.now()
-    events = (
-        Event.objects
-        .filter(
-            Q(end_time__gt=now) | 
-            (Q(end_time__isnull=True) & Q(start_time__gte=now))
-        )
-        .select_related('user', 'user__profile')
-        .annotate(user_is_verified=F('user__profile__is_verified'))
-        .order_by('-total_click')
-    )
-    paginator = Paginator(events, 10)
-
     try:
-        events_page = paginator.page(page)
+        events, has_next, num_pages = _get_events_page('-total_click', page)
     except Exception:
         return JsonResponse({'error': 'Invalid page'}, status=400)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         html = render(request, 'broadcasts/event_card.html', {
-            'events': events_page.object_list,
+            'events': events,
         }).content.decode('utf-8')
         return JsonResponse({
             'html': html,
-            'has_next': events_page.has_next(),
-            'total_pages': paginator.num_pages
+            'has_next': has_next,
+            'total_pages': num_pages
         })
 
     return render(request, 'broadcasts/event_list.html', {
-        'events': events_page.object_list,
+        'events': events,
         'initial_tab': 'trending',
     })
 
@@ -98,36 +120,23 @@ def get_trending_events(request):
 @require_http_methods(["GET"])
 def get_latest_events(request):
     page = request.GET.get('page', 1)
-    now = timezone.now()
-    events = (
-        Event.objects
-        .filter(
-            Q(end_time__gt=now) | 
-            (Q(end_time__isnull=True) & Q(start_time__gte=now))
-        )
-        .select_related('user', 'user__profile')
-        .annotate(user_is_verified=F('user__profile__is_verified'))
-        .order_by('start_time')
-    )
-    paginator = Paginator(events, 10)
-
     try:
-        events_page = paginator.page(page)
+        events, has_next, num_pages = _get_events_page('start_time', page)
     except Exception:
         return JsonResponse({'error': 'Invalid page'}, status=400)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         html = render(request, 'broadcasts/event_card.html', {
-            'events': events_page.object_list,
+            'events': events,
         }).content.decode('utf-8')
         return JsonResponse({
             'html': html,
-            'has_next': events_page.has_next(),
-            'total_pages': paginator.num_pages
+            'has_next': has_next,
+            'total_pages': num_pages
         })
 
     return render(request, 'broadcasts/event_list.html', {
-        'events': events_page.object_list,
+        'events': events,
         'initial_tab': 'latest',
     })
 
@@ -159,10 +168,12 @@ def unpin_event(request, pk):
 @require_http_methods(["POST"])
 def click_event(request, pk):
     """Increment click count when RSVP button is clicked."""
-    event = get_object_or_404(Event, pk=pk)
-    Event.objects.filter(pk=pk).update(total_click=F('total_click') + 1)
-    event.refresh_from_db(fields=["total_click"])
-    return JsonResponse({"status": "ok", "total_click": event.total_click})
+    counts = read_counters(Event, pk, "total_click")
+    if counts is None:
+        raise Http404("Event not found.")
+    # Sharded, so clicks on a popular event do not contend for its row
+    increment(Event, pk, "total_click")
+    return JsonResponse({"status": "ok", "total_click": counts["total_click"] + 1})
 
 
 @require_http_methods(["POST"])
@@ -188,7 +199,6 @@ def create_event(request):
         event = Event.objects.create(
             user=request.user,
             author_display_name=author_display,
-            image=cleaned.get("image"),
             description=cleaned.get("description"),
             location_name=cleaned.get("location_name"),
             location_lat=cleaned.get("location_lat"),
@@ -198,6 +208,9 @@ def create_event(request):
             fee=cleaned.get("fee"),
             rsvp_url=cleaned.get("rsvp_url"),
         )
+        if cleaned.get("image"):
+            # Uploaded in the background so the request does not wait on Cloudinary
+            enqueue_upload(event, "image", cleaned["image"])
 
         return JsonResponse({"status": "success", "id": str(event.pk), "created": True})
     except Exception as e:
@@ -222,6 +235,7 @@ def _serialize_event(event: Event) -> dict:
         "author_avatar_url": event.author_avatar_url,
         "author_badges_url": event.author_badges_url,
         "image_url": image_url,
+        "image_status": event.image_status,
         "description": event.description,
         "is_pinned": event.is_pinned,
         "location_name": event.location_name,
@@ -239,62 +253,66 @@ def _serialize_event(event: Event) -> dict:
 
 
 @require_http_methods(["GET"])
-def api_trending_events(request):
+async def api_trending_events(request):
     """Return trending events in JSON for mobile/web clients (sorted by most clicks)."""
     page = request.GET.get('page', 1)
-    now = timezone.now()
-    events = (
-        Event.objects
-        .filter(
-            Q(end_time__gt=now) | 
-            (Q(end_time__isnull=True) & Q(start_time__gte=now))
-        )
-        .select_related('user', 'user__profile')
-        .annotate(user_is_verified=F('user__profile__is_verified'))
-        .order_by('-total_click')
-    )
-
-    paginator = Paginator(events, 10)
     try:
-        events_page = paginator.page(page)
+        events, has_next, num_pages = await sync_to_async(_get_events_page)('-total_click', page)
     except Exception:
         return JsonResponse({'error': 'Invalid page'}, status=400)
 
-    data = [_serialize_event(e) for e in events_page.object_list]
+    data = [_serialize_event(e) for e in events]
     return JsonResponse({
         'results': data,
-        'has_next': events_page.has_next(),
-        'total_pages': paginator.num_pages,
+        'has_next': has_next,
+        'total_pages': num_pages,
     })
 
 
 @require_http_methods(["GET"])
-def api_latest_events(request):
+async def api_latest_events(request):
     """Return latest events in JSON for mobile/web clients (sorted by closest upcoming start time)."""
     page = request.GET.get('page', 1)
-    now = timezone.now()
-    events = (
-        Event.objects
-        .filter(
-            Q(end_time__gt=now) | 
-            (Q(end_time__isnull=True) & Q(start_time__gte=now))
-        )
-        .select_related('user', 'user__profile')
-        .annotate(user_is_verified=F('user__profile__is_verified'))
-        .order_by('start_time')
-    )
-
-    paginator = Paginator(events, 10)
     try:
-        events_page = paginator.page(page)
+        events, has_next, num_pages = await sync_to_async(_get_events_page)('start_time', page)
     except Exception:
         return JsonResponse({'error': 'Invalid page'}, status=400)
 
-    data = [_serialize_event(e) for e in events_page.object_list]
+    data = [_serialize_event(e) for e in events]
     return JsonResponse({
         'results': data,
-        'has_next': events_page.has_next(),
-        'total_pages': paginator.num_pages,
+        'has_next': has_next,
+        'total_pages': num_pages,
+    })
+
+
+def _nearby_events_page(lat: float, lng: float, radius: float, cursor: str | None) -> tuple[list, str | None]:
+    """Return the serialized upcoming events within ``radius`` km, nearest first, plus the next cursor.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    rows, next_cursor = nearby(_upcoming_events(), lat, lng, radius, cursor, EVENTS_PAGE_SIZE)
+    events = Event.objects.select_related('user', 'user__profile').in_bulk([pk for pk, _ in rows])
+    results = [
+        {**_serialize_event(events[pk]), "distance_km": round(distance, 3)}
+        for pk, distance in rows if pk in events
+    ]
+    return results, next_cursor
+
+
+@require_http_methods(["GET"])
+async def api_nearby_events(request):
+    """Return upcoming events within ``radius`` km (default 5, max 50) of ``lat``/``lng``, nearest first."""
+    try:
+        lat, lng, radius = parse_point(request.GET)
+        results, next_cursor = await sync_to_async(_nearby_events_page)(lat, lng, radius, request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'error': 'invalid_query', 'message': str(e)}, status=400)
+
+    return JsonResponse({
+        'results': results,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
     })
 
 
@@ -324,30 +342,34 @@ def api_create_event(request):
     fee = data.get("fee")
     rsvp_url = data.get("rsvp_url")
     image_url = data.get("image_url")
-    image_file = None
-    image_public_id = None
+    image_source = None
 
-    # Accept multipart file or base64-encoded image data
+    # Accept multipart file, base64-encoded image data or a remote URL; all are
+    # uploaded in the background (see common.media)
     if request.FILES and request.FILES.get("image"):
-        image_file = request.FILES.get("image")
+        image_source = request.FILES.get("image")
+        try:
+            validate_image(image_source)
+        except ValidationError as e:
+            return JsonResponse({"error": "invalid_image", "message": e.messages[0]}, status=400)
     else:
         image_data = data.get("image_data")
         if image_data:
             try:
                 # Expected format: data:image/<ext>;base64,<payload>
-                # Upload base64 directly to Cloudinary
-                res = cloudinary.uploader.upload(image_data)
-                image_public_id = res.get('public_id')
-            except Exception as e:
-                print(f"Error uploading base64 image: {e}")
-                image_public_id = None
-        elif image_url:
+                header, payload = image_data.split(";base64,")
+                ext = header.split("/")[-1]
+                image_source = ContentFile(base64.b64decode(payload), name=f"event.{ext}")
+            except ValueError as e:
+                # binascii.Error, raised for bad padding, is a ValueError too
+                logger.info("Rejected undecodable base64 event image: %s", e)
+                return JsonResponse({"error": "invalid_image", "message": "Invalid base64 image data."}, status=400)
             try:
-                res = cloudinary.uploader.upload(image_url)
-                image_public_id = res.get('public_id')
-            except Exception as e:
-                print(f"Error uploading image from URL: {e}")
-                image_public_id = None
+                validate_image(image_source)
+            except ValidationError as e:
+                return JsonResponse({"error": "invalid_image", "message": e.messages[0]}, status=400)
+        elif image_url:
+            image_source = image_url
 
     if not desc or not start_time_raw:
         return JsonResponse({"error": "missing_fields"}, status=400)
@@ -389,7 +411,6 @@ def api_create_event(request):
         event = Event.objects.create(
             user=request.user,
             author_display_name=request.user.get_full_name() or request.user.username,
-            image=image_public_id if image_public_id else (image_file if image_file else None),
             description=desc,
             location_name=location_name,
             location_lat=location_lat,
@@ -399,6 +420,8 @@ def api_create_event(request):
             fee=fee,
             rsvp_url=rsvp_url,
         )
+        if image_source:
+            enqueue_upload(event, "image", image_source)
         return JsonResponse({
             "status": "success",
             "event": _serialize_event(event),
@@ -410,19 +433,20 @@ def api_create_event(request):
         return JsonResponse({"error": "exception", "message": str(e)}, status=500)
 
 @require_http_methods(["GET"])
-def api_user_broadcasts(request, username):
-    user = get_object_or_404(User, username=username)
+async def api_user_broadcasts(request, username):
+    user = await aget_object_or_404(User, username=username)
 
-    events = (
+    events = [
+        event async for event in
         Event.objects
         .filter(user=user)
         .select_related('user', 'user__profile')
         .order_by('-created_at')
-    )
+    ]
 
     return JsonResponse({
         "username": username,
-        "broadcast_count": events.count(),
+        "broadcast_count": len(events),
         "broadcasts": [_serialize_event(e) for e in events],
     })
 
@@ -0,0 +1,155 @@
+"""
+Shared caching helpers built on Django's cache framework (``settings.CACHES``).
+
+Keys are grouped into namespaces (e.g. ``"events"``, ``"listings"``, ``"profile:42"``).
+Every key embeds the current version of its namespace, so a write invalidates
+everything cached under a namespace with a single ``bump_namespace`` call instead of
+having to know (or delete) every key that was built from it.
+
+Functions:
+    namespace_version: Returns the current version of a namespace.
+    bump_namespace: Invalidates every key of one or more namespaces.
+    make_key: Builds a versioned cache key.
+    get_or_set: Returns a cached value, computing and storing it on a miss.
+    cache_view: Decorator caching successful GET responses of a view.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from typing import Any, Callable, Iterable
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+
+DEFAULT_TIMEOUT = 300
+# Streamed bodies larger than this are sent but not cached, so a big stream is never
+# held in memory in full (and stays under Memcached's 1 MB item limit)
+STREAM_CACHE_LIMIT = 512 * 1024
+
+
+def _version_key(namespace: str) -> str:
+    return f"ns:{namespace}"
+
+
+def namespace_version(namespace: str) -> int:
+    """Return the current version of ``namespace``, initialising it on first use."""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        version = time.time_ns()
+        if not cache.add(_version_key(namespace), version, None):
+            version = cache.get(_version_key(namespace), version)
+    return version
+
+
+def bump_namespace(*namespaces: str) -> None:
+    """Invalidate every key built from the given namespaces."""
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Build a cache key for ``parts`` under the current version of ``namespace``."""
+    digest = hashlib.md5(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"{namespace}:v{namespace_version(namespace)}:{digest}"
+
+
+def get_or_set(namespace: str, parts: Iterable[Any], compute: Callable[[], Any], timeout: int = DEFAULT_TIMEOUT) -> Any:
+    """Return the value cached for ``parts`` in ``namespace``, computing it on a miss."""
+    key = make_key(namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cache_view(namespace: str, timeout: int = DEFAULT_TIMEOUT, per_user: bool = False) -> Callable:
+    """
+    Cache successful GET responses of a view under ``namespace``.
+    The key covers the path, the query string and, with ``per_user``, the requesting
+    user, so responses that embed viewer-specific fields are never shared.
+    Works on both sync and async views. Streaming responses of sync views are passed
+    through untouched and stored once the client has received the whole body, unless it
+    exceeds ``STREAM_CACHE_LIMIT``.
+    Args:
+        namespace: namespace whose ``bump_namespace`` invalidates the cached responses.
+        timeout: lifetime of a cached response in seconds.
+        per_user: whether the response depends on ``request.user``.
+    """
+    def decorator(view_func: Callable) -> Callable:
+        def key_for(request, user) -> str:
+            parts = [request.path, request.GET.urlencode()]
+            if per_user:
+                parts.append(user.pk if user.is_authenticated else "anon")
+            return make_key(namespace, *parts)
+
+        def cacheable(response) -> bool:
+            return response.status_code == 200 and not getattr(response, "streaming", False)
+
+        def tee_into_cache(response, key):
+            content_type = response["Content-Type"]
+            chunks = response.streaming_content
+
+            def stream():
+                body, size = [], 0
+                for chunk in chunks:
+                    if body is not None:
+                        size += len(chunk)
+                        if size <= STREAM_CACHE_LIMIT:
+                            body.append(chunk)
+                        else:
+                            # Too big to cache: drop the copy and only stream the rest
+                            body = None
+                    yield chunk
+                # Only reached when the whole body was sent; aborted streams are not cached
+                if body is not None:
+                    cache.set(key, (b"".join(body), content_type), timeout)
+
+            response.streaming_content = stream()
+            return response
+
+        if iscoroutinefunction(view_func):
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != "GET":
+                    return await view_func(request, *args, **kwargs)
+
+                user = await request.auser() if per_user else None
+                key = await sync_to_async(key_for, thread_sensitive=False)(request, user)
+                cached = await cache.aget(key)
+                if cached is not None:
+                    content, content_type = cached
+                    return HttpResponse(content, content_type=content_type)
+
+                response = await view_func(request, *args, **kwargs)
+                if cacheable(response):
+                    await cache.aset(key, (response.content, response["Content-Type"]), timeout)
+                return response
+
+            wrapper = wraps(view_func)(async_wrapper)
+            markcoroutinefunction(wrapper)
+            return wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view_func(request, *args, **kwargs)
+
+            key = key_for(request, request.user if per_user else None)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if cacheable(response):
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+            elif response.status_code == 200 and getattr(response, "streaming", False) and not response.is_async:
+                tee_into_cache(response, key)
+            return response
+        return wrapper
+    return decorator
@@ -11,6 +11,7 @@ Classes:
     EventLevel: Choices for event difficulty level (Beginner, Intermediate, Advanced, All).
     ParticipantStatus: Choices for participant status in an event (Joined, Waitlisted, Left, Cancelled).
     UpdateType: Choices for types of updates (Text, Score).
+    MediaStatus: Choices for the upload state of an image field (Pending, Ready, Failed).
 
 """
 
@@ -58,3 +59,8 @@ class ParticipantStatus(models.TextChoices):
 class UpdateType(models.TextChoices):
     TEXT = "text", "Text"
     SCORE = "score", "Score"
+
+class MediaStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    READY = "ready", "Ready"
+    FAILED = "failed", "Failed"
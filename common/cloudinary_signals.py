@@ -1,10 +1,9 @@
+from django.apps import apps
 from django.db.models.signals import post_delete
-from django.dispatch import receiver
 from cloudinary.models import CloudinaryField
 import cloudinary.uploader
 
 
-@receiver(post_delete)
 def auto_delete_cloudinary_files(sender, instance, **kwargs):
     """
     Signal receiver to automatically delete Cloudinary files when a model instance with CloudinaryField is deleted.
@@ -27,3 +26,21 @@ def auto_delete_cloudinary_files(sender, instance, **kwargs):
                         cloudinary.uploader.destroy(public_id)
                 except Exception as e:
                     print(f"⚠️ Failed deleting file Cloudinary ({sender.__name__}.{field.name}): {e}")
+
+
+def connect_cloudinary_cleanup():
+    """
+    Connect ``auto_delete_cloudinary_files`` to every model that has a CloudinaryField.
+    Connecting per sender (instead of to every ``post_delete``) keeps models without
+    files eligible for Django's fast deletes, which skip loading rows before a DELETE.
+    """
+    for model in apps.get_models():
+        if any(isinstance(field, CloudinaryField) for field in model._meta.get_fields()):
+            post_delete.connect(
+                auto_delete_cloudinary_files,
+                sender=model,
+                dispatch_uid=f"cloudinary_cleanup:{model._meta.label}",
+            )
+
+
+connect_cloudinary_cleanup()
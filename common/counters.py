@@ -0,0 +1,176 @@
+"""
+Sharded counters for hot integer columns.
+
+A column such as ``Post.likes_count`` that is bumped with ``F() + 1`` on every event
+turns popular rows into a lock hotspot. Instead, ``increment`` adds to one of
+``SHARDS`` ``CounterShard`` rows picked at random, so concurrent writers rarely touch
+the same row, and ``flush_counters`` (the ``flush_counters`` management command)
+periodically folds the shards back into the column in one ``UPDATE`` per object.
+
+Reads pick their precision: orderings use the column (a cached sum that lags by at
+most one flush), while displayed counts add the pending shards, through
+``read_counters`` for one row or ``add_pending`` for a page of loaded rows, so they
+never wait on a flush.
+
+Functions:
+    increment: Adds to a counter through a random shard.
+    increment_many: Adds to the same counter of many objects in a fixed number of queries.
+    read_counters: Returns the exact value of counters of one object.
+    add_pending: Adds the pending shards to counters of loaded instances.
+    clear_pending: Drops the pending shards of counters of one object.
+    flush_counters: Folds every pending shard into its column.
+"""
+
+import random
+from collections import defaultdict
+from typing import Iterable
+from django.apps import apps
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Sum, When
+from .models import CounterShard
+
+SHARDS = 16
+
+
+def _object_key(model: type[models.Model], pk) -> str:
+    # Normalise "uuid-string" / UUID / int primary keys to one stored form
+    return str(model._meta.pk.to_python(pk))
+
+
+def _shards(model: type[models.Model], pk, fields):
+    return CounterShard.objects.filter(model=model._meta.label_lower, object_id=_object_key(model, pk), field__in=fields)
+
+
+def increment(model: type[models.Model], pk, field: str, amount: int = 1) -> None:
+    """
+    Add ``amount`` to ``field`` of the ``model`` row ``pk`` without touching that row.
+    Args:
+        model: The model owning the counter column.
+        pk: Primary key of the counted row.
+        field: Name of an integer column of ``model``.
+        amount: Value to add; negative to decrement.
+    Raises:
+        ValidationError: If ``pk`` is not a valid primary key value for ``model``.
+    """
+    key = {
+        "model": model._meta.label_lower,
+        "object_id": _object_key(model, pk),
+        "field": field,
+        "shard": random.randrange(SHARDS),
+    }
+    if CounterShard.objects.filter(**key).update(value=F("value") + amount):
+        return
+    try:
+        with transaction.atomic():
+            CounterShard.objects.create(value=amount, **key)
+    except IntegrityError:
+        # Another writer created the shard first
+        CounterShard.objects.filter(**key).update(value=F("value") + amount)
+
+
+def increment_many(model: type[models.Model], field: str, amounts: dict) -> None:
+    """
+    Add ``amounts[pk]`` to ``field`` of every listed ``model`` row, all through one
+    random shard: one ``SELECT``, one ``UPDATE`` and one ``INSERT`` however many rows.
+    Args:
+        model: The model owning the counter column.
+        field: Name of an integer column of ``model``.
+        amounts: ``{pk: amount}``; zero amounts are skipped.
+    """
+    keyed = {_object_key(model, pk): amount for pk, amount in amounts.items() if amount}
+    if not keyed:
+        return
+    key = {"model": model._meta.label_lower, "field": field, "shard": random.randrange(SHARDS)}
+    shards = CounterShard.objects.filter(**key)
+    existing = set(shards.filter(object_id__in=keyed).values_list("object_id", flat=True))
+    if existing:
+        shards.filter(object_id__in=existing).update(
+            value=Case(*(When(object_id=object_id, then=F("value") + keyed[object_id]) for object_id in existing))
+        )
+    missing = [CounterShard(object_id=object_id, value=amount, **key) for object_id, amount in keyed.items() if object_id not in existing]
+    try:
+        with transaction.atomic():
+            CounterShard.objects.bulk_create(missing)
+    except IntegrityError:
+        # Another writer created some of these shards meanwhile
+        for shard in missing:
+            increment(model, shard.object_id, field, shard.value)
+
+
+def read_counters(model: type[models.Model], pk, *fields: str) -> dict[str, int] | None:
+    """
+    Return the exact value (column plus pending shards) of ``fields`` of one row.
+    Returns:
+        dict | None: ``{field: value}``, or ``None`` if the row does not exist.
+    Raises:
+        ValidationError: If ``pk`` is not a valid primary key value for ``model``.
+    """
+    row = model.objects.filter(pk=pk).values(*fields).first()
+    if row is None:
+        return None
+    pending = _shards(model, pk, fields).values("field").annotate(total=Sum("value")).values_list("field", "total")
+    for field, total in pending:
+        row[field] += total
+    return row
+
+
+def add_pending(objects: Iterable[models.Model], *fields: str) -> None:
+    """
+    Add the pending shards of ``fields`` to the counter attributes of already loaded
+    instances, in one query for all of them, so a page of rows shows exact counts.
+    Args:
+        objects: Instances of one model whose counters are read from the column.
+        fields: Names of the counter columns.
+    """
+    by_key = {}
+    for obj in objects:
+        by_key.setdefault(_object_key(type(obj), obj.pk), []).append(obj)
+    if not by_key:
+        return
+    model = type(next(iter(by_key.values()))[0])
+    totals = (
+        CounterShard.objects
+        .filter(model=model._meta.label_lower, object_id__in=by_key, field__in=fields)
+        .values("object_id", "field")
+        .annotate(total=Sum("value"))
+        .values_list("object_id", "field", "total")
+    )
+    for object_id, field, total in totals:
+        for obj in by_key[object_id]:
+            setattr(obj, field, getattr(obj, field) + total)
+
+
+def clear_pending(model: type[models.Model], pk, *fields: str) -> None:
+    """Drop the pending shards of ``fields``, e.g. after recomputing the columns from scratch."""
+    _shards(model, pk, fields).delete()
+
+
+@transaction.atomic
+def flush_counters() -> int:
+    """
+    Fold every non-zero shard into its column and delete the folded shards.
+    The shards are locked while the flush runs; increments arriving meanwhile wait
+    and then start new shards, so nothing is counted twice or lost.
+    Returns:
+        int: The number of rows whose counters changed.
+    """
+    shards = list(
+        CounterShard.objects.select_for_update()
+        .exclude(value=0)
+        .values_list("id", "model", "object_id", "field", "value")
+    )
+    totals: dict[tuple[str, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for _, model, object_id, field, value in shards:
+        totals[model, object_id][field] += value
+
+    changed = 0
+    for (label, object_id), fields in totals.items():
+        model = apps.get_model(label)
+        updates = {field: F(field) + total for field, total in fields.items() if total}
+        if updates:
+            changed += model.objects.filter(pk=object_id).update(**updates)
+
+    # Zeroed shards go too, so rows that stopped receiving events leave no trace
+    CounterShard.objects.filter(id__in=[shard[0] for shard in shards]).delete()
+    CounterShard.objects.filter(value=0).delete()
+    return changed
@@ -0,0 +1,207 @@
+"""
+Distance ("near me") queries over models with ``location_lat`` / ``location_lng``.
+
+Every located row also stores the geohash of its coordinates in an indexed
+``geohash`` column (``location_geohash``, called from the model's ``save``). A nearby
+query then runs in three steps:
+
+1. the bounding box of the search circle is covered with a handful of geohash cells,
+   each of which is an index range scan on ``geohash``, and the box itself is
+   applied to the coordinates, so only rows close to the point are read;
+2. the exact great-circle (haversine) distance of those candidates is computed by the
+   database (``distance_km``) and rows outside the circle are dropped;
+3. the rest is ordered by ``(distance, id)`` in SQL and keyset-paginated with
+   ``common.utils.pagination``, so a page reads at most one extra row.
+
+A page does not search the whole radius at once: it starts with a circle reaching
+``radius_km * INITIAL_REACH`` past the cursor and doubles that reach until the page is
+full or the radius is reached, so later pages do not rescan everything nearer than
+their cursor over a wide box.
+
+Boxes are clamped to the valid coordinate range; searches across the poles or the
+antimeridian only see the near side.
+
+Functions:
+    encode_geohash: Encodes coordinates as a geohash.
+    location_geohash: Geohash to store for a row's (possibly missing) coordinates.
+    bounding_box: The latitude/longitude box around a search circle.
+    covering_cells: Geohash prefixes that together cover a box.
+    distance_km: Query expression for the distance from a point to a row.
+    parse_point: Reads and validates ``lat``, ``lng`` and ``radius`` query parameters.
+    nearby: Returns one page of rows within a radius, nearest first.
+"""
+
+import math
+from decimal import Decimal
+from typing import Any
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+from .utils.pagination import decode_cursor, paginate_keyset
+
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+# Upper bound on the index ranges scanned per query
+MAX_CELLS = 16
+# Share of the radius a page first searches past its cursor, doubled while the page is short
+INITIAL_REACH = 1 / 8
+NEARBY_ORDERING = ("distance_km", "pk")
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a point as a geohash of ``precision`` characters."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def location_geohash(lat: Decimal | float | None, lng: Decimal | float | None) -> str | None:
+    """Return the geohash to store for a row, or ``None`` when it has no coordinates."""
+    if lat is None or lng is None:
+        return None
+    return encode_geohash(float(lat), float(lng))
+
+
+def _cell_size(precision: int) -> tuple[float, float]:
+    """Return the ``(height, width)`` in degrees of a geohash cell of ``precision`` characters."""
+    lng_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lng_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """Return ``(min_lat, max_lat, min_lng, max_lng)`` of the box around the circle."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles
+    cos_lat = math.cos(math.radians(min(abs(lat) + delta_lat, 90.0)))
+    delta_lng = 180.0 if cos_lat < 1e-9 else min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(lat - delta_lat, -90.0),
+        min(lat + delta_lat, 90.0),
+        max(lng - delta_lng, -180.0),
+        min(lng + delta_lng, 180.0),
+    )
+
+
+def covering_cells(box: tuple[float, float, float, float]) -> list[str]:
+    """
+    Return the geohash prefixes of the cells covering ``box``.
+    Uses the longest prefix for which at most ``MAX_CELLS`` cells are needed.
+    """
+    min_lat, max_lat, min_lng, max_lng = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * cols <= MAX_CELLS:
+            break
+    lats = [min(min_lat + row * height, max_lat) for row in range(rows)] + [max_lat]
+    lngs = [min(min_lng + col * width, max_lng) for col in range(cols)] + [max_lng]
+    return sorted({encode_geohash(cell_lat, cell_lng, precision) for cell_lat in lats for cell_lng in lngs})
+
+
+def distance_km(lat: float, lng: float):
+    """Return an expression for the great-circle (haversine) distance in km from ``(lat, lng)`` to a row."""
+    row_lat = Radians(Cast("location_lat", FloatField()))
+    row_lng = Radians(Cast("location_lng", FloatField()))
+    half_chord = (
+        Power(Sin((row_lat - Value(math.radians(lat))) / Value(2.0)), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(row_lat)
+        * Power(Sin((row_lng - Value(math.radians(lng))) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(half_chord, Value(1.0))))
+
+
+def parse_point(params) -> tuple[float, float, float]:
+    """
+    Read ``lat``, ``lng`` and the optional ``radius`` (km) from query parameters.
+    Raises:
+        ValueError: If a coordinate is missing or out of range, or the radius is not
+            positive. Radii above ``MAX_RADIUS_KM`` are capped.
+    """
+    try:
+        lat, lng = float(params["lat"]), float(params["lng"])
+        radius = float(params.get("radius") or DEFAULT_RADIUS_KM)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError("lat and lng are required numbers.") from exc
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or not radius > 0:
+        raise ValueError("Coordinates or radius out of range.")
+    return lat, lng, min(radius, MAX_RADIUS_KM)
+
+
+def _cell_range(prefix: str) -> Q:
+    # A prefix match written as a range so every backend can use the B-tree index
+    return Q(geohash__gte=prefix, geohash__lte=prefix + "z" * (GEOHASH_PRECISION - len(prefix)))
+
+
+def _within(queryset: QuerySet, lat: float, lng: float, reach_km: float) -> QuerySet:
+    """Rows of an annotated ``queryset`` within ``reach_km``, prefiltered by geohash cells and box."""
+    box = bounding_box(lat, lng, reach_km)
+    cells = Q()
+    for prefix in covering_cells(box):
+        cells |= _cell_range(prefix)
+    return queryset.filter(
+        cells,
+        location_lat__gte=box[0], location_lat__lte=box[1],
+        location_lng__gte=box[2], location_lng__lte=box[3],
+        distance_km__lte=reach_km,
+    )
+
+
+def nearby(
+    queryset: QuerySet,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    cursor: str | None = None,
+    page_size: int = 20,
+) -> tuple[list[tuple[Any, float]], str | None]:
+    """
+    Return one page of the rows of ``queryset`` within ``radius_km`` of a point, nearest first.
+    Args:
+        queryset: Rows of a model with ``location_lat``, ``location_lng`` and ``geohash``.
+        lat: Latitude of the point.
+        lng: Longitude of the point.
+        radius_km: Search radius in kilometres.
+        cursor: The cursor returned for the previous page, or ``None``.
+        page_size: Number of rows per page.
+    Returns:
+        tuple: ``([(pk, distance_km), ...], next_cursor)``.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    start = 0.0
+    if cursor:
+        distance, _ = decode_cursor(cursor, 2)
+        if not isinstance(distance, (int, float)) or isinstance(distance, bool):
+            raise ValueError("Invalid cursor.")
+        start = float(distance)
+
+    rows = queryset.annotate(distance_km=distance_km(lat, lng)).values("pk", "distance_km")
+    reach = radius_km * INITIAL_REACH
+    while True:
+        # Every row within the reach is searched, so a full page here is the true next page
+        limit = min(start + reach, radius_km)
+        page, next_cursor = paginate_keyset(_within(rows, lat, lng, limit), NEARBY_ORDERING, cursor, page_size)
+        if next_cursor is not None or limit >= radius_km:
+            break
+        reach *= 2
+    return [(row["pk"], row["distance_km"]) for row in page], next_cursor
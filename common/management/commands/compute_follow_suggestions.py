@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from profile_module.services import refresh_follow_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recomputes expired "people you may know" suggestions. Meant to run periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute the suggestions of every active user, not only the expired ones.',
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh_follow_suggestions(force=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Computed follow suggestions for {processed} users.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from feeds_module.ranking import refresh_for_you
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the ranked "For You" feed of every active user. Meant to run every 15 minutes (e.g. from cron).'
+
+    def handle(self, *args, **options):
+        processed = refresh_for_you()
+        self.stdout.write(self.style.SUCCESS(f'Ranked the For You feed of {processed} users.'))
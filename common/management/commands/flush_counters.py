@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from common.counters import flush_counters
+
+
+class Command(BaseCommand):
+    help = 'Folds pending sharded counter increments into their columns. Meant to run every minute (e.g. from cron).'
+
+    def handle(self, *args, **options):
+        changed = flush_counters()
+        self.stdout.write(self.style.SUCCESS(f'Updated counters of {changed} rows.'))
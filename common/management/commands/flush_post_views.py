@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from feeds_module.impressions import flush_views
+
+
+class Command(BaseCommand):
+    help = 'Writes the post views logged in the shared cache to Post.views_count. Meant to run every minute (e.g. from cron).'
+
+    def handle(self, *args, **options):
+        written = flush_views()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {written} post views.'))
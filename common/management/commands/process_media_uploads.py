@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from common.media import process_pending_uploads
+
+
+class Command(BaseCommand):
+    help = 'Uploads queued media that is due (new, retried or abandoned jobs). Meant to run every minute (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Maximum number of jobs to run.')
+
+    def handle(self, *args, **options):
+        uploaded = process_pending_uploads(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Uploaded {uploaded} files.'))
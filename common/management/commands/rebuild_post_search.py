@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from feeds_module.search import rebuild_post_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-indexes every post for full-text search (after bulk imports or restoring a backup).'
+
+    def handle(self, *args, **options):
+        total = rebuild_post_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} posts for search.'))
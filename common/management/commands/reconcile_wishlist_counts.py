@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from marketplace_module.services import reconcile_wishlist_counts
+
+
+class Command(BaseCommand):
+    help = 'Recounts Listing.wishlist_count from the Wishlist table. Meant to run nightly (e.g. from cron).'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_wishlist_counts()
+        self.stdout.write(self.style.SUCCESS(f'Corrected wishlist counts of {fixed} listings.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from feeds_module.services import rebuild_hashtag_stats, refresh_hashtag_stats
+
+
+class Command(BaseCommand):
+    help = 'Ages old posts out of the trending hashtag windows. Meant to run hourly (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every hashtag counter from PostHashtag instead of only the windows.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild_hashtag_stats()
+            self.stdout.write(self.style.SUCCESS('Hashtag stats rebuilt.'))
+            return
+
+        changed = refresh_hashtag_stats()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed trending windows of {changed} hashtags.'))
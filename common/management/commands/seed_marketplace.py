@@ -13,6 +13,7 @@ import cloudinary
 import cloudinary.uploader as cu
 
 from marketplace_module.models import Listing, ListingImage
+from marketplace_module.search import rebuild_listing_search_index
 
 CITIES_ID = [
     "Jakarta", "Bandung", "Surabaya", "Yogyakarta", "Semarang", "Depok",
@@ -197,4 +198,5 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Baris '{name}' dilewati karena error: {e}"))
 
+        rebuild_listing_search_index()
         self.stdout.write(self.style.SUCCESS(f"Berhasil membuat {created} listing marketplace (caption sudah dibersihkan)."))
@@ -12,8 +12,10 @@ from django.conf import settings
 import cloudinary
 import cloudinary.uploader as cu
 
-from common.models import Sport, Hashtag
+from common.models import Sport
 from feeds_module.models import Post, PostImage, PostHashtag
+from feeds_module.services import fan_out_post, rebuild_hashtag_stats, set_post_hashtags
+from feeds_module.search import rebuild_post_search_index
 
 User = get_user_model()
 HASHTAG_REGEX = re.compile(r"#([A-Za-z0-9_]+)")
@@ -57,16 +59,6 @@ def _pick_sport_or_none():
         return None
     return Sport.objects.get(id=random.choice(ids)) if random.random() < 0.7 else None
 
-def _extract_hashtags(text: str):
-    if not text:
-        return []
-    seen, uniq = set(), []
-    for t in HASHTAG_REGEX.findall(text):
-        low = t.lower()
-        if low not in seen:
-            seen.add(low); uniq.append(low)
-    return uniq
-
 def _author_meta(user):
     display_name = user.username
     avatar_url = ""
@@ -150,6 +142,7 @@ class Command(BaseCommand):
                         created_at=timezone.now(),
                         updated_at=timezone.now(),
                     )
+                    fan_out_post(post)
 
                     # Upload gambar → simpan public_id ke CloudinaryField
                     local_img = img_dir / name
@@ -171,16 +164,16 @@ class Command(BaseCommand):
 
                     # Hashtags
                     if parse_hashtags and caption:
-                        for t in _extract_hashtags(caption):
-                            try:
-                                ht, _ = Hashtag.objects.get_or_create(tag=t)
-                                PostHashtag.objects.get_or_create(post=post, hashtag=ht)
-                            except Exception as e:
-                                self.stdout.write(self.style.WARNING(f"Gagal tautkan hashtag #{t}: {e}"))
+                        try:
+                            set_post_hashtags(post, HASHTAG_REGEX.findall(caption))
+                        except Exception as e:
+                            self.stdout.write(self.style.WARNING(f"Gagal tautkan hashtag untuk {name}: {e}"))
 
                     created += 1
 
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Baris '{name}' dilewati karena error: {e}"))
 
+        rebuild_hashtag_stats()
+        rebuild_post_search_index()
         self.stdout.write(self.style.SUCCESS(f"Berhasil membuat {created} post."))
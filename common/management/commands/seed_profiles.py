@@ -6,6 +6,7 @@ from datetime import timedelta
 import random
 from common.models import Sport, Badge, Hashtag
 from profile_module.models import Profile, UserSport, Follow, UserBadge
+from feeds_module.services import resolve_hashtags
 from faker import Faker
 
 fake = Faker()
@@ -97,8 +98,7 @@ class Command(BaseCommand):
 
         if Hashtag is not None:
             tags = ["run", "fitness", "soccerlife", "cycling", "swim", "badminton"]
-            for t in tags:
-                Hashtag.objects.get_or_create(tag=t)
+            resolve_hashtags(tags)
 
         created_users = []
         for i in range(users_count):
@@ -0,0 +1,280 @@
+"""
+Background media pipeline.
+
+Requests never talk to the media backend. ``enqueue_upload`` writes the uploaded file
+to ``settings.MEDIA_SPOOL_DIR``, marks the target field ``pending`` and queues a
+``MediaUpload`` job; once the transaction commits, the job is handed to a small
+in-process thread pool (``settings.MEDIA_UPLOAD_WORKERS`` threads) that uploads it and
+flips the field to ``ready``. Failed attempts are retried with exponential backoff by
+``process_pending_uploads`` (the ``process_media_uploads`` command, run from cron),
+which also picks up jobs whose worker died mid-upload. The spool directory must be
+reachable from wherever that command runs.
+
+The backend is picked by ``settings.MEDIA_BACKEND`` (a dotted path) and needs an
+``upload(source, folder)`` method returning the value stored in the field. An optional
+``delete(stored)`` removes uploads whose result is never stored (a newer upload
+superseded the job, or the row is gone); without it they are logged for cleanup.
+
+Classes:
+    CloudinaryBackend: Uploads to Cloudinary (production).
+    LocalBackend: Copies files into a local directory; for development and tests.
+
+Functions:
+    get_backend: Returns the configured backend instance.
+    validate_image: Checks an uploaded image before it is queued.
+    enqueue_upload: Spools an upload and queues it for a row's image field.
+    process_upload: Runs one upload job.
+    process_pending_uploads: Runs every job that is due.
+"""
+
+import datetime
+import logging
+import shutil
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .choices import MediaStatus
+from .models import MediaUpload
+from .utils.validator_image import validate_image_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "common.media.CloudinaryBackend"
+ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+MAX_ATTEMPTS = 5
+RETRY_DELAY = datetime.timedelta(seconds=30)
+# How long a running attempt keeps other workers away from its job
+LEASE = datetime.timedelta(minutes=5)
+
+
+class CloudinaryBackend:
+    """Uploads to Cloudinary with the credentials configured in settings."""
+
+    def upload(self, source: str, folder: str) -> str:
+        import cloudinary.uploader
+
+        return cloudinary.uploader.upload(source, folder=folder)["public_id"]
+
+    def delete(self, stored: str) -> None:
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(stored)
+
+
+class LocalBackend:
+    """
+    Stand-in backend that copies files into ``settings.MEDIA_LOCAL_BACKEND_DIR``.
+    Remote URLs are downloaded first. Needs no network for spooled files.
+    """
+
+    def __init__(self) -> None:
+        self.root = Path(getattr(settings, "MEDIA_LOCAL_BACKEND_DIR", Path(settings.MEDIA_ROOT) / "uploads"))
+
+    def upload(self, source: str, folder: str) -> str:
+        name = f"{folder}/{uuid.uuid4().hex}{Path(source).suffix}"
+        target = self.root / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if _is_url(source):
+            with urllib.request.urlopen(source, timeout=30) as response, open(target, "wb") as out:
+                shutil.copyfileobj(response, out)
+        else:
+            shutil.copyfile(source, target)
+        return name
+
+    def delete(self, stored: str) -> None:
+        (self.root / stored).unlink(missing_ok=True)
+
+
+def get_backend():
+    """Return the backend named by ``settings.MEDIA_BACKEND``."""
+    return import_string(getattr(settings, "MEDIA_BACKEND", DEFAULT_BACKEND))()
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def _spool_dir() -> Path:
+    return Path(getattr(settings, "MEDIA_SPOOL_DIR", Path(settings.MEDIA_ROOT) / "spool"))
+
+
+def _spool(upload) -> str:
+    name = f"{uuid.uuid4().hex}{Path(upload.name or '').suffix.lower()}"
+    directory = _spool_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / name, "wb") as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    return name
+
+
+def _discard(source: str) -> None:
+    if not _is_url(source):
+        (_spool_dir() / source).unlink(missing_ok=True)
+
+
+def _drop_stored(stored: str) -> None:
+    """Delete an uploaded file whose result will not be stored, or log it for cleanup."""
+    backend = get_backend()
+    if not hasattr(backend, "delete"):
+        logger.warning("Orphaned media upload %s; %s cannot delete it.", stored, type(backend).__name__)
+        return
+    try:
+        backend.delete(stored)
+    except Exception:
+        logger.warning("Could not delete orphaned media upload %s.", stored, exc_info=True)
+
+
+def validate_image(upload) -> None:
+    """
+    Check the size and content type of an uploaded image before it is queued.
+    Raises:
+        ValidationError: If the file is too large or not a supported image type.
+    """
+    validate_image_size(upload)
+    content_type = getattr(upload, "content_type", None)
+    if content_type is not None and content_type not in ALLOWED_IMAGE_TYPES:
+        raise ValidationError("Unsupported image type.")
+
+
+def _status_field(field: str) -> str:
+    return f"{field}_status"
+
+
+_executor = None
+
+
+def _submit(job_id: int) -> None:
+    global _executor
+    workers = getattr(settings, "MEDIA_UPLOAD_WORKERS", 4)
+    if workers <= 0:
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-upload")
+    _executor.submit(_run_in_worker, job_id)
+
+
+def _run_in_worker(job_id: int) -> None:
+    try:
+        process_upload(job_id)
+    except Exception:
+        logger.exception("Media upload job %s crashed.", job_id)
+    finally:
+        # Worker threads open their own connections; don't leak them
+        connections.close_all()
+
+
+def enqueue_upload(instance: models.Model, field: str, upload) -> MediaUpload:
+    """
+    Queue ``upload`` for ``field`` of the saved row ``instance`` and mark it pending.
+    The current value of ``field`` stays in place until the upload is ready. Jobs still
+    queued for the same field are superseded: they are deleted, and one already running
+    drops its result instead of overwriting this one.
+    Args:
+        instance: A saved model instance with a ``<field>_status`` column.
+        field: Name of the ``CloudinaryField`` to fill.
+        upload: An uploaded file (spooled to disk here) or a remote URL string.
+    Returns:
+        MediaUpload: The queued job.
+    """
+    source = upload if isinstance(upload, str) else _spool(upload)
+    target = {"model": instance._meta.label_lower, "object_id": str(instance.pk), "field": field}
+    superseded = list(MediaUpload.objects.filter(**target).values_list("source", flat=True))
+    if superseded:
+        # Waits for a worker that is storing one of these results (see process_upload)
+        MediaUpload.objects.filter(**target).delete()
+        transaction.on_commit(lambda: [_discard(old) for old in superseded])
+    status_field = _status_field(field)
+    type(instance).objects.filter(pk=instance.pk).update(**{status_field: MediaStatus.PENDING})
+    setattr(instance, status_field, MediaStatus.PENDING)
+    job = MediaUpload.objects.create(source=source, **target)
+    transaction.on_commit(lambda: _submit(job.pk))
+    return job
+
+
+def _fail(job: MediaUpload, model, error: Exception) -> None:
+    job.last_error = repr(error)
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = MediaStatus.FAILED
+        model.objects.filter(pk=job.object_id).update(**{_status_field(job.field): MediaStatus.FAILED})
+        _discard(job.source)
+        logger.error("Giving up on media upload %s after %d attempts: %r", job.pk, job.attempts, error)
+    else:
+        job.next_attempt_at = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        logger.warning("Media upload %s failed (attempt %d), retrying: %r", job.pk, job.attempts, error)
+    job.save(update_fields=["status", "last_error", "next_attempt_at"])
+
+
+def process_upload(job_id: int) -> bool:
+    """
+    Upload one queued file and mark its field ready.
+    The job is claimed with a conditional ``UPDATE`` first, so concurrent workers never
+    upload the same file twice while the lease lasts. The result is stored only if the
+    job still exists afterwards, i.e. no newer upload to the same field superseded it;
+    otherwise the uploaded file is deleted from the backend again.
+    Returns:
+        bool: Whether the file was uploaded and stored.
+    """
+    now = timezone.now()
+    claimed = MediaUpload.objects.filter(
+        pk=job_id, status=MediaStatus.PENDING, next_attempt_at__lte=now,
+    ).update(next_attempt_at=now + LEASE, attempts=F("attempts") + 1)
+    if not claimed:
+        return False
+
+    job = MediaUpload.objects.get(pk=job_id)
+    model = apps.get_model(job.model)
+    source = job.source if _is_url(job.source) else str(_spool_dir() / job.source)
+    stored = error = None
+    try:
+        stored = get_backend().upload(source, folder=model._meta.model_name)
+    except Exception as exc:
+        error = exc
+
+    instance = None
+    with transaction.atomic():
+        # Locking the job holds off enqueue_upload until the result is stored
+        current = MediaUpload.objects.select_for_update().filter(pk=job.pk).exists()
+        if current and error is not None:
+            _fail(job, model, error)
+        elif current:
+            instance = model.objects.filter(pk=job.object_id).first()
+            if instance is not None:
+                setattr(instance, job.field, stored)
+                setattr(instance, _status_field(job.field), MediaStatus.READY)
+                # save() rather than update() so model hooks (cache invalidation) run
+                instance.save(update_fields=[job.field, _status_field(job.field)])
+            job.delete()
+
+    if not current:
+        logger.info("Media upload %s was superseded by a newer upload.", job.pk)
+    # Outside the transaction: the backend call must not hold the job lock
+    if stored is not None and instance is None:
+        _drop_stored(stored)
+    if current and error is None:
+        _discard(job.source)
+    return instance is not None
+
+
+def process_pending_uploads(limit: int = 100) -> int:
+    """
+    Run up to ``limit`` due jobs: new ones a worker never got to, retries whose backoff
+    has passed and jobs whose lease expired.
+    Returns:
+        int: The number of files uploaded.
+    """
+    due = (
+        MediaUpload.objects
+        .filter(status=MediaStatus.PENDING, next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+    return sum(process_upload(job_id) for job_id in list(due))
@@ -4,11 +4,15 @@ Models:
     - Sport: Represents a type of sport, with a unique name and optional icon.
     - Badge: Represents an achievement badge, identified by a unique code, name, and optional icon URL.
     - Hashtag: Represents a unique hashtag for categorization or tagging purposes.
+    - CounterShard: One shard of a sharded counter column (see ``common.counters``).
+    - MediaUpload: A queued upload of an image to the media backend (see ``common.media``).
 Location:
     - This model is placed in the 'common' app to facilitate reuse in multiple modules.
 """
 
 from django.db import models
+from django.utils import timezone
+from .choices import MediaStatus
 
 class Sport(models.Model):
     """Model representing a sport.
@@ -50,3 +54,68 @@ class Hashtag(models.Model):
 
     def __str__(self):
         return self.tag
+
+class CounterShard(models.Model):
+    """Model holding one shard of the pending increments of a counter column.
+    Hot counters (``Post.likes_count``, ``Event.total_click``, ...) are not updated in
+    place on every event; each increment lands on one of ``counters.SHARDS`` rows picked
+    at random, and ``counters.flush_counters`` periodically folds the shards into the
+    column. The column therefore acts as the cached sum.
+    Attributes:
+        model (CharField): ``app_label.model_name`` of the counted model.
+        object_id (CharField): Primary key of the counted row, as a string.
+        field (CharField): Name of the counter column.
+        shard (PositiveSmallIntegerField): Shard number, below ``counters.SHARDS``.
+        value (BigIntegerField): Increments not yet folded into the column.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    field = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model", "object_id", "field", "shard"], name="counter_shard_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}.{self.field}[{self.shard}] {self.value:+d}"
+
+class MediaUpload(models.Model):
+    """Model representing an image waiting to be pushed to the media backend.
+    The request spools the file locally and acknowledges right away; a worker
+    (``common.media``) uploads it, stores the result in ``field`` of the target row and
+    deletes the job. Failed attempts are retried with exponential backoff.
+    Attributes:
+        model (CharField): ``app_label.model_name`` of the target row.
+        object_id (CharField): Primary key of the target row, as a string.
+        field (CharField): Name of the ``CloudinaryField`` to fill; its state lives in ``<field>_status``.
+        source (TextField): Spooled file name (relative to ``MEDIA_SPOOL_DIR``) or a remote URL.
+        status (CharField): ``pending`` until uploaded, ``failed`` once out of attempts.
+        attempts (PositiveSmallIntegerField): Number of upload attempts so far.
+        next_attempt_at (DateTimeField): When the job may next be picked up (also the lease of a running attempt).
+        last_error (TextField): Error of the last failed attempt.
+        created_at (DateTimeField): When the upload was queued.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    field = models.CharField(max_length=50)
+    source = models.TextField()
+    status = models.CharField(max_length=10, choices=MediaStatus.choices, default=MediaStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="media_upload_due"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}.{self.field} ({self.status})"
@@ -0,0 +1,159 @@
+"""
+Publish/subscribe bus used to wake up long-polling requests.
+
+A channel (e.g. ``"conversation:<uuid>"``) only carries a version number that changes
+on every publish. A subscriber remembers the version it last saw and blocks until the
+channel moves past it (``wait`` in a thread, ``await_change`` in a coroutine), then reads
+whatever is new from the database itself. Idle subscribers therefore never touch the
+database.
+
+The bus is picked by ``settings.PUBSUB_BACKEND`` (a dotted path), so it can be swapped
+for another implementation with the same ``version``/``publish``/``wait`` methods.
+
+Classes:
+    LocalBus: In-process bus; only reaches subscribers of the publishing process.
+    CacheBus: Bus shared by every process through ``settings.CACHES`` (Redis in production).
+
+Functions:
+    get_bus: Returns the configured bus instance.
+    publish: Publishes on the configured bus.
+"""
+
+import asyncio
+import threading
+import time
+from functools import lru_cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .cache import bump_namespace, namespace_version
+
+DEFAULT_BACKEND = "common.pubsub.CacheBus"
+
+
+class LocalBus:
+    """
+    Bus keeping channel versions in process memory.
+    Suitable for a single-process server (``runserver``, one ASGI worker).
+    Both threads (``wait``) and coroutines (``await_change``) can subscribe.
+    """
+
+    # Upper bound on how long a coroutine sleeps between two version checks
+    poll_interval = 5.0
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._versions: dict[str, int] = {}
+        self._async_waiters: dict[str, set] = {}
+
+    def version(self, channel: str) -> int:
+        """Return the current version of ``channel``."""
+        with self._condition:
+            return self._versions.get(channel, 0)
+
+    def publish(self, channel: str) -> int:
+        """Move ``channel`` to a new version and wake its subscribers."""
+        with self._condition:
+            version = self._versions.get(channel, 0) + 1
+            self._versions[channel] = version
+            self._condition.notify_all()
+        self._wake_async(channel)
+        return version
+
+    def wait(self, channel: str, since: int, timeout: float) -> int:
+        """
+        Block until ``channel`` is no longer at version ``since`` or ``timeout`` seconds pass.
+        Returns:
+            int: the version of ``channel`` when the wait ended.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(channel, 0) != since, timeout)
+            return self._versions.get(channel, 0)
+
+    def _wake_async(self, channel: str) -> None:
+        with self._condition:
+            waiters = list(self._async_waiters.get(channel, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def aversion(self, channel: str) -> int:
+        """Coroutine version of ``version``."""
+        return self.version(channel)
+
+    async def await_change(self, channel: str, since: int, timeout: float) -> int:
+        """
+        Coroutine version of ``wait``: it does not hold a thread while waiting, so one
+        ASGI worker can keep many idle subscribers open.
+        Returns:
+            int: the version of ``channel`` when the wait ended.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with self._condition:
+            self._async_waiters.setdefault(channel, set()).add(waiter)
+        try:
+            deadline = loop.time() + timeout
+            while True:
+                # Clear before reading, so a publish in between still wakes us up
+                waiter[1].clear()
+                version = await self.aversion(channel)
+                remaining = deadline - loop.time()
+                if version != since or remaining <= 0:
+                    return version
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                waiters = self._async_waiters.get(channel)
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._async_waiters[channel]
+
+
+class CacheBus(LocalBus):
+    """
+    Bus keeping channel versions in the shared cache.
+    Subscribers of the publishing process are woken immediately; subscribers of other
+    processes notice the new version on their next cache read, every ``poll_interval``
+    seconds. Each read is a single cache ``GET``.
+    """
+
+    poll_interval = 0.5
+
+    def version(self, channel: str) -> int:
+        return namespace_version(f"bus:{channel}")
+
+    def publish(self, channel: str) -> int:
+        bump_namespace(f"bus:{channel}")
+        with self._condition:
+            self._condition.notify_all()
+        self._wake_async(channel)
+        return self.version(channel)
+
+    def wait(self, channel: str, since: int, timeout: float) -> int:
+        deadline = time.monotonic() + timeout
+        version = self.version(channel)
+        while version == since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._condition:
+                self._condition.wait(min(self.poll_interval, remaining))
+            version = self.version(channel)
+        return version
+
+    async def aversion(self, channel: str) -> int:
+        return await sync_to_async(self.version, thread_sensitive=False)(channel)
+
+
+@lru_cache(maxsize=None)
+def get_bus() -> LocalBus:
+    """Return the process-wide bus selected by ``settings.PUBSUB_BACKEND``."""
+    return import_string(getattr(settings, "PUBSUB_BACKEND", DEFAULT_BACKEND))()
+
+
+def publish(channel: str) -> int:
+    """Publish on ``channel`` of the configured bus."""
+    return get_bus().publish(channel)
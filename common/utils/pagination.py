@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination shared across modules.
+
+Instead of ``OFFSET`` + ``COUNT(*)`` (what ``django.core.paginator.Paginator`` does),
+a page is fetched with a ``WHERE`` clause that starts right after the last row of
+the previous page, so every page costs the same as the first one.
+The position is handed to clients as an opaque, URL-safe cursor string.
+
+Functions:
+    encode_cursor: Encodes the ordering values of a row into an opaque cursor.
+    decode_cursor: Decodes a cursor back into ordering values.
+    cursor_for: Builds the cursor pointing right after a given row.
+    paginate_keyset: Returns one page of a queryset plus the cursor of the next page.
+    paginate_offset: Returns one page by page number without a count query (legacy clients).
+"""
+
+import base64
+import json
+from typing import Any, Sequence
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+
+def _to_json_value(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the ordering values of a row into an opaque URL-safe string."""
+    raw = json.dumps([_to_json_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+    Raises:
+        ValueError: If the cursor is malformed or does not hold ``size`` values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def _row_value(row: Any, field: str) -> Any:
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def cursor_for(row: Any, ordering: Sequence[str]) -> str:
+    """Return the cursor that resumes right after ``row`` for the given ordering."""
+    return encode_cursor([_row_value(row, field.lstrip("-")) for field in ordering])
+
+
+def _after(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """Build ``(a, b, ...) > (va, vb, ...)`` for a mixed-direction ordering."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clause = Q(**{f"{name}__{lookup}": values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{previous.lstrip("-"): value})
+        condition |= clause
+    return condition
+
+
+def paginate_keyset(queryset: QuerySet, ordering: Sequence[str], cursor: str | None, page_size: int) -> tuple[list, str | None]:
+    """
+    Return one page of ``queryset`` and the cursor of the next page.
+    Args:
+        queryset: The rows to page over (model instances or ``.values()`` dicts).
+        ordering: Ordering fields, e.g. ``("-created_at", "-id")``. The last field must be unique.
+        cursor: The cursor returned for the previous page, or ``None`` for the first page.
+        page_size: Number of rows per page.
+    Returns:
+        tuple: ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        try:
+            queryset = queryset.filter(_after(ordering, decode_cursor(cursor, len(ordering))))
+        except ValidationError as exc:
+            raise ValueError("Invalid cursor.") from exc
+
+    # Fetch one extra row to learn whether another page exists without counting
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, cursor_for(rows[-1], ordering)
+
+
+def paginate_offset(queryset: QuerySet, page_number: Any, page_size: int) -> tuple[list, int | None]:
+    """
+    Return one page by page number and the next page number, without a ``COUNT(*)``.
+    Invalid page numbers fall back to the first page.
+    """
+    try:
+        page_number = max(int(page_number), 1)
+    except (TypeError, ValueError):
+        page_number = 1
+    start = (page_number - 1) * page_size
+    rows = list(queryset[start:start + page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], page_number + 1
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, PostImage, PostLike, Comment, CommentLike, PostHashtag
+from .models import Post, PostImage, PostLike, Comment, CommentLike, PostHashtag, TimelineEntry, HashtagStats, HashtagActivity
 # Register your models here.
 
 admin.site.register(Post)
@@ -8,3 +8,6 @@ admin.site.register(PostLike)
 admin.site.register(Comment)
 admin.site.register(CommentLike)
 admin.site.register(PostHashtag)
+admin.site.register(TimelineEntry)
+admin.site.register(HashtagStats)
+admin.site.register(HashtagActivity)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FeedsModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'feeds_module'
+
+    def ready(self):
+        import feeds_module.signals
@@ -32,10 +32,33 @@ class PostForm(forms.ModelForm):
         ),
         required=False
     )
+    # Filled from the browser's geolocation; makes the post show up in "near me"
+    location_lat = forms.DecimalField(
+        required=False,
+        max_digits=9,
+        decimal_places=6,
+        min_value=-90,
+        max_value=90,
+        widget=forms.HiddenInput(),
+    )
+    location_lng = forms.DecimalField(
+        required=False,
+        max_digits=9,
+        decimal_places=6,
+        min_value=-180,
+        max_value=180,
+        widget=forms.HiddenInput(),
+    )
 
     class Meta:
         model = Post
-        fields = ('text', 'sport', 'location_name')
+        fields = ('text', 'sport', 'location_name', 'location_lat', 'location_lng')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('location_lat') is None) != (cleaned_data.get('location_lng') is None):
+            raise forms.ValidationError("Both latitude and longitude must be provided together, or leave both empty.")
+        return cleaned_data
 
 class PostImageForm(forms.ModelForm):
     class Meta:
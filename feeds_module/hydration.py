@@ -0,0 +1,87 @@
+"""
+Batched post hydration for feeds_module.
+
+Turns a list of post ids into plain dicts holding everything a post card needs
+(author, profile, sport, images, hashtags, live counters and the viewer's like
+state) using a fixed number of queries, no matter how many posts are on the page.
+
+Functions:
+    hydrate_posts: Returns one dict per post id, in the order the ids were given.
+"""
+
+from typing import Iterable
+from django.contrib.auth.models import User
+from common.counters import add_pending
+from .models import Post, PostImage, PostHashtag, PostLike
+
+
+def _avatar_url(post: Post) -> str:
+    profile = getattr(post.user, "profile", None)
+    if profile and profile.avatar_url:
+        return profile.avatar_url.url
+    return ""
+
+
+def _display_name(post: Post) -> str:
+    profile = getattr(post.user, "profile", None)
+    if profile and profile.display_name:
+        return profile.display_name
+    return post.author_display_name or post.user.username
+
+
+def hydrate_posts(post_ids: Iterable, viewer: User | None = None) -> list[dict]:
+    """
+    Fetch posts with their related data in five queries and return them as dicts.
+    Args:
+        post_ids: ids of the posts to hydrate; the output keeps this order and skips missing posts.
+        viewer: the user whose ``has_liked`` flag is computed (anonymous or ``None`` means ``False``).
+    Returns:
+        list[dict]: one dict per post with the keys used by ``post_card.html`` and the JSON APIs.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return []
+
+    posts = Post.objects.select_related("user", "user__profile", "sport").in_bulk(post_ids)
+
+    image_urls = {post_id: [] for post_id in posts}
+    for image in PostImage.objects.filter(post_id__in=posts.keys()):
+        if image.image:
+            image_urls[image.post_id].append(image.image.url)
+
+    hashtags = {post_id: [] for post_id in posts}
+    for post_id, tag in PostHashtag.objects.filter(post_id__in=posts.keys()).values_list("post_id", "hashtag__tag"):
+        hashtags[post_id].append(tag)
+
+    # Likes and comments sit in counter shards until the next flush
+    add_pending(posts.values(), "likes_count", "comments_count")
+
+    liked_ids = set()
+    if viewer is not None and viewer.is_authenticated:
+        liked_ids = set(
+            PostLike.objects.filter(post_id__in=posts.keys(), user=viewer).values_list("post_id", flat=True)
+        )
+
+    hydrated = []
+    for post_id in post_ids:
+        post = posts.get(post_id)
+        if post is None:
+            continue
+        hydrated.append({
+            "id": post.id,
+            "user": post.user.username,
+            "text": post.text,
+            "sport": post.sport.name if post.sport else None,
+            "sport_id": post.sport_id,
+            "location_name": post.location_name,
+            "likes_count": post.likes_count,
+            "comments_count": post.comments_count,
+            "created_at": post.created_at,
+            "has_liked": post.id in liked_ids,
+            "author_badges_url": post.author_badges_url,
+            "author_display_name": _display_name(post),
+            "author_avatar_url": _avatar_url(post),
+            "image_urls": image_urls[post.id],
+            "hashtags": hashtags[post.id],
+        })
+    return hydrated
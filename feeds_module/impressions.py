@@ -0,0 +1,139 @@
+"""
+Post view (impression) counting for feeds_module.
+
+Feed and search pages report the posts they served to ``record_views``. A view counts
+once per viewer, post and ``VIEW_WINDOW``; the "already seen" markers are claimed with
+``cache.add``, which is atomic, so concurrent requests never count the same view twice.
+The markers are only shared between workers when the cache is (``REDIS_URL``); with the
+per-process fallback cache every worker deduplicates on its own.
+
+With ``REDIS_URL`` set, accepted views are not written by the request: each request
+appends its views to a log in the cache (one ``incr`` for a sequence number, one
+``set`` for the entry), and ``flush_views`` (the ``flush_post_views`` management
+command, run periodically) sums the log into the sharded ``Post.views_count`` counter
+in a fixed number of queries. Without a shared cache a separate flush process could
+not see the log, so the views of a request are written straight to the counter shards
+instead, in one ``increment_many`` per request rather than one write per view.
+
+Functions:
+    record_views: Counts the first view of each post by a viewer within the window.
+    flush_views: Writes the logged view counts to the database.
+"""
+
+from collections import Counter
+from typing import Iterable
+import time
+from django.conf import settings
+from django.core.cache import cache
+from common.counters import increment_many
+from .models import Post
+
+VIEW_WINDOW = 30 * 60
+# Logged requests summed per batch of a flush
+FLUSH_BATCH = 5000
+# A log entry not flushed by then is dropped by the cache
+LOG_TIMEOUT = 24 * 60 * 60
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+_SEQ_KEY = "post-views:seq"
+_STATE_KEY = "post-views:flushed"
+_FLUSH_LOCK_KEY = "post-views:flush-lock"
+
+
+def _seen_key(viewer_id: int, post_id, window: int) -> str:
+    return f"post-view:{viewer_id}:{post_id}:{window}"
+
+
+def _log_key(seq: int) -> str:
+    return f"post-views:log:{seq}"
+
+
+def _log_views(post_ids: list) -> None:
+    """Append one request's views to the log in the shared cache."""
+    cache.add(_SEQ_KEY, 0, None)
+    seq = cache.incr(_SEQ_KEY)
+    cache.set(_log_key(seq), [str(post_id) for post_id in post_ids], LOG_TIMEOUT)
+
+
+def record_views(viewer, post_ids: Iterable, now: float | None = None) -> int:
+    """
+    Count a view of each post in ``post_ids`` that ``viewer`` has not seen this window.
+    Costs one cache round trip per post plus, with ``REDIS_URL``, two to log the views;
+    without it, the views are written to the counter shards (see the module docstring).
+    Args:
+        viewer: The user the posts were served to; anonymous viewers are not counted.
+        post_ids: ids of the posts on the page.
+        now: Unix time of the views, for tests (defaults to the current time).
+    Returns:
+        int: The number of views counted.
+    """
+    if viewer is None or not viewer.is_authenticated:
+        return 0
+    window = int((time.time() if now is None else now) // VIEW_WINDOW)
+    keys = {_seen_key(viewer.pk, post_id, window): post_id for post_id in post_ids}
+    if not keys:
+        return 0
+
+    # add() only stores a missing key, so exactly one request claims each view
+    fresh = [post_id for key, post_id in keys.items() if cache.add(key, 1, VIEW_WINDOW)]
+    if not fresh:
+        return 0
+
+    if settings.REDIS_URL:
+        _log_views(fresh)
+    else:
+        increment_many(Post, "views_count", Counter(fresh))
+    return len(fresh)
+
+
+def _flush_batch(flushed: int, head: int, previous_head: int) -> tuple[int, int]:
+    """
+    Write the log entries after ``flushed`` up to ``head`` (at most ``FLUSH_BATCH``).
+    A missing entry numbered above ``previous_head`` may still be being written, so the
+    batch stops there; one that was already missing at the previous flush is given up.
+    Returns:
+        tuple: ``(last entry consumed, views written)``.
+    """
+    stop = min(head, flushed + FLUSH_BATCH)
+    keys = [_log_key(seq) for seq in range(flushed + 1, stop + 1)]
+    entries = cache.get_many(keys)
+    counts: Counter = Counter()
+    done = flushed
+    for seq, key in enumerate(keys, flushed + 1):
+        if key not in entries and seq > previous_head:
+            break
+        counts.update(entries.get(key, ()))
+        done = seq
+    increment_many(Post, "views_count", counts)
+    cache.delete_many(keys[:done - flushed])
+    return done, sum(counts.values())
+
+
+def flush_views() -> int:
+    """
+    Write the logged view counts to ``Post.views_count`` (through its counter shards).
+    Only one flush runs at a time; a flush that finds another running does nothing.
+    Returns:
+        int: The number of views written.
+    """
+    if not cache.add(_FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        head = cache.get(_SEQ_KEY, 0)
+        flushed, previous_head = cache.get(_STATE_KEY, (0, 0))
+        if head < flushed:
+            # The cache lost the sequence, so the log restarted from 1
+            flushed = previous_head = 0
+        written = 0
+        while flushed < head:
+            stop = min(head, flushed + FLUSH_BATCH)
+            flushed, views = _flush_batch(flushed, head, previous_head)
+            written += views
+            # Saved per batch so a crash between batches never counts one twice
+            cache.set(_STATE_KEY, (flushed, previous_head), None)
+            if flushed < stop:
+                break
+        cache.set(_STATE_KEY, (flushed, head), None)
+        return written
+    finally:
+        cache.delete(_FLUSH_LOCK_KEY)
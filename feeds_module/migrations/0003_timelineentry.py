@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_timelines(apps, schema_editor):
+    Follow = apps.get_model('profile_module', 'Follow')
+    Post = apps.get_model('feeds_module', 'Post')
+    TimelineEntry = apps.get_model('feeds_module', 'TimelineEntry')
+
+    followers_by_followee = {}
+    for follower_id, followee_id in Follow.objects.values_list('follower_id', 'followee_id').iterator():
+        followers_by_followee.setdefault(followee_id, []).append(follower_id)
+
+    entries = []
+    for post_id, user_id, created_at in Post.objects.values_list('id', 'user_id', 'created_at').iterator():
+        for follower_id in followers_by_followee.get(user_id, ()):
+            entries.append(TimelineEntry(user_id=follower_id, post_id=post_id, created_at=created_at))
+    TimelineEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds_module', '0002_remove_postimage_image_url_postimage_image'),
+        ('profile_module', '0004_alter_profile_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='feeds_module.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='feeds_timeline_user_recent')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_hashtag_stats(apps, schema_editor):
+    PostHashtag = apps.get_model('feeds_module', 'PostHashtag')
+    HashtagStats = apps.get_model('feeds_module', 'HashtagStats')
+
+    # Only the all-time counts; `refresh_hashtag_stats --rebuild` fills the windows
+    counts = PostHashtag.objects.values('hashtag_id').annotate(total=Count('id'))
+    HashtagStats.objects.bulk_create(
+        [HashtagStats(hashtag_id=row['hashtag_id'], post_count=row['total']) for row in counts],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+        ('feeds_module', '0004_post_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashtagStats',
+            fields=[
+                ('hashtag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='common.hashtag')),
+                ('post_count', models.IntegerField(default=0)),
+                ('count_24h', models.IntegerField(default=0)),
+                ('count_7d', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'hashtag stats',
+                'indexes': [models.Index(fields=['-count_24h', '-count_7d', '-post_count'], name='feeds_hashtag_trending')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HashtagActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('count', models.IntegerField(default=0)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='common.hashtag')),
+            ],
+            options={
+                'verbose_name_plural': 'hashtag activity',
+                'unique_together': {('hashtag', 'bucket')},
+            },
+        ),
+        migrations.RunPython(backfill_hashtag_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:38
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+FTS_TABLE = 'feeds_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "feeds_search_vector" '
+            'ON "feeds_module_postsearchdocument" USING gin ("vector")'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(post_id UNINDEXED, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "feeds_search_vector"')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def backfill_search_documents(apps, schema_editor):
+    Post = apps.get_model('feeds_module', 'Post')
+    PostHashtag = apps.get_model('feeds_module', 'PostHashtag')
+    PostSearchDocument = apps.get_model('feeds_module', 'PostSearchDocument')
+
+    hashtags = {}
+    for post_id, tag in PostHashtag.objects.values_list('post_id', 'hashtag__tag'):
+        hashtags.setdefault(post_id, []).append(f'#{tag}')
+
+    documents = []
+    for post in Post.objects.select_related('sport').iterator(chunk_size=500):
+        parts = [post.text, ' '.join(hashtags.get(post.pk, [])), post.sport.name if post.sport else None, post.location_name]
+        body = '\n'.join(part for part in parts if part)
+        documents.append(PostSearchDocument(post_id=post.pk, body=body, created_at=post.created_at))
+    PostSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        PostSearchDocument.objects.update(vector=SearchVector('body', config='simple'))
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (post_id, body) VALUES (%s, %s)',
+                [[document.post_id.hex, document.body] for document in documents],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds_module', '0005_hashtagstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='feeds_module.post')),
+                ('body', models.TextField(blank=True, default='')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-post'], name='feeds_search_recent')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
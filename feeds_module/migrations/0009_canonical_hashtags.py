@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:17
+
+import datetime
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import migrations
+from django.utils import timezone
+
+# Frozen copies of services.canonical_hashtag and services.TRENDING_WINDOWS
+MAX_LENGTH = 50
+WINDOWS = {"count_24h": datetime.timedelta(hours=24), "count_7d": datetime.timedelta(days=7)}
+
+
+def _canonical(name):
+    tag = unicodedata.normalize("NFKC", name).strip().lstrip("#").casefold()
+    return tag if tag and len(tag) <= MAX_LENGTH else None
+
+
+def _hour(when):
+    return when.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _recount(apps, hashtag_id, now):
+    PostHashtag = apps.get_model("feeds_module", "PostHashtag")
+    HashtagStats = apps.get_model("feeds_module", "HashtagStats")
+    HashtagActivity = apps.get_model("feeds_module", "HashtagActivity")
+
+    created = list(PostHashtag.objects.filter(hashtag_id=hashtag_id).values_list("post__created_at", flat=True))
+    retention = max(WINDOWS.values())
+    HashtagActivity.objects.filter(hashtag_id=hashtag_id).delete()
+    HashtagActivity.objects.bulk_create([
+        HashtagActivity(hashtag_id=hashtag_id, bucket=bucket, count=count)
+        for bucket, count in Counter(_hour(when) for when in created if when >= now - retention).items()
+    ])
+    counts = {field: sum(when >= now - window for when in created) for field, window in WINDOWS.items()}
+    HashtagStats.objects.update_or_create(
+        hashtag_id=hashtag_id, defaults={"post_count": len(created), "updated_at": now, **counts},
+    )
+
+
+def merge_hashtags(apps, schema_editor):
+    # Fold "#Run", "run" and "RUN" into one "run" row, moving the posts over
+    Hashtag = apps.get_model("common", "Hashtag")
+    PostHashtag = apps.get_model("feeds_module", "PostHashtag")
+
+    groups = defaultdict(list)
+    for pk, tag in Hashtag.objects.values_list("pk", "tag"):
+        canonical = _canonical(tag)
+        if canonical is not None:
+            groups[canonical].append((pk, tag))
+
+    now = timezone.now()
+    for canonical, rows in groups.items():
+        if len(rows) == 1 and rows[0][1] == canonical:
+            continue
+        # Keep the row already named canonically, else the oldest one
+        rows.sort(key=lambda row: (row[1] != canonical, row[0]))
+        keeper, duplicates = rows[0][0], [pk for pk, _ in rows[1:]]
+        for duplicate in duplicates:
+            linked = PostHashtag.objects.filter(hashtag_id=keeper).values("post_id")
+            PostHashtag.objects.filter(hashtag_id=duplicate).exclude(post_id__in=linked).update(hashtag_id=keeper)
+        if duplicates:
+            # Cascades to the links left behind and to the duplicates' counters
+            Hashtag.objects.filter(pk__in=duplicates).delete()
+            _recount(apps, keeper, now)
+        Hashtag.objects.filter(pk=keeper).update(tag=canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds_module', '0008_media_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_hashtags, migrations.RunPython.noop),
+    ]
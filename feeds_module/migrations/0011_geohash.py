@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+from common.geo import location_geohash
+
+
+def fill_geohash(apps, schema_editor):
+    Post = apps.get_model("feeds_module", "Post")
+    rows = list(Post.objects.filter(location_lat__isnull=False, location_lng__isnull=False).only("location_lat", "location_lng"))
+    for row in rows:
+        row.geohash = location_geohash(row.location_lat, row.location_lng)
+    Post.objects.bulk_update(rows, ["geohash"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_mediaupload'),
+        ('feeds_module', '0010_foryouentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['geohash'], name='feeds_post_geohash'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
+from common.choices import MediaStatus
+from common.geo import location_geohash
 from common.models import Sport, Hashtag
 from cloudinary.models import CloudinaryField
 from common.utils.validator_image import validate_image_size
@@ -18,6 +21,7 @@ class Post(models.Model):
         location_name (CharField): The name of the location associated with the post (can be null).
         location_lat (DecimalField): The latitude of the location associated with the post (can be null).
         location_lng (DecimalField): The longitude of the location associated with the post (can be null).
+        geohash (CharField): Geohash of the location, maintained by ``save`` (see ``common.geo``).
         views_count (BigIntegerField): The number of views the post has received.
         likes_count (BigIntegerField): The number of likes the post has received.
         comments_count (BigIntegerField): The number of comments the post has received.
@@ -36,6 +40,7 @@ class Post(models.Model):
     location_name = models.CharField(max_length=120, blank=True, null=True)
     location_lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     location_lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
     views_count = models.BigIntegerField(default=0)
     likes_count = models.BigIntegerField(default=0)
     comments_count = models.BigIntegerField(default=0)
@@ -46,6 +51,20 @@ class Post(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="feeds_post_recent"),
+            models.Index(fields=["geohash"], name="feeds_post_geohash"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Keep ``geohash`` in step with the coordinates before saving."""
+        self.geohash = location_geohash(self.location_lat, self.location_lng)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"location_lat", "location_lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
 class PostImage(models.Model):
     """
     Represents an image associated with a post.
@@ -57,10 +76,12 @@ class PostImage(models.Model):
         image (CloudinaryField): A field for storing the image using Cloudinary.
                                  It accepts images, validates their size using validate_image_size,
                                  and allows null and blank values.
+        image_status (CharField): Upload state of ``image`` (see ``common.media``).
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(Post, related_name="images", on_delete=models.CASCADE)
     image = CloudinaryField("image", validators=[validate_image_size], null=True, blank=True)
+    image_status = models.CharField(max_length=10, choices=MediaStatus.choices, default=MediaStatus.READY)
 
 
 class PostLike(models.Model):
@@ -94,6 +115,8 @@ class Comment(models.Model):
         author_avatar_url (TextField): The URL of the comment author's avatar.
         created_at (DateTimeField): The date and time the comment was created.
         updated_at (DateTimeField): The date and time the comment was last updated.
+    Meta:
+        indexes: Serve paging through a post's top-level comments and a comment's replies.
     """
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -106,6 +129,13 @@ class Comment(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Top-level comments (parent IS NULL) and replies, both read oldest first
+            models.Index(fields=["post", "parent", "created_at", "id"], name="feeds_comment_thread"),
+            models.Index(fields=["parent", "created_at", "id"], name="feeds_comment_replies"),
+        ]
+
 class CommentLike(models.Model):
     """
     Represents a user's like on a comment.
@@ -140,3 +170,143 @@ class PostHashtag(models.Model):
 
     class Meta:
         unique_together = ("post", "hashtag")
+
+
+class TimelineEntry(models.Model):
+    """
+    Represents a post delivered to a user's materialized "following" timeline.
+    Entries are written when a followee publishes a post (fan-out on write) and
+    when a follow is created (backfill), and removed on unfollow (prune).
+    Attributes:
+        user (ForeignKey): The user who owns the timeline.
+        post (ForeignKey): The post delivered to the timeline.
+        created_at (DateTimeField): Copy of the post's creation time, used for ordering.
+    Meta:
+        unique_together (tuple): Ensures that a post appears at most once per timeline.
+        indexes (list): Serves a newest-first range scan over a single user's timeline.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="timeline_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-post"], name="feeds_timeline_user_recent"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} <- {self.post_id}"
+
+
+class ForYouEntry(models.Model):
+    """
+    One post of a user's precomputed "For You" feed, written by ``ranking.refresh_for_you``.
+    Attributes:
+        user (ForeignKey): The user the feed is ranked for.
+        post (ForeignKey): The ranked post.
+        rank (PositiveIntegerField): Position in the feed, starting at 0.
+        score (FloatField): Relevance of the post for ``user``; higher is better.
+        expires_at (DateTimeField): When the ranking is stale; expired feeds are not served.
+    Meta:
+        unique_together (tuple): One post per position; also serves the best-first
+                                 range scan over a single user's feed.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="for_you_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="for_you_entries")
+    rank = models.PositiveIntegerField()
+    score = models.FloatField(default=0)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "rank")
+        verbose_name_plural = "for you entries"
+
+    def __str__(self):
+        return f"{self.user_id} #{self.rank}: {self.post_id} ({self.score:g})"
+
+
+class HashtagStats(models.Model):
+    """
+    Maintained usage counters of a hashtag, read by the "popular tags" card.
+    ``post_count`` is updated whenever a post is linked to or unlinked from the
+    hashtag; the windowed counts are updated at the same time and re-derived from
+    ``HashtagActivity`` by ``refresh_hashtag_stats`` so that old posts age out.
+    Attributes:
+        hashtag (OneToOneField): The hashtag the counters belong to.
+        post_count (IntegerField): Number of posts using the hashtag, all time.
+        count_24h (IntegerField): Number of posts using the hashtag created in the last 24 hours.
+        count_7d (IntegerField): Number of posts using the hashtag created in the last 7 days.
+        updated_at (DateTimeField): When the windowed counts were last re-derived.
+    Meta:
+        indexes (list): Serves the trending lookup as an ordered index scan.
+    """
+
+    hashtag = models.OneToOneField(Hashtag, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    post_count = models.IntegerField(default=0)
+    count_24h = models.IntegerField(default=0)
+    count_7d = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "hashtag stats"
+        indexes = [
+            models.Index(fields=["-count_24h", "-count_7d", "-post_count"], name="feeds_hashtag_trending"),
+        ]
+
+    def __str__(self):
+        return f"#{self.hashtag_id}: {self.count_24h}/{self.count_7d}/{self.post_count}"
+
+
+class HashtagActivity(models.Model):
+    """
+    Number of posts using a hashtag per hour, kept for the longest trending window.
+    Attributes:
+        hashtag (ForeignKey): The hashtag being counted.
+        bucket (DateTimeField): Start of the hour the posts were created in.
+        count (IntegerField): Number of posts created in that hour using the hashtag.
+    Meta:
+        unique_together (tuple): One bucket per hashtag and hour.
+    """
+
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name="activity")
+    bucket = models.DateTimeField(db_index=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("hashtag", "bucket")
+        verbose_name_plural = "hashtag activity"
+
+    def __str__(self):
+        return f"#{self.hashtag_id} @ {self.bucket:%Y-%m-%d %H:00}: {self.count}"
+
+
+class PostSearchDocument(models.Model):
+    """
+    Searchable text of a post, maintained by ``feeds_module.search``.
+    ``body`` joins the caption, hashtags, sport and location. On PostgreSQL ``vector``
+    holds its ``tsvector`` behind a GIN index; on SQLite the same body is mirrored
+    into the ``feeds_post_fts`` FTS5 table. Both are created by migration 0006.
+    Attributes:
+        post (OneToOneField): The post the document describes.
+        body (TextField): The text the post is found by.
+        vector (SearchVectorField): ``to_tsvector`` of ``body`` (PostgreSQL only).
+        created_at (DateTimeField): Copy of ``Post.created_at``, the result order.
+    Meta:
+        indexes (list): Serves the keyset pagination of search results.
+    """
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    body = models.TextField(blank=True, default="")
+    vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-post"], name="feeds_search_recent"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id}: {self.body[:40]}"
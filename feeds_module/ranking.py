@@ -0,0 +1,214 @@
+"""
+Ranked "For You" feed for feeds_module.
+
+The feed is precomputed: ``refresh_for_you`` loads a candidate pool of recent posts
+once, scores it for every active user in NumPy batches and stores each user's best
+``FOR_YOU_SIZE`` posts as ``ForYouEntry`` rows. Serving a page is then a range scan
+over ``(user, rank)`` (``selectors.for_you_feed``); no scoring happens per request.
+
+The score of a post for a viewer is::
+
+    recency * (1 + ENGAGEMENT_WEIGHT * engagement) * (1 + FOLLOW_WEIGHT * follows_author + SPORT_WEIGHT * plays_sport)
+
+where ``recency`` halves every ``RECENCY_HALF_LIFE`` and ``engagement`` is
+``log1p(likes + COMMENT_WEIGHT * comments)``. Viewers never get their own posts.
+
+Functions:
+    candidate_pool: Loads the recent posts every feed is ranked from.
+    score_posts: Scores a candidate pool for a batch of viewers.
+    compute_for_you: Replaces the ranked feed of the given users.
+    refresh_for_you: Recomputes the ranked feed of every active user.
+"""
+
+import datetime
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from common.counters import add_pending
+from profile_module.models import Follow, UserSport
+from .models import ForYouEntry, Post
+
+CANDIDATE_WINDOW = datetime.timedelta(days=3)
+CANDIDATE_LIMIT = 2000
+FOR_YOU_SIZE = 200
+FOR_YOU_TTL = datetime.timedelta(hours=1)
+# Users who have not logged in for this long fall back to the chronological feed
+ACTIVE_WINDOW = datetime.timedelta(days=14)
+USER_BATCH_SIZE = 500
+INSERT_BATCH_SIZE = 1000
+
+RECENCY_HALF_LIFE = datetime.timedelta(hours=12)
+COMMENT_WEIGHT = 3.0
+ENGAGEMENT_WEIGHT = 0.5
+FOLLOW_WEIGHT = 2.0
+SPORT_WEIGHT = 1.0
+
+NO_SPORT = -1
+
+
+@dataclass
+class CandidatePool:
+    """
+    The posts every feed is ranked from, as parallel arrays (newest first).
+    Attributes:
+        post_ids (list): Post ids.
+        authors (ndarray): Author id of each post.
+        sports (ndarray): Sport id of each post, ``NO_SPORT`` when it has none.
+        base (ndarray): Viewer-independent part of each post's score.
+    """
+
+    post_ids: list
+    authors: np.ndarray
+    sports: np.ndarray
+    base: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+
+def candidate_pool(now: datetime.datetime | None = None) -> CandidatePool:
+    """Load the newest ``CANDIDATE_LIMIT`` posts of the last ``CANDIDATE_WINDOW``."""
+    now = now or timezone.now()
+    posts = list(
+        Post.objects
+        .filter(created_at__gt=now - CANDIDATE_WINDOW, created_at__lte=now)
+        .order_by("-created_at", "-id")
+        .only("id", "user_id", "sport_id", "created_at", "likes_count", "comments_count")[:CANDIDATE_LIMIT]
+    )
+    # Score on live engagement, not on the columns as of the last counter flush
+    add_pending(posts, "likes_count", "comments_count")
+    age = np.array([(now - post.created_at).total_seconds() for post in posts], dtype=np.float64)
+    likes = np.array([post.likes_count for post in posts], dtype=np.float64)
+    comments = np.array([post.comments_count for post in posts], dtype=np.float64)
+
+    recency = np.exp2(-age / RECENCY_HALF_LIFE.total_seconds())
+    engagement = np.log1p(np.maximum(likes + COMMENT_WEIGHT * comments, 0))
+    return CandidatePool(
+        post_ids=[post.id for post in posts],
+        authors=np.array([post.user_id for post in posts], dtype=np.int64),
+        sports=np.array([NO_SPORT if post.sport_id is None else post.sport_id for post in posts], dtype=np.int64),
+        base=recency * (1 + ENGAGEMENT_WEIGHT * engagement),
+    )
+
+
+def _membership(viewer_ids: np.ndarray, keys: np.ndarray, pairs: Sequence[tuple]) -> np.ndarray:
+    """Return a ``(viewers, keys)`` matrix, 1 where ``(viewer_id, key)`` is in ``pairs``."""
+    matrix = np.zeros((len(viewer_ids), len(keys)), dtype=np.float64)
+    if not pairs or not len(keys):
+        return matrix
+    viewers, values = np.array(pairs, dtype=np.int64).T
+    rows = np.searchsorted(viewer_ids, viewers)
+    cols = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    known = (viewer_ids[np.minimum(rows, len(viewer_ids) - 1)] == viewers) & (keys[cols] == values)
+    matrix[rows[known], cols[known]] = 1
+    return matrix
+
+
+def score_posts(pool: CandidatePool, viewer_ids: np.ndarray, follows: Sequence[tuple], user_sports: Sequence[tuple]) -> np.ndarray:
+    """
+    Score every post of ``pool`` for every viewer at once.
+    Args:
+        pool: The candidate posts.
+        viewer_ids: Sorted ids of the viewers.
+        follows: ``(follower_id, followee_id)`` pairs of the viewers.
+        user_sports: ``(user_id, sport_id)`` pairs of the viewers.
+    Returns:
+        ndarray: A ``(viewers, posts)`` matrix of scores; ``-inf`` for a viewer's own posts.
+    """
+    authors, author_index = np.unique(pool.authors, return_inverse=True)
+    sports, sport_index = np.unique(pool.sports, return_inverse=True)
+    follows_author = _membership(viewer_ids, authors, follows)[:, author_index]
+    plays_sport = _membership(viewer_ids, sports, user_sports)[:, sport_index]
+
+    scores = pool.base * (1 + FOLLOW_WEIGHT * follows_author + SPORT_WEIGHT * plays_sport)
+    scores[viewer_ids[:, None] == pool.authors[None, :]] = -np.inf
+    return scores
+
+
+def _top(scores: np.ndarray, size: int) -> np.ndarray:
+    """Return the column indices of the ``size`` best scores of each row, best first."""
+    size = min(size, scores.shape[1])
+    best = np.argpartition(-scores, size - 1, axis=1)[:, :size]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(best, order, axis=1)
+
+
+def compute_for_you(user_ids: Iterable[int], pool: CandidatePool, now: datetime.datetime | None = None) -> int:
+    """
+    Replace the ranked feed of ``user_ids`` with the best posts of ``pool``.
+    Args:
+        user_ids: The users to rank for; one query each loads their follows and sports.
+        pool: The candidate posts (see ``candidate_pool``).
+        now: The reference time, defaults to ``timezone.now()``.
+    Returns:
+        int: The number of entries stored.
+    """
+    now = now or timezone.now()
+    viewer_ids = np.unique(np.fromiter(user_ids, dtype=np.int64))
+    if not len(viewer_ids):
+        return 0
+
+    entries = []
+    if len(pool):
+        ids = viewer_ids.tolist()
+        follows = list(
+            Follow.objects.filter(follower_id__in=ids, followee_id__in=set(pool.authors.tolist()))
+            .values_list("follower_id", "followee_id")
+        )
+        user_sports = list(UserSport.objects.filter(user_id__in=ids).values_list("user_id", "sport_id"))
+        scores = score_posts(pool, viewer_ids, follows, user_sports)
+        best = _top(scores, FOR_YOU_SIZE)
+        for row, user_id in enumerate(ids):
+            columns = best[row]
+            columns = columns[np.isfinite(scores[row, columns])]
+            entries.extend(
+                ForYouEntry(
+                    user_id=user_id,
+                    post_id=pool.post_ids[column],
+                    rank=rank,
+                    score=float(scores[row, column]),
+                    expires_at=now + FOR_YOU_TTL,
+                )
+                for rank, column in enumerate(columns.tolist())
+            )
+
+    with transaction.atomic():
+        ForYouEntry.objects.filter(user_id__in=viewer_ids.tolist()).delete()
+        ForYouEntry.objects.bulk_create(entries, batch_size=INSERT_BATCH_SIZE)
+    return len(entries)
+
+
+def refresh_for_you(now: datetime.datetime | None = None) -> int:
+    """
+    Recompute the ranked feed of every user who logged in within ``ACTIVE_WINDOW``.
+    The candidate pool is loaded once and users are scored ``USER_BATCH_SIZE`` at a
+    time. Feeds left over from users who are no longer active are dropped once expired.
+    Args:
+        now: The reference time, defaults to ``timezone.now()``.
+    Returns:
+        int: The number of users processed.
+    """
+    now = now or timezone.now()
+    ForYouEntry.objects.filter(expires_at__lte=now).delete()
+    pool = candidate_pool(now)
+
+    users = (
+        User.objects
+        .filter(is_active=True, last_login__gte=now - ACTIVE_WINDOW)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    processed = 0
+    batch = []
+    for user_id in users.iterator():
+        batch.append(user_id)
+        if len(batch) == USER_BATCH_SIZE:
+            compute_for_you(batch, pool, now)
+            processed, batch = processed + len(batch), []
+    if batch:
+        compute_for_you(batch, pool, now)
+        processed += len(batch)
+    return processed
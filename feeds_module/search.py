@@ -0,0 +1,153 @@
+"""
+Full-text search over posts.
+
+Every post has a ``PostSearchDocument`` whose ``body`` joins its caption, hashtags,
+sport and location. The body is indexed with the database's own full-text engine:
+
+* PostgreSQL: ``PostSearchDocument.vector`` (``tsvector``, ``simple`` config so
+  Indonesian and English captions are tokenised alike) behind a GIN index;
+* SQLite: the ``feeds_post_fts`` FTS5 virtual table.
+
+Results are ordered newest first and paged with a keyset cursor, like the feed.
+
+Functions:
+    index_post: Creates or refreshes the search document of a post.
+    unindex_post: Removes a post from the search index.
+    rebuild_post_search_index: Re-indexes every post.
+    search_posts: Returns one page of post ids matching a query.
+"""
+
+import re
+from typing import Iterable
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from common.utils.pagination import paginate_keyset
+from .models import Post, PostHashtag, PostSearchDocument
+
+SEARCH_CONFIG = "simple"
+FTS_TABLE = "feeds_post_fts"
+SEARCH_ORDERING = ("-created_at", "-post_id")
+REBUILD_BATCH_SIZE = 500
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _document_body(post: Post, hashtags: Iterable[str]) -> str:
+    parts = [post.text, " ".join(f"#{tag}" for tag in hashtags), post.sport.name if post.sport else None, post.location_name]
+    return "\n".join(part for part in parts if part)
+
+
+def _fts_key(post_id) -> str:
+    # Django stores UUID primary keys on SQLite as 32 hex characters
+    return post_id.hex
+
+
+def _write_documents(documents: list[PostSearchDocument]) -> None:
+    PostSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["body", "created_at"],
+    )
+    post_ids = [document.post_id for document in documents]
+    if connection.vendor == "postgresql":
+        PostSearchDocument.objects.filter(post_id__in=post_ids).update(vector=SearchVector("body", config=SEARCH_CONFIG))
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE post_id = %s", [[_fts_key(pk)] for pk in post_ids])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (post_id, body) VALUES (%s, %s)",
+                [[_fts_key(document.post_id), document.body] for document in documents],
+            )
+
+
+def index_post(post: Post) -> None:
+    """Create or refresh the search document of ``post`` (call after its hashtags are saved)."""
+    hashtags = PostHashtag.objects.filter(post=post).values_list("hashtag__tag", flat=True)
+    document = PostSearchDocument(post=post, body=_document_body(post, hashtags), created_at=post.created_at)
+    with transaction.atomic():
+        _write_documents([document])
+
+
+def unindex_post(post_id) -> None:
+    """Remove a post from the search index; call before deleting the post."""
+    PostSearchDocument.objects.filter(post_id=post_id).delete()
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE post_id = %s", [_fts_key(post_id)])
+
+
+@transaction.atomic
+def rebuild_post_search_index() -> int:
+    """
+    Re-index every post from scratch.
+    Returns:
+        int: The number of posts indexed.
+    """
+    PostSearchDocument.objects.all().delete()
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    total = 0
+    posts = Post.objects.select_related("sport").order_by("pk")
+    batch = []
+    for post in posts.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        batch.append(post)
+        if len(batch) == REBUILD_BATCH_SIZE:
+            total += _index_batch(batch)
+            batch = []
+    if batch:
+        total += _index_batch(batch)
+    return total
+
+
+def _index_batch(posts: list[Post]) -> int:
+    hashtags = {post.pk: [] for post in posts}
+    for post_id, tag in PostHashtag.objects.filter(post__in=posts).values_list("post_id", "hashtag__tag"):
+        hashtags[post_id].append(tag)
+    _write_documents([
+        PostSearchDocument(post=post, body=_document_body(post, hashtags[post.pk]), created_at=post.created_at)
+        for post in posts
+    ])
+    return len(posts)
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax; the last
+    # token is a prefix match so results appear while typing
+    tokens = [f'"{token}"' for token in _TOKEN.findall(query)]
+    if tokens:
+        tokens[-1] += "*"
+    return " ".join(tokens)
+
+
+def search_posts(query: str, cursor: str | None = None, page_size: int = 10) -> tuple[list, str | None]:
+    """
+    Return one page of ids of posts matching ``query``, newest first.
+    Args:
+        query: Free text; every word must match the caption, a hashtag, the sport or the location.
+        cursor: The cursor returned for the previous page, or ``None``.
+        page_size: Number of posts per page.
+    Returns:
+        tuple: ``(post_ids, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    documents = PostSearchDocument.objects.only("post_id", "created_at")
+    if connection.vendor == "postgresql":
+        documents = documents.filter(vector=SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch"))
+    elif connection.vendor == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return [], None
+        documents = documents.filter(
+            post_id__in=RawSQL(f"SELECT post_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+    else:
+        for token in _TOKEN.findall(query):
+            documents = documents.filter(body__icontains=token)
+
+    rows, next_cursor = paginate_keyset(documents, SEARCH_ORDERING, cursor, page_size)
+    return [row.post_id for row in rows], next_cursor
@@ -0,0 +1,134 @@
+"""
+Read-side helpers for feeds_module.
+Functions:
+    following_timeline: Entries of a user's materialized following timeline.
+    for_you_feed: Entries of a user's precomputed "For You" feed.
+    for_you_backfill: Posts served newest first once the ranked "For You" entries run out.
+    trending_hashtags: The currently most used hashtags.
+    comment_threads: One page of a post's top-level comments with their reply previews.
+    comment_replies: One page of the replies to a comment.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, QuerySet, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from common.utils.pagination import paginate_keyset
+from .models import Comment, ForYouEntry, HashtagStats, Post, TimelineEntry
+
+TIMELINE_ORDERING = ("-created_at", "-post_id")
+FOR_YOU_ORDERING = ("rank",)
+LATEST_ORDERING = ("-created_at", "-id")
+TRENDING_ORDERING = ("-count_24h", "-count_7d", "-post_count")
+COMMENT_ORDERING = ("created_at", "id")
+
+
+def following_timeline(user: User) -> QuerySet:
+    """
+    Return the entries of ``user``'s following timeline, newest first.
+    Ordered by ``TIMELINE_ORDERING`` the query is a range scan over the
+    ``feeds_timeline_user_recent`` index, so its cost does not depend on how many
+    accounts the user follows.
+    """
+    return (
+        TimelineEntry.objects
+        .filter(user=user)
+        .only("post_id", "created_at")
+        .order_by(*TIMELINE_ORDERING)
+    )
+
+
+def for_you_feed(user: User) -> QuerySet:
+    """
+    Return the entries of ``user``'s ranked "For You" feed, best first.
+    Only a fresh ranking (see ``ranking.refresh_for_you``) is returned; ordered by
+    ``FOR_YOU_ORDERING`` the query is a range scan over the ``(user, rank)`` index.
+    """
+    return (
+        ForYouEntry.objects
+        .filter(user=user, expires_at__gt=timezone.now())
+        .only("post_id", "rank")
+        .order_by(*FOR_YOU_ORDERING)
+    )
+
+
+def for_you_backfill(user: User) -> QuerySet:
+    """
+    Return the posts that are not in ``user``'s fresh ranking, newest first.
+    The "For You" tab continues with these once the ranked entries run out, and serves
+    only these while the user has no ranking yet.
+    """
+    ranked = ForYouEntry.objects.filter(user=user, expires_at__gt=timezone.now()).values("post_id")
+    return Post.objects.exclude(pk__in=ranked).only("id", "created_at").order_by(*LATEST_ORDERING)
+
+
+def trending_hashtags(limit: int = 3) -> QuerySet:
+    """
+    Return the ``HashtagStats`` of the ``limit`` most used hashtags.
+    Hashtags are ranked by use in the last 24 hours, then the last 7 days, then all
+    time, which is the order of the ``feeds_hashtag_trending`` index.
+    """
+    return (
+        HashtagStats.objects
+        .select_related("hashtag")
+        .filter(post_count__gt=0)
+        .order_by(*TRENDING_ORDERING)[:limit]
+    )
+
+
+def comment_threads(post_id, cursor: str | None = None, page_size: int = 20, preview: int = 3) -> tuple[list[Comment], str | None]:
+    """
+    Return one page of the top-level comments of a post, oldest first, in two queries.
+    Each comment gets ``reply_count`` and ``preview_replies`` (its first ``preview``
+    replies); both come from a single window-function query over the page's replies.
+    Args:
+        post_id: id of the post.
+        cursor: The cursor returned for the previous page, or ``None``.
+        page_size: Number of top-level comments per page.
+        preview: Number of replies embedded per comment.
+    Returns:
+        tuple: ``(comments, next_cursor)``; ``user`` is loaded on every comment and reply.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    top_level = Comment.objects.filter(post_id=post_id, parent__isnull=True).select_related("user")
+    comments, next_cursor = paginate_keyset(top_level, COMMENT_ORDERING, cursor, page_size)
+
+    previews = {comment.id: [] for comment in comments}
+    counts = {}
+    if comments and preview > 0:
+        replies = (
+            Comment.objects.filter(parent_id__in=previews)
+            .select_related("user")
+            .annotate(
+                position=Window(RowNumber(), partition_by=F("parent_id"), order_by=[F(field).asc() for field in COMMENT_ORDERING]),
+                thread_size=Window(Count("id"), partition_by=F("parent_id")),
+            )
+            .filter(position__lte=preview)
+            .order_by("parent_id", "position")
+        )
+        for reply in replies:
+            previews[reply.parent_id].append(reply)
+            counts[reply.parent_id] = reply.thread_size
+    elif comments:
+        counts = dict(
+            Comment.objects.filter(parent_id__in=previews)
+            .values("parent_id")
+            .annotate(total=Count("id"))
+            .values_list("parent_id", "total")
+        )
+
+    for comment in comments:
+        comment.reply_count = counts.get(comment.id, 0)
+        comment.preview_replies = previews[comment.id]
+    return comments, next_cursor
+
+
+def comment_replies(comment_id, cursor: str | None = None, page_size: int = 20) -> tuple[list[Comment], str | None]:
+    """
+    Return one page of the replies to a comment, oldest first, with ``user`` loaded.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    replies = Comment.objects.filter(parent_id=comment_id).select_related("user")
+    return paginate_keyset(replies, COMMENT_ORDERING, cursor, page_size)
@@ -0,0 +1,281 @@
+"""
+Write-side helpers for feeds_module.
+Functions:
+    fan_out_post: Pushes a freshly published post to every follower's timeline.
+    backfill_timeline: Copies a followee's posts into a follower's timeline.
+    prune_timeline: Removes a followee's posts from a follower's timeline.
+    canonical_hashtag: Returns the stored form of a hashtag name.
+    parse_hashtags: Splits user input into canonical hashtag names.
+    resolve_hashtags: Returns the ids of hashtags by name, creating missing ones.
+    set_post_hashtags: Links a post to exactly the given hashtags, keeping the rollup in step.
+    forget_post_hashtags: Removes a post's hashtags from the trending rollup.
+    refresh_hashtag_stats: Re-derives the windowed hashtag counts so old posts age out.
+    rebuild_hashtag_stats: Recomputes the whole hashtag rollup from ``PostHashtag``.
+    toggle_like: Likes or unlikes a post through the sharded ``likes_count`` counter.
+"""
+
+import datetime
+import re
+import unicodedata
+from typing import Iterable
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+from common.cache import bump_namespace
+from common.counters import increment, read_counters
+from profile_module.models import Follow
+from .models import Hashtag, HashtagActivity, HashtagStats, Post, PostHashtag, PostLike, TimelineEntry
+
+TIMELINE_BATCH_SIZE = 500
+
+# HashtagStats field -> how far back it counts posts
+TRENDING_WINDOWS = {
+    "count_24h": datetime.timedelta(hours=24),
+    "count_7d": datetime.timedelta(days=7),
+}
+ACTIVITY_RETENTION = max(TRENDING_WINDOWS.values())
+
+HASHTAG_MAX_LENGTH = Hashtag._meta.get_field("tag").max_length
+_HASHTAG_SEPARATORS = re.compile(r"[,\s]+")
+
+
+def fan_out_post(post: Post) -> None:
+    """Deliver ``post`` to the timeline of every user following its author."""
+    follower_ids = Follow.objects.filter(followee_id=post.user_id).values_list("follower_id", flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post=post, created_at=post.created_at) for follower_id in follower_ids],
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_timeline(follower: User, followee: User) -> None:
+    """Copy every post of ``followee`` into the timeline of ``follower``."""
+    posts = Post.objects.filter(user=followee).values_list("id", "created_at")
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=follower, post_id=post_id, created_at=created_at) for post_id, created_at in posts],
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_timeline(follower: User, followee: User) -> None:
+    """Remove every post of ``followee`` from the timeline of ``follower``."""
+    TimelineEntry.objects.filter(user=follower, post__user=followee).delete()
+
+
+def _hour(when: datetime.datetime) -> datetime.datetime:
+    return when.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _apply_hashtag_delta(hashtag_ids: Iterable, created_at: datetime.datetime, delta: int) -> None:
+    """
+    Add ``delta`` posts created at ``created_at`` to the counters of ``hashtag_ids``.
+    Counters never go below zero, and a removal does not create rows for hashtags or
+    hours that were never counted.
+    """
+    hashtag_ids = list(set(hashtag_ids))
+    if not hashtag_ids:
+        return
+
+    now = timezone.now()
+    changes = {"post_count": Greatest(F("post_count") + delta, Value(0))}
+    for field, window in TRENDING_WINDOWS.items():
+        if created_at >= now - window:
+            changes[field] = Greatest(F(field) + delta, Value(0))
+
+    with transaction.atomic():
+        if delta > 0:
+            HashtagStats.objects.bulk_create(
+                [HashtagStats(hashtag_id=hashtag_id) for hashtag_id in hashtag_ids], ignore_conflicts=True
+            )
+        HashtagStats.objects.filter(hashtag_id__in=hashtag_ids).update(**changes)
+
+        if created_at >= now - ACTIVITY_RETENTION:
+            bucket = _hour(created_at)
+            if delta > 0:
+                HashtagActivity.objects.bulk_create(
+                    [HashtagActivity(hashtag_id=hashtag_id, bucket=bucket) for hashtag_id in hashtag_ids],
+                    ignore_conflicts=True,
+                )
+            HashtagActivity.objects.filter(hashtag_id__in=hashtag_ids, bucket=bucket).update(
+                count=Greatest(F("count") + delta, Value(0))
+            )
+
+    bump_namespace("hashtags")
+
+
+def canonical_hashtag(name: str) -> str | None:
+    """
+    Return the form a hashtag is stored under: Unicode-normalized (NFKC), without the
+    leading ``#`` and case-folded, so ``#Run`` and ``run`` are the same tag.
+    Returns:
+        str | None: The canonical name, or ``None`` if it is empty or too long to store.
+    """
+    tag = unicodedata.normalize("NFKC", name).strip().lstrip("#").casefold()
+    if not tag or len(tag) > HASHTAG_MAX_LENGTH:
+        return None
+    return tag
+
+
+def parse_hashtags(raw: str | None) -> list[str]:
+    """Split comma- or space-separated user input into unique canonical names, in order."""
+    tags = (canonical_hashtag(name) for name in _HASHTAG_SEPARATORS.split(raw or ""))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def resolve_hashtags(names: Iterable[str]) -> dict[str, int]:
+    """
+    Map hashtag names to ``Hashtag`` ids, creating the missing ones.
+    Costs one ``INSERT ... ON CONFLICT DO NOTHING`` and one ``SELECT`` however many
+    tags there are, and is safe against concurrent requests creating the same tag.
+    Args:
+        names: Hashtag names in any form; they are canonicalized here.
+    Returns:
+        dict: Canonical name -> hashtag id.
+    """
+    tags = list(dict.fromkeys(tag for tag in map(canonical_hashtag, names) if tag))
+    if not tags:
+        return {}
+    Hashtag.objects.bulk_create([Hashtag(tag=tag) for tag in tags], ignore_conflicts=True)
+    return dict(Hashtag.objects.filter(tag__in=tags).values_list("tag", "id"))
+
+
+def set_post_hashtags(post: Post, names: Iterable[str]) -> tuple[set, set]:
+    """
+    Link ``post`` to exactly the hashtags in ``names``, on creation and on edit alike.
+    Only the difference with the current links is written (one delete and one insert at
+    most) and counted in the trending rollup, so call it once ``created_at`` is final.
+    Args:
+        post: A saved post.
+        names: The post's hashtags in any form; they are canonicalized here.
+    Returns:
+        tuple: ``(added, removed)`` sets of hashtag ids.
+    """
+    wanted = set(resolve_hashtags(names).values())
+    with transaction.atomic():
+        current = set(PostHashtag.objects.filter(post=post).values_list("hashtag_id", flat=True))
+        added, removed = wanted - current, current - wanted
+        if removed:
+            PostHashtag.objects.filter(post=post, hashtag_id__in=removed).delete()
+            _apply_hashtag_delta(removed, post.created_at, -1)
+        if added:
+            PostHashtag.objects.bulk_create(
+                [PostHashtag(post=post, hashtag_id=hashtag_id) for hashtag_id in added], ignore_conflicts=True
+            )
+            _apply_hashtag_delta(added, post.created_at, 1)
+    return added, removed
+
+
+def forget_post_hashtags(post: Post) -> None:
+    """Uncount ``post`` from its hashtags; runs from a ``pre_delete`` receiver on every post delete."""
+    hashtag_ids = PostHashtag.objects.filter(post=post).values_list("hashtag_id", flat=True)
+    _apply_hashtag_delta(hashtag_ids, post.created_at, -1)
+
+
+def refresh_hashtag_stats(now: datetime.datetime | None = None) -> int:
+    """
+    Re-derive ``count_24h`` and ``count_7d`` from the hourly activity buckets.
+    The incremental updates only ever add recent posts to the windows; this is what
+    moves posts out of them again, so it should run periodically (e.g. hourly).
+    Windows are counted in whole hours.
+    Args:
+        now: the reference time, defaults to ``timezone.now()``.
+    Returns:
+        int: number of ``HashtagStats`` rows whose windowed counts changed.
+    """
+    now = now or timezone.now()
+    HashtagActivity.objects.filter(bucket__lt=_hour(now - ACTIVITY_RETENTION)).delete()
+
+    totals = {}
+    for field, window in TRENDING_WINDOWS.items():
+        rows = (
+            HashtagActivity.objects
+            .filter(bucket__gte=_hour(now - window))
+            .values("hashtag_id")
+            .annotate(total=Sum("count"))
+        )
+        for row in rows:
+            totals.setdefault(row["hashtag_id"], dict.fromkeys(TRENDING_WINDOWS, 0))[field] = row["total"]
+
+    # Only rows that currently have, or had, windowed activity need touching
+    stale = HashtagStats.objects.exclude(**dict.fromkeys(TRENDING_WINDOWS, 0)).values_list("hashtag_id", flat=True)
+    changed = []
+    for stats in HashtagStats.objects.filter(hashtag_id__in=set(stale) | set(totals)):
+        counts = totals.get(stats.hashtag_id, dict.fromkeys(TRENDING_WINDOWS, 0))
+        if any(getattr(stats, field) != value for field, value in counts.items()):
+            for field, value in counts.items():
+                setattr(stats, field, value)
+            stats.updated_at = now
+            changed.append(stats)
+
+    HashtagStats.objects.bulk_update(changed, [*TRENDING_WINDOWS, "updated_at"], batch_size=TIMELINE_BATCH_SIZE)
+    if changed:
+        bump_namespace("hashtags")
+    return len(changed)
+
+
+def rebuild_hashtag_stats(now: datetime.datetime | None = None) -> None:
+    """Recompute every hashtag counter from ``PostHashtag``, repairing any drift."""
+    now = now or timezone.now()
+    post_counts = PostHashtag.objects.values("hashtag_id").annotate(total=Count("id"))
+    activity = (
+        PostHashtag.objects
+        .filter(post__created_at__gte=_hour(now - ACTIVITY_RETENTION))
+        .annotate(bucket=TruncHour("post__created_at", tzinfo=datetime.timezone.utc))
+        .values("hashtag_id", "bucket")
+        .annotate(total=Count("id"))
+    )
+
+    with transaction.atomic():
+        HashtagStats.objects.all().delete()
+        HashtagActivity.objects.all().delete()
+        HashtagStats.objects.bulk_create(
+            [HashtagStats(hashtag_id=row["hashtag_id"], post_count=row["total"], updated_at=now) for row in post_counts],
+            batch_size=TIMELINE_BATCH_SIZE,
+        )
+        HashtagActivity.objects.bulk_create(
+            [HashtagActivity(hashtag_id=row["hashtag_id"], bucket=row["bucket"], count=row["total"]) for row in activity],
+            batch_size=TIMELINE_BATCH_SIZE,
+        )
+        refresh_hashtag_stats(now)
+
+    bump_namespace("hashtags")
+
+
+
+def toggle_like(user: User, post_id) -> tuple[bool, int] | None:
+    """
+    Like ``post_id`` for ``user``, or unlike it if already liked.
+    The ``PostLike`` row is written right away; ``likes_count`` goes through a sharded
+    counter, so concurrent likers of a popular post never queue on its row lock. The
+    returned count is the counter read before the write plus this change, which saves
+    reading the post back.
+    Returns:
+        tuple | None: ``(liked, likes_count)``, or ``None`` if no post has id ``post_id``.
+    """
+    try:
+        counts = read_counters(Post, post_id, "likes_count")
+    except ValidationError:
+        counts = None
+    if counts is None:
+        return None
+
+    with transaction.atomic():
+        deleted, _ = PostLike.objects.filter(post_id=post_id, user=user).delete()
+        if deleted:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    PostLike.objects.create(post_id=post_id, user=user)
+                liked, delta = True, 1
+            except IntegrityError:
+                # A concurrent tap liked it first and already counted it
+                liked, delta = True, 0
+        if delta:
+            increment(Post, post_id, "likes_count", delta)
+    return liked, max(counts["likes_count"] + delta, 0)
@@ -0,0 +1,16 @@
+"""
+Signal receivers for feeds_module.
+Keeps the trending hashtag rollup in step with posts deleted through any path
+(the delete view, the admin, ``QuerySet.delete()`` or a cascade from the author).
+"""
+
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from .models import Post
+from .services import forget_post_hashtags
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_hashtags_on_delete(sender, instance, **kwargs):
+    """Uncount a post from its hashtags while its ``PostHashtag`` rows still exist."""
+    forget_post_hashtags(instance)
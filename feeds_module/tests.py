@@ -1,12 +1,42 @@
+import importlib
+from io import StringIO
 import json
+import datetime
+import cloudinary
 from unittest.mock import patch
-from django.test import TestCase, Client
+import pathlib
+import tempfile
+import threading
+import numpy as np
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
+from django.apps import apps as django_apps
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import Post, PostLike, Comment, PostHashtag
-from common.models import Sport, Hashtag
-from profile_module.models import Profile
+from .models import (
+    Post, PostImage, PostLike, Comment, PostHashtag, TimelineEntry, HashtagActivity, HashtagStats, ForYouEntry,
+)
+from .hydration import hydrate_posts
+from .selectors import trending_hashtags
+from .services import (
+    canonical_hashtag, fan_out_post, parse_hashtags, rebuild_hashtag_stats, refresh_hashtag_stats,
+    resolve_hashtags, set_post_hashtags,
+)
+from .search import index_post, rebuild_post_search_index, search_posts
+from . import impressions, ranking
+from common.models import Sport, Hashtag, CounterShard
+from common.counters import flush_counters, increment, read_counters
+from common import geo
+from common import media as common_media
+from common.choices import MediaStatus
+from common.media import enqueue_upload, process_pending_uploads, process_upload
+from common.models import MediaUpload
+from profile_module.models import Profile, Follow, UserSport
 
 class FeedsModelTests(TestCase):
     """
@@ -97,7 +127,8 @@ class FeedsViewTests(TestCase):
             'text': 'Image Post',
             'image': img
         }
-        response = self.client.post(self.create_url, data)
+        with tempfile.TemporaryDirectory() as spool, self.settings(MEDIA_SPOOL_DIR=spool):
+            response = self.client.post(self.create_url, data)
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Post.objects.filter(text='Image Post').exists())
 
@@ -206,4 +237,896 @@ class FeedsAPITests(TestCase):
         data = response.json()
         self.assertIn('posts', data)
         self.assertGreaterEqual(len(data['posts']), 1)
-        self.assertEqual(data['posts'][0]['text'], 'API Post')
\ No newline at end of file
+        self.assertEqual(data['posts'][0]['text'], 'API Post')
+
+class FeedsTimelineTests(TestCase):
+    """
+    Test suite untuk materialized following timeline (fan-out on write).
+    """
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='reader', password='password')
+        self.author = User.objects.create_user(username='author', password='password')
+        self.stranger = User.objects.create_user(username='stranger', password='password')
+        Profile.objects.create(user=self.user, display_name="Reader")
+        Profile.objects.create(user=self.author, display_name="Author")
+        Profile.objects.create(user=self.stranger, display_name="Stranger")
+
+    def test_follow_backfills_timeline(self):
+        post = Post.objects.create(user=self.author, text="Before follow")
+        Follow.objects.create(follower=self.user, followee=self.author)
+
+        entry = TimelineEntry.objects.get(user=self.user)
+        self.assertEqual(entry.post, post)
+        self.assertEqual(entry.created_at, post.created_at)
+
+    def test_unfollow_prunes_timeline(self):
+        Post.objects.create(user=self.author, text="Author post")
+        follow = Follow.objects.create(follower=self.user, followee=self.author)
+        follow.delete()
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_create_post_ajax_fans_out_to_followers(self):
+        Follow.objects.create(follower=self.user, followee=self.author)
+        self.client.login(username='author', password='password')
+
+        self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Fresh post'})
+
+        post = Post.objects.get(text='Fresh post')
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.stranger).exists())
+
+    def test_following_tab_reads_timeline(self):
+        Follow.objects.create(follower=self.user, followee=self.author)
+        fan_out_post(Post.objects.create(user=self.author, text="Followed post"))
+        Post.objects.create(user=self.stranger, text="Not followed")
+        self.client.login(username='reader', password='password')
+
+        response = self.client.get(reverse('feeds_module:load_more_posts_api'), {'tab': 'following'})
+
+        texts = [p['text'] for p in response.json()['posts']]
+        self.assertEqual(texts, ['Followed post'])
+
+
+class FeedsCursorPaginationTests(TestCase):
+    """
+    Test suite untuk keyset (cursor) pagination pada feed endpoints.
+    """
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='scroller', password='password')
+        Profile.objects.create(user=self.user, display_name="Scroller")
+        for i in range(12):
+            Post.objects.create(user=self.user, text=f"Post {i}")
+        self.client.login(username='scroller', password='password')
+        self.url = reverse('feeds_module:load_more_posts_api')
+
+    def test_cursor_walks_every_post_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            data = self.client.get(self.url, params).json()
+            seen.extend(p['id'] for p in data['posts'])
+            cursor = data['next_cursor']
+            if not data['has_next']:
+                break
+            self.assertIsNotNone(cursor)
+
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(len(set(seen)), 12)
+
+    def test_cursor_page_runs_no_count_query(self):
+        first = self.client.get(self.url).json()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {'cursor': first['next_cursor']})
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_legacy_page_number_still_works(self):
+        data = self.client.get(self.url, {'page': 3}).json()
+        self.assertEqual([p['text'] for p in data['posts']], ['Post 1', 'Post 0'])
+        self.assertFalse(data['has_next'])
+        self.assertIsNone(data['next_page_number'])
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ForYouRankingTests(TestCase):
+    """
+    Test suite untuk feed "For You" yang diranking secara batch (ForYouEntry).
+    """
+    def setUp(self):
+        self.client = Client()
+        self.sport = Sport.objects.create(name='Running')
+        self.viewer = User.objects.create_user(username='viewer', password='password')
+        self.friend = User.objects.create_user(username='friend', password='password')
+        self.stranger = User.objects.create_user(username='stranger', password='password')
+        for user in (self.viewer, self.friend, self.stranger):
+            Profile.objects.create(user=user, display_name=user.username)
+        Follow.objects.create(follower=self.viewer, followee=self.friend)
+        UserSport.objects.create(user=self.viewer, sport=self.sport, time_elapsed=datetime.timedelta(0))
+        self.client.login(username='viewer', password='password')
+        self.url = reverse('feeds_module:load_more_posts_api')
+
+        now = timezone.now()
+        self.fresh = Post.objects.create(user=self.stranger, text='Fresh', created_at=now)
+        self.followed = Post.objects.create(user=self.friend, text='Followed', created_at=now - datetime.timedelta(hours=6))
+        self.sporty = Post.objects.create(user=self.stranger, text='Sporty', sport=self.sport, created_at=now - datetime.timedelta(hours=4))
+        self.stale = Post.objects.create(user=self.stranger, text='Stale', created_at=now - datetime.timedelta(days=2))
+        self.own = Post.objects.create(user=self.viewer, text='Own', created_at=now - datetime.timedelta(hours=1))
+
+    def _texts(self, **params):
+        return [post['text'] for post in self.client.get(self.url, params).json()['posts']]
+
+    def test_score_posts_is_vectorized_per_viewer(self):
+        pool = ranking.CandidatePool(
+            post_ids=['a', 'b', 'c'],
+            authors=np.array([1, 2, 3]),
+            sports=np.array([ranking.NO_SPORT, 7, ranking.NO_SPORT]),
+            base=np.array([1.0, 1.0, 1.0]),
+        )
+        scores = ranking.score_posts(pool, np.array([1, 5]), follows=[(5, 3)], user_sports=[(1, 7)])
+        self.assertEqual(scores.shape, (2, 3))
+        self.assertEqual(scores[0, 0], -np.inf)
+        self.assertEqual(scores[0, 1], 1 + ranking.SPORT_WEIGHT)
+        self.assertEqual(list(scores[1]), [1.0, 1.0, 1 + ranking.FOLLOW_WEIGHT])
+
+    def test_refresh_ranks_by_affinity_and_recency(self):
+        # Only the viewer has logged in recently
+        self.assertEqual(ranking.refresh_for_you(), 1)
+
+        # Ranked posts first, then the rest newest first
+        self.assertEqual(self._texts(), ['Followed', 'Sporty', 'Fresh', 'Stale', 'Own'])
+        self.assertFalse(ForYouEntry.objects.filter(user=self.viewer, post=self.own).exists())
+
+    def _walk(self, cursor=None):
+        pages = []
+        with patch('feeds_module.views.FEED_PAGE_SIZE', 2):
+            while True:
+                page = self.client.get(self.url, {'cursor': cursor} if cursor else {}).json()
+                pages.append([p['text'] for p in page['posts']])
+                if not page['has_next']:
+                    return pages
+                cursor = page['next_cursor']
+
+    def test_cursor_walks_ranked_feed_then_newest_first(self):
+        ranking.refresh_for_you()
+        self.assertEqual(self._walk(), [['Followed', 'Sporty'], ['Fresh', 'Stale'], ['Own']])
+
+    def test_legacy_page_numbers_continue_past_the_ranking(self):
+        ranking.refresh_for_you()
+        with patch('feeds_module.views.FEED_PAGE_SIZE', 2):
+            pages = [self._texts(page=page) for page in (1, 2, 3)]
+        self.assertEqual(pages, [['Followed', 'Sporty'], ['Fresh', 'Stale'], ['Own']])
+
+    def test_cursor_survives_ranking_appearing_and_expiring(self):
+        with patch('feeds_module.views.FEED_PAGE_SIZE', 2):
+            newest = self.client.get(self.url).json()
+            ranking.refresh_for_you()
+            ranked = self.client.get(self.url).json()
+        self.assertEqual([p['text'] for p in newest['posts']], ['Fresh', 'Own'])
+        # The ranking covers every post but the viewer's own, so the old cursor only has that left
+        self.assertEqual(self._walk(newest['next_cursor']), [[]])
+
+        ForYouEntry.objects.update(expires_at=timezone.now())
+        self.assertEqual(self._walk(ranked['next_cursor']), [['Fresh', 'Own'], ['Sporty', 'Followed'], ['Stale']])
+
+    def test_engagement_lifts_a_post(self):
+        Post.objects.filter(pk=self.fresh.pk).update(likes_count=500, comments_count=50)
+        ranking.refresh_for_you()
+        self.assertEqual(self._texts()[0], 'Fresh')
+
+    def test_falls_back_to_newest_first_without_fresh_ranking(self):
+        ranking.refresh_for_you(now=timezone.now() - ranking.FOR_YOU_TTL - datetime.timedelta(minutes=1))
+        self.assertEqual(self._texts(), ['Fresh', 'Own', 'Sporty', 'Followed', 'Stale'])
+
+    def test_inactive_users_are_not_ranked(self):
+        User.objects.filter(pk=self.viewer.pk).update(last_login=timezone.now() - ranking.ACTIVE_WINDOW * 2)
+        self.assertEqual(ranking.refresh_for_you(), 0)
+        self.assertFalse(ForYouEntry.objects.exists())
+
+
+class NearbyPostsTests(TestCase):
+    """
+    Test suite untuk geohash dan API "posts near me".
+    """
+    MONAS = (-6.175392, 106.827153)
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='local', password='password')
+        Profile.objects.create(user=self.user, display_name="Local")
+        self.client.login(username='local', password='password')
+        self.url = reverse('feeds_module:nearby_posts_api')
+        self.near = Post.objects.create(user=self.user, text='Near', location_lat='-6.180000', location_lng='106.830000')
+        self.mid = Post.objects.create(user=self.user, text='Mid', location_lat='-6.200000', location_lng='106.845000')
+        self.far = Post.objects.create(user=self.user, text='Bandung', location_lat='-6.917500', location_lng='107.619100')
+        Post.objects.create(user=self.user, text='Nowhere')
+
+    def _get(self, **params):
+        lat, lng = self.MONAS
+        return self.client.get(self.url, {'lat': lat, 'lng': lng, **params})
+
+    def test_geohash_and_haversine(self):
+        self.assertEqual(geo.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        Post.objects.create(user=self.user, text='Timur', location_lat='0', location_lng='1')
+        Post.objects.create(user=self.user, text='Utara', location_lat='1', location_lng='0')
+        distances = (
+            Post.objects.filter(text__in=['Timur', 'Utara'])
+            .annotate(distance=geo.distance_km(0.0, 0.0)).values_list('distance', flat=True)
+        )
+        np.testing.assert_allclose(sorted(distances), [111.195, 111.195], atol=0.01)
+        self.assertLessEqual(len(geo.covering_cells(geo.bounding_box(*self.MONAS, geo.MAX_RADIUS_KM))), geo.MAX_CELLS)
+
+    def test_save_maintains_geohash(self):
+        self.assertEqual(self.near.geohash, geo.encode_geohash(-6.18, 106.83))
+        self.assertIsNone(Post.objects.get(text='Nowhere').geohash)
+
+        self.near.location_lat, self.near.location_lng = self.far.location_lat, self.far.location_lng
+        self.near.save(update_fields=['location_lat', 'location_lng'])
+        self.assertEqual(Post.objects.get(pk=self.near.pk).geohash, self.far.geohash)
+
+    def test_nearby_orders_by_distance_within_radius(self):
+        data = self._get(radius=5).json()
+        self.assertEqual([post['text'] for post in data['posts']], ['Near', 'Mid'])
+        self.assertLess(data['posts'][0]['distance_km'], data['posts'][1]['distance_km'])
+        self.assertFalse(data['has_next'])
+
+        data = self._get(radius=200).json()
+        self.assertEqual([post['text'] for post in data['posts']], ['Near', 'Mid'])
+
+    def test_cursor_walks_nearby_posts(self):
+        Post.objects.create(user=self.user, text='Same spot', location_lat='-6.180000', location_lng='106.830000')
+        with patch('feeds_module.views.NEARBY_PAGE_SIZE', 2):
+            first = self._get().json()
+            rest = self._get(cursor=first['next_cursor']).json()
+        self.assertTrue(first['has_next'])
+        texts = [post['text'] for post in first['posts'] + rest['posts']]
+        self.assertEqual(sorted(texts[:2]), ['Near', 'Same spot'])
+        self.assertEqual(texts[2:], ['Mid'])
+
+    def test_cursor_pages_match_the_full_distance_ordering(self):
+        # Titik tersebar sampai ~20 km; tiap halaman dibatasi LIMIT, tidak memindai ulang semuanya
+        lat, lng = self.MONAS
+        for i in range(24):
+            Post.objects.create(
+                user=self.user, text=f'Titik {i}',
+                location_lat=f'{lat + (i % 5 - 2) * 0.03 + i * 0.001:.6f}', location_lng=f'{lng + (i % 7 - 3) * 0.025:.6f}',
+            )
+        everything, _ = geo.nearby(Post.objects.all(), lat, lng, 20, page_size=100)
+        self.assertEqual(len(everything), 26)
+
+        walked, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page, cursor = geo.nearby(Post.objects.all(), lat, lng, 20, cursor, page_size=4)
+            self.assertTrue(all('LIMIT 5' in q['sql'] for q in queries.captured_queries))
+            walked.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(walked, everything)
+        self.assertEqual([d for _, d in walked], sorted(d for _, d in walked))
+        self.assertTrue(all(d <= 20 for _, d in walked))
+
+    def test_invalid_query_returns_400(self):
+        self.assertEqual(self.client.get(self.url, {'lat': 'x', 'lng': '1'}).status_code, 400)
+        self.assertEqual(self._get(radius=-1).status_code, 400)
+        self.assertEqual(self._get(cursor='not-a-cursor').status_code, 400)
+
+    def test_create_post_with_coordinates(self):
+        self.client.post(reverse('feeds_module:create_post_ajax'), {
+            'text': 'Lari pagi', 'location_lat': '-6.175400', 'location_lng': '106.827200',
+        })
+        self.assertEqual(Post.objects.get(text='Lari pagi').geohash, geo.encode_geohash(-6.1754, 106.8272))
+        response = self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Half', 'location_lat': '-6.1'})
+        self.assertEqual(response.json()['status'], 'error')
+
+
+class PostHydrationTests(TestCase):
+    """
+    Test suite untuk batched post hydration (hydrate_posts).
+    """
+    def setUp(self):
+        config = cloudinary.config()
+        self.addCleanup(setattr, config, 'cloud_name', config.cloud_name)
+        config.cloud_name = 'movezz-test'
+
+        self.user = User.objects.create_user(username='hydrator', password='password')
+        Profile.objects.create(user=self.user, display_name="Hydrator")
+        self.sport = Sport.objects.create(name='Tennis')
+        self.tag = Hashtag.objects.create(tag='serve')
+        self.posts = []
+        for i in range(5):
+            post = Post.objects.create(user=self.user, text=f"Hydrate {i}", sport=self.sport)
+            PostHashtag.objects.create(post=post, hashtag=self.tag)
+            PostImage.objects.create(post=post, image=f"post/img_{i}")
+            self.posts.append(post)
+        PostLike.objects.create(post=self.posts[0], user=self.user)
+
+    def test_fixed_number_of_queries(self):
+        ids = [post.id for post in self.posts]
+        with self.assertNumQueries(5):
+            hydrated = hydrate_posts(ids, self.user)
+
+        self.assertEqual([p['id'] for p in hydrated], ids)
+        self.assertEqual(hydrated[0]['hashtags'], ['serve'])
+        self.assertEqual(hydrated[0]['sport'], 'Tennis')
+        self.assertEqual(hydrated[0]['author_display_name'], 'Hydrator')
+        self.assertEqual(len(hydrated[0]['image_urls']), 1)
+        self.assertTrue(hydrated[0]['has_liked'])
+        self.assertFalse(hydrated[1]['has_liked'])
+
+    def test_missing_ids_are_skipped(self):
+        self.assertEqual(hydrate_posts([]), [])
+        self.posts[1].delete()
+        hydrated = hydrate_posts([post.id for post in self.posts])
+        self.assertEqual(len(hydrated), 4)
+
+    def test_main_view_renders_hydrated_cards(self):
+        self.client.login(username='hydrator', password='password')
+        response = self.client.get(reverse('feeds_module:main_view'))
+        self.assertContains(response, '#serve')
+        self.assertContains(response, '#Tennis')
+        self.assertContains(response, 'img_4')
+
+
+class HashtagStatsTests(TestCase):
+    """
+    Test suite untuk rollup trending hashtags (HashtagStats).
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='tagger', password='password')
+        Profile.objects.create(user=self.user, display_name="Tagger")
+        self.client.login(username='tagger', password='password')
+
+    def _stats(self, tag):
+        return HashtagStats.objects.get(hashtag__tag=tag)
+
+    def test_create_and_delete_post_update_stats(self):
+        self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Leg day', 'hashtags': 'gym, run'})
+
+        stats = self._stats('gym')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (1, 1, 1))
+
+        post = Post.objects.get(text='Leg day')
+        self.client.post(reverse('profile_module:post_delete', args=[post.pk]))
+
+        stats = self._stats('gym')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (0, 0, 0))
+        self.assertEqual(list(trending_hashtags()), [])
+
+    def test_refresh_ages_posts_out_of_windows(self):
+        post = Post.objects.create(user=self.user, text='Long run')
+        set_post_hashtags(post, ['marathon'])
+
+        refresh_hashtag_stats(timezone.now() + datetime.timedelta(days=2))
+        stats = self._stats('marathon')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (1, 0, 1))
+
+        refresh_hashtag_stats(timezone.now() + datetime.timedelta(days=8))
+        stats = self._stats('marathon')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (1, 0, 0))
+
+    def test_trending_prefers_recent_activity(self):
+        old_tag = Hashtag.objects.create(tag='classic')
+        new_tag = Hashtag.objects.create(tag='fresh')
+        for i in range(3):
+            post = Post.objects.create(user=self.user, text=f'Old {i}', created_at=timezone.now() - datetime.timedelta(days=30))
+            PostHashtag.objects.create(post=post, hashtag=old_tag)
+        post = Post.objects.create(user=self.user, text='New')
+        PostHashtag.objects.create(post=post, hashtag=new_tag)
+        rebuild_hashtag_stats()
+
+        with self.assertNumQueries(1):
+            ranked = [stats.hashtag.tag for stats in trending_hashtags()]
+        self.assertEqual(ranked, ['fresh', 'classic'])
+        self.assertEqual(self._stats('classic').post_count, 3)
+
+        response = self.client.get(reverse('feeds_module:main_view'))
+        self.assertContains(response, '#fresh')
+        self.assertContains(response, '1 posts today')
+
+    def test_removal_never_goes_negative_or_creates_rows(self):
+        post = Post.objects.create(user=self.user, text='Sekali')
+        set_post_hashtags(post, ['counted'])
+        # Linked without being counted, and a counter that already drifted to zero
+        PostHashtag.objects.create(post=post, hashtag=Hashtag.objects.create(tag='uncounted'))
+        HashtagStats.objects.filter(hashtag__tag='counted').update(count_7d=0)
+
+        Post.objects.filter(pk=post.pk).delete()
+
+        stats = self._stats('counted')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (0, 0, 0))
+        self.assertEqual(HashtagActivity.objects.get(hashtag__tag='counted').count, 0)
+        self.assertFalse(HashtagStats.objects.filter(hashtag__tag='uncounted').exists())
+        self.assertFalse(HashtagActivity.objects.filter(hashtag__tag='uncounted').exists())
+
+    def test_every_delete_path_uncounts_hashtags(self):
+        author = User.objects.create_user(username='leaver', password='password')
+        for i in range(2):
+            set_post_hashtags(Post.objects.create(user=author, text=f'Pergi {i}'), ['farewell'])
+        set_post_hashtags(Post.objects.create(user=self.user, text='Tetap'), ['farewell'])
+        self.assertEqual(self._stats('farewell').post_count, 3)
+
+        author.delete()
+
+        stats = self._stats('farewell')
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (1, 1, 1))
+        refresh_hashtag_stats()
+        self.assertEqual(self._stats('farewell').count_24h, 1)
+
+
+class HashtagServiceTests(TestCase):
+    """
+    Test suite untuk kanonikalisasi hashtag dan penautan massal ke post.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='tagwriter', password='password')
+        Profile.objects.create(user=self.user, display_name="Tag Writer")
+        self.client.login(username='tagwriter', password='password')
+
+    def _tags(self, post):
+        return sorted(PostHashtag.objects.filter(post=post).values_list('hashtag__tag', flat=True))
+
+    def test_canonicalization(self):
+        self.assertEqual(canonical_hashtag(' #Run '), 'run')
+        self.assertEqual(canonical_hashtag('ＧＹＭ'), 'gym')
+        self.assertIsNone(canonical_hashtag('#'))
+        self.assertIsNone(canonical_hashtag('x' * 51))
+        self.assertEqual(parse_hashtags('#Run, run,RUN  gym'), ['run', 'gym'])
+
+    def test_create_post_merges_case_variants(self):
+        Hashtag.objects.create(tag='run')
+        self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Pagi', 'hashtags': '#Run, RUN, Gym'})
+
+        post = Post.objects.get(text='Pagi')
+        self.assertEqual(self._tags(post), ['gym', 'run'])
+        self.assertEqual(Hashtag.objects.count(), 2)
+        self.assertEqual(HashtagStats.objects.get(hashtag__tag='run').post_count, 1)
+
+    def test_resolve_costs_two_queries(self):
+        Hashtag.objects.create(tag='swim')
+        with self.assertNumQueries(2):
+            ids = resolve_hashtags(['Swim', 'bike', 'run', 'bike'])
+        self.assertEqual(set(ids), {'swim', 'bike', 'run'})
+        self.assertEqual(Hashtag.objects.count(), 3)
+
+    def test_edit_relinks_only_the_difference(self):
+        post = Post.objects.create(user=self.user, text='Sore')
+        set_post_hashtags(post, ['gym', 'run'])
+        run_link = PostHashtag.objects.get(post=post, hashtag__tag='run')
+
+        response = self.client.post(reverse('profile_module:post_update', args=[post.pk]), {'hashtags': 'Run, swim'})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self._tags(post), ['run', 'swim'])
+        self.assertTrue(PostHashtag.objects.filter(pk=run_link.pk).exists())
+        counts = dict(HashtagStats.objects.values_list('hashtag__tag', 'post_count'))
+        self.assertEqual(counts, {'gym': 0, 'run': 1, 'swim': 1})
+
+    def test_migration_merges_existing_variants(self):
+        merge_hashtags = importlib.import_module('feeds_module.migrations.0009_canonical_hashtags').merge_hashtags
+        upper, lower = Hashtag.objects.create(tag='Run'), Hashtag.objects.create(tag='run')
+        first = Post.objects.create(user=self.user, text='Satu')
+        second = Post.objects.create(user=self.user, text='Dua')
+        PostHashtag.objects.create(post=first, hashtag=upper)
+        PostHashtag.objects.create(post=first, hashtag=lower)
+        PostHashtag.objects.create(post=second, hashtag=upper)
+        Hashtag.objects.create(tag='Gym')
+
+        merge_hashtags(django_apps, None)
+
+        self.assertEqual(sorted(Hashtag.objects.values_list('tag', flat=True)), ['gym', 'run'])
+        self.assertEqual(Hashtag.objects.get(tag='run').pk, lower.pk)
+        self.assertEqual(PostHashtag.objects.filter(hashtag=lower).count(), 2)
+        stats = HashtagStats.objects.get(hashtag=lower)
+        self.assertEqual((stats.post_count, stats.count_24h, stats.count_7d), (2, 2, 2))
+
+
+class PostSearchTests(TestCase):
+    """
+    Test suite untuk pencarian full-text post (PostSearchDocument + FTS5).
+    """
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='searcher', password='password')
+        Profile.objects.create(user=self.user, display_name="Searcher")
+        self.sport = Sport.objects.create(name='Badminton')
+        self.client.login(username='searcher', password='password')
+        self.url = reverse('feeds_module:search_posts_api')
+
+    def _texts(self, **params):
+        return [post['text'] for post in self.client.get(self.url, params).json()['posts']]
+
+    def test_created_post_is_found_by_caption_hashtag_sport_and_location(self):
+        self.client.post(reverse('feeds_module:create_post_ajax'), {
+            'text': 'Sesi pagi yang seru', 'hashtags': 'smash', 'sport': 'Badminton', 'location_name': 'GOR Depok',
+        })
+
+        for query in ['pagi', 'smash', '#smash', 'badminton', 'depok', 'ser']:
+            self.assertEqual(self._texts(q=query), ['Sesi pagi yang seru'], query)
+        self.assertEqual(self._texts(q='tenis'), [])
+        self.assertEqual(self._texts(q=''), [])
+
+    def test_update_and_delete_keep_index_in_sync(self):
+        post = Post.objects.create(user=self.user, text='Morning ride')
+        index_post(post)
+        self.assertEqual(search_posts('ride')[0], [post.id])
+
+        post.text = 'Evening swim'
+        post.save()
+        index_post(post)
+        self.assertEqual(search_posts('ride')[0], [])
+        self.assertEqual(search_posts('swim')[0], [post.id])
+
+        response = self.client.post(reverse('profile_module:post_delete', args=[post.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(search_posts('swim')[0], [])
+
+    def test_results_are_keyset_paginated_newest_first(self):
+        now = timezone.now()
+        posts = [
+            Post.objects.create(user=self.user, text=f'Run number {i}', created_at=now - datetime.timedelta(minutes=i))
+            for i in range(15)
+        ]
+        self.assertEqual(rebuild_post_search_index(), 15)
+
+        first = self.client.get(self.url, {'q': 'run'}).json()
+        self.assertEqual(len(first['posts']), 10)
+        self.assertTrue(first['has_next'])
+        self.assertIn('Run number 0', first['html'])
+        second = self.client.get(self.url, {'q': 'run', 'cursor': first['next_cursor']}).json()
+        self.assertFalse(second['has_next'])
+        self.assertEqual(
+            [p['id'] for p in first['posts'] + second['posts']],
+            [str(post.id) for post in posts],
+        )
+        self.assertEqual(self.client.get(self.url, {'q': 'run', 'cursor': 'bad'}).status_code, 400)
+
+    def test_query_syntax_is_not_interpreted(self):
+        index_post(Post.objects.create(user=self.user, text='Leg "day" AND (squats)'))
+        self.assertEqual(self._texts(q='"day" OR NEAR('), [])
+        self.assertEqual(self._texts(q='squats)'), ['Leg "day" AND (squats)'])
+
+
+class ShardedCounterTests(TestCase):
+    """
+    Test suite untuk counter ter-shard (likes_count, comments_count) dan flush_counters.
+    """
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='liker', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        Profile.objects.create(user=self.user, display_name="Liker")
+        self.client.login(username='liker', password='password')
+        self.post = Post.objects.create(user=self.other, text='Finish line', likes_count=5)
+        self.url = reverse('feeds_module:like_post_ajax')
+
+    def _column(self, field):
+        return Post.objects.values_list(field, flat=True).get(pk=self.post.pk)
+
+    def test_like_writes_a_shard_not_the_post_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'post_id': self.post.id})
+        self.assertEqual(response.json(), {'status': 'success', 'likes_count': 6, 'liked': True})
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "feeds_module_post"')])
+        self.assertTrue(PostLike.objects.filter(post=self.post, user=self.user).exists())
+        self.assertEqual(self._column('likes_count'), 5)
+        self.assertEqual(read_counters(Post, str(self.post.pk), 'likes_count'), {'likes_count': 6})
+
+    def test_unlike_and_flush(self):
+        PostLike.objects.create(post=self.post, user=self.other)
+        increment(Post, self.post.pk, 'likes_count')
+
+        self.assertEqual(self.client.post(self.url, {'post_id': self.post.id}).json()['likes_count'], 7)
+        self.assertEqual(self.client.post(self.url, {'post_id': self.post.id}).json(), {'status': 'success', 'likes_count': 6, 'liked': False})
+
+        self.assertEqual(flush_counters(), 1)
+        self.assertEqual(self._column('likes_count'), 6)
+        self.assertFalse(CounterShard.objects.exists())
+        self.assertEqual(flush_counters(), 0)
+
+    def test_increments_spread_over_shards_and_sum_exactly(self):
+        for _ in range(50):
+            increment(Post, self.post.pk, 'views_count')
+        increment(Post, self.post.pk, 'comments_count', 2)
+        self.assertGreater(CounterShard.objects.filter(field='views_count').count(), 1)
+        self.assertEqual(read_counters(Post, self.post.pk, 'views_count', 'comments_count'), {'views_count': 50, 'comments_count': 2})
+
+        flush_counters()
+        self.assertEqual((self._column('views_count'), self._column('comments_count')), (50, 2))
+        self.assertEqual(read_counters(Post, self.post.pk, 'views_count'), {'views_count': 50})
+
+    def test_feed_and_profile_lists_show_unflushed_counts(self):
+        self.client.post(self.url, {'post_id': self.post.id})
+        increment(Post, self.post.pk, 'comments_count', 2)
+
+        hydrated = hydrate_posts([self.post.id], self.user)
+        self.assertEqual((hydrated[0]['likes_count'], hydrated[0]['comments_count']), (6, 2))
+        Profile.objects.create(user=self.other, display_name="Other")
+        posts = self.client.get(reverse('profile_module:user_posts_api', args=['other'])).json()['posts']
+        self.assertEqual((posts[0]['likes_count'], posts[0]['comments_count']), (6, 2))
+
+    def test_comment_returns_exact_count(self):
+        Post.objects.filter(pk=self.post.pk).update(comments_count=3)
+        response = self.client.post(reverse('feeds_module:add_comment_ajax'), {'post_id': self.post.id, 'comment_text': 'Nice'})
+        self.assertEqual(response.json()['comments_count'], 4)
+        self.assertEqual(self._column('comments_count'), 3)
+
+    def test_missing_post_returns_404(self):
+        self.assertEqual(self.client.post(self.url, {'post_id': '00000000-0000-0000-0000-000000000000'}).status_code, 404)
+        self.assertEqual(self.client.post(self.url, {'post_id': 'not-a-uuid'}).status_code, 404)
+        self.assertFalse(CounterShard.objects.exists())
+
+
+class PostViewCountingTests(TestCase):
+    """
+    Test suite untuk penghitungan views post (dedup per window + log di cache + flush).
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='viewer', password='password')
+        self.other = User.objects.create_user(username='other_viewer', password='password')
+        Profile.objects.create(user=self.user, display_name="Viewer")
+        self.posts = [Post.objects.create(user=self.other, text=f'Post {i}') for i in range(3)]
+        self.client.login(username='viewer', password='password')
+        self.url = reverse('feeds_module:load_more_posts_api')
+
+    def _views(self, post):
+        return read_counters(Post, post.pk, 'views_count')['views_count']
+
+    @override_settings(REDIS_URL='redis://views')
+    def test_feed_request_writes_nothing_and_dedupes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertFalse([sql for sql in writes if 'django_session' not in sql])
+
+        self.client.get(self.url)
+        out = StringIO()
+        call_command('flush_post_views', stdout=out)
+        self.assertIn('Flushed 3 post views.', out.getvalue())
+        self.assertEqual([self._views(post) for post in self.posts], [1, 1, 1])
+        self.assertEqual(impressions.flush_views(), 0)
+
+        flush_counters()
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views_count, 1)
+
+    @override_settings(REDIS_URL='redis://views')
+    def test_views_count_per_viewer_and_window(self):
+        ids = [self.posts[0].id]
+        now = 1_000_000 * impressions.VIEW_WINDOW
+        self.assertEqual(impressions.record_views(self.user, ids, now), 1)
+        self.assertEqual(impressions.record_views(self.user, ids, now + 60), 0)
+        self.assertEqual(impressions.record_views(self.other, ids, now + 60), 1)
+        self.assertEqual(impressions.record_views(self.user, ids, now + impressions.VIEW_WINDOW), 1)
+
+        self.assertEqual(impressions.flush_views(), 3)
+        self.assertEqual(self._views(self.posts[0]), 3)
+
+    @override_settings(REDIS_URL='redis://views')
+    def test_concurrent_requests_count_a_view_once(self):
+        ids = [self.posts[0].id]
+        start = threading.Barrier(8)
+
+        def view():
+            start.wait()
+            counted.append(impressions.record_views(self.user, ids))
+
+        counted = []
+        threads = [threading.Thread(target=view) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(counted), 1)
+        self.assertEqual(impressions.flush_views(), 1)
+
+    @override_settings(REDIS_URL='redis://views')
+    def test_flush_waits_one_round_for_an_entry_being_written(self):
+        # A request took sequence number 1 but has not stored its entry yet
+        cache.add('post-views:seq', 0, None)
+        cache.incr('post-views:seq')
+        impressions.record_views(self.user, [self.posts[0].id])
+
+        self.assertEqual(impressions.flush_views(), 0)
+        self.assertEqual(impressions.flush_views(), 1)
+        self.assertEqual(self._views(self.posts[0]), 1)
+        self.assertEqual(impressions.flush_views(), 0)
+
+    @override_settings(REDIS_URL='redis://views')
+    def test_log_is_flushed_in_batches(self):
+        with patch.object(impressions, 'FLUSH_BATCH', 2):
+            for post in self.posts:
+                impressions.record_views(self.user, [post.id])
+                impressions.record_views(self.other, [post.id])
+            self.assertEqual(impressions.flush_views(), 6)
+        self.assertEqual([self._views(post) for post in self.posts], [2, 2, 2])
+
+    @override_settings(REDIS_URL=None)
+    def test_without_shared_cache_views_are_written_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(impressions.record_views(self.user, [post.id for post in self.posts]), 3)
+        # One increment_many for the whole page, none of it on the post rows
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertFalse([sql for sql in statements if 'feeds_post' in sql])
+        self.assertLessEqual(len(statements), 3)
+        self.assertEqual([self._views(post) for post in self.posts], [1, 1, 1])
+        self.assertEqual(impressions.flush_views(), 0)
+
+
+class CommentThreadTests(TestCase):
+    """
+    Test suite untuk komentar berthread dengan cursor pagination.
+    """
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='commenter', password='password')
+        Profile.objects.create(user=self.user, display_name="Commenter")
+        self.client.login(username='commenter', password='password')
+        self.post = Post.objects.create(user=self.user, text='Thread me')
+        self.url = reverse('feeds_module:get_comments_api')
+        now = timezone.now()
+        self.top = [
+            Comment.objects.create(post=self.post, user=self.user, text=f'Top {i}', created_at=now + datetime.timedelta(minutes=i))
+            for i in range(25)
+        ]
+        for i in range(5):
+            Comment.objects.create(
+                post=self.post, user=self.user, parent=self.top[0], text=f'Reply {i}',
+                created_at=now + datetime.timedelta(hours=1, minutes=i),
+            )
+
+    def test_first_page_has_reply_previews_in_bounded_queries(self):
+        # session + user + post + top-level page + replies
+        with self.assertNumQueries(5):
+            data = self.client.get(self.url, {'post_id': self.post.id}).json()
+
+        self.assertEqual(len(data['comments']), 20)
+        self.assertEqual(data['comments'][0]['text'], 'Top 0')
+        self.assertEqual(data['comments'][0]['reply_count'], 5)
+        self.assertEqual([r['text'] for r in data['comments'][0]['replies']], ['Reply 0', 'Reply 1', 'Reply 2'])
+        self.assertEqual(data['comments'][1]['reply_count'], 0)
+        self.assertEqual(data['comments'][1]['replies'], [])
+
+        rest = self.client.get(self.url, {'post_id': self.post.id, 'cursor': data['next_cursor']}).json()
+        self.assertEqual([c['text'] for c in rest['comments']], [f'Top {i}' for i in range(20, 25)])
+        self.assertIsNone(rest['next_cursor'])
+        self.assertEqual(self.client.get(self.url, {'post_id': self.post.id, 'cursor': 'bad'}).status_code, 400)
+
+    def test_expand_thread_pages_replies(self):
+        url = reverse('feeds_module:get_comment_replies', args=[self.top[0].id])
+        with patch('feeds_module.views.REPLIES_PAGE_SIZE', 3):
+            first = self.client.get(url).json()
+            second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual([r['text'] for r in first['replies'] + second['replies']], [f'Reply {i}' for i in range(5)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_reply_to_reply_joins_top_level_thread(self):
+        reply = Comment.objects.get(text='Reply 0')
+        response = self.client.post(reverse('feeds_module:add_comment_ajax'), {
+            'post_id': self.post.id, 'comment_text': 'Nested', 'parent_id': reply.id,
+        })
+        self.assertEqual(response.json()['comment']['parent_id'], str(self.top[0].id))
+
+        other_post = Post.objects.create(user=self.user, text='Other')
+        response = self.client.post(reverse('feeds_module:add_comment_ajax'), {
+            'post_id': other_post.id, 'comment_text': 'Wrong thread', 'parent_id': reply.id,
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class MediaPipelineTests(TestCase):
+    """
+    Test suite untuk upload gambar di background (spool lokal + LocalBackend).
+    """
+    def setUp(self):
+        spool, store = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.addCleanup(store.cleanup)
+        settings_override = override_settings(
+            MEDIA_BACKEND='common.media.LocalBackend',
+            MEDIA_SPOOL_DIR=spool.name,
+            MEDIA_LOCAL_BACKEND_DIR=store.name,
+            MEDIA_UPLOAD_WORKERS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.store = store.name
+
+        self.client = Client()
+        self.user = User.objects.create_user(username='uploader', password='password')
+        Profile.objects.create(user=self.user, display_name="Uploader")
+        self.client.login(username='uploader', password='password')
+
+    def _create_post_with_image(self):
+        img = SimpleUploadedFile("run.jpg", b"jpeg-bytes", content_type="image/jpeg")
+        with patch('cloudinary.uploader.upload_resource') as upload:
+            response = self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Morning run', 'image': img})
+        upload.assert_not_called()
+        self.assertEqual(response.json()['status'], 'success')
+        return PostImage.objects.get(post__text='Morning run')
+
+    def test_create_post_queues_image_then_worker_marks_it_ready(self):
+        image = self._create_post_with_image()
+        self.assertEqual(image.image_status, MediaStatus.PENDING)
+        self.assertFalse(image.image)
+
+        self.assertEqual(process_pending_uploads(), 1)
+        image.refresh_from_db()
+        self.assertEqual(image.image_status, MediaStatus.READY)
+        self.assertTrue(image.image.public_id.startswith('postimage/'))
+        stored = next(pathlib.Path(self.store).rglob('*.jpg'))
+        self.assertEqual(stored.read_bytes(), b'jpeg-bytes')
+        self.assertFalse(MediaUpload.objects.exists())
+
+    def test_failed_uploads_back_off_then_give_up(self):
+        image = self._create_post_with_image()
+        job = MediaUpload.objects.get()
+
+        with patch('common.media.LocalBackend.upload', side_effect=OSError('backend down')):
+            self.assertEqual(process_pending_uploads(), 0)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            # Not due yet: the backoff keeps it out of the next run
+            self.assertEqual(process_pending_uploads(), 0)
+            self.assertEqual(MediaUpload.objects.get().attempts, 1)
+
+            for _ in range(4):
+                MediaUpload.objects.update(next_attempt_at=timezone.now())
+                process_pending_uploads()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaStatus.FAILED, 5))
+        image.refresh_from_db()
+        self.assertEqual(image.image_status, MediaStatus.FAILED)
+
+    def test_newer_upload_supersedes_queued_one(self):
+        image = self._create_post_with_image()
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_upload(image, 'image', SimpleUploadedFile("second.jpg", b"second", content_type="image/jpeg"))
+        self.assertEqual(MediaUpload.objects.count(), 1)
+
+        self.assertEqual(process_pending_uploads(), 1)
+        self.assertEqual([p.read_bytes() for p in pathlib.Path(self.store).rglob('*.jpg')], [b'second'])
+
+    def test_running_upload_superseded_midway_drops_its_result(self):
+        image = self._create_post_with_image()
+        first = MediaUpload.objects.get()
+        upload = common_media.LocalBackend.upload
+
+        uploaded = []
+
+        def replaced_while_uploading(backend, source, folder):
+            enqueue_upload(image, 'image', SimpleUploadedFile("second.jpg", b"second", content_type="image/jpeg"))
+            uploaded.append(upload(backend, source, folder))
+            return uploaded[-1]
+
+        with patch('common.media.LocalBackend.upload', replaced_while_uploading):
+            self.assertFalse(process_upload(first.pk))
+        image.refresh_from_db()
+        self.assertEqual(image.image_status, MediaStatus.PENDING)
+        self.assertFalse(image.image)
+        # The superseded result is not left behind in the store
+        self.assertFalse((pathlib.Path(self.store) / uploaded[0]).exists())
+
+        self.assertEqual(process_pending_uploads(), 1)
+        image.refresh_from_db()
+        self.assertEqual(image.image_status, MediaStatus.READY)
+        self.assertEqual((pathlib.Path(self.store) / f'{image.image.public_id}.jpg').read_bytes(), b'second')
+
+    def test_oversized_image_is_rejected_before_spooling(self):
+        img = SimpleUploadedFile("huge.jpg", b"x" * (5 * 1024 * 1024 + 1), content_type="image/jpeg")
+        self.client.post(reverse('feeds_module:create_post_ajax'), {'text': 'Too big', 'image': img})
+        self.assertTrue(Post.objects.filter(text='Too big').exists())
+        self.assertFalse(PostImage.objects.exists())
+        self.assertFalse(MediaUpload.objects.exists())
@@ -1,54 +1,157 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, PostImageForm
-from .models import Post, PostHashtag, Hashtag, PostLike, Comment, Sport
-from profile_module.models import Follow
-from django.http import JsonResponse
+from .models import Post, PostImage, Comment, Sport
+from .hydration import hydrate_posts
+from .impressions import record_views
+from .selectors import (
+    FOR_YOU_ORDERING, LATEST_ORDERING, TIMELINE_ORDERING, comment_replies, comment_threads, following_timeline,
+    for_you_backfill, for_you_feed, trending_hashtags,
+)
+from .services import fan_out_post, parse_hashtags, set_post_hashtags, toggle_like
+from .search import index_post, search_posts
+from profile_module.selectors import suggested_accounts
+from common.cache import namespace_version
+from common.counters import increment, read_counters
+from common.geo import nearby, parse_point
+from common.media import enqueue_upload, validate_image
+from django.core.exceptions import ValidationError
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import Count, Exists, OuterRef, F
-from django.contrib.auth.models import User
-from django.core.paginator import Paginator
+from common.utils.pagination import cursor_for, paginate_keyset, paginate_offset
 from django.template.loader import render_to_string
 from django.views.decorators.csrf import csrf_exempt
 import json
+import logging
+from asgiref.sync import sync_to_async
 from django.http import HttpResponse
-from django.core.serializers import serialize
-from django.views.decorators.csrf import csrf_exempt
+
+logger = logging.getLogger(__name__)
+
+FEED_PAGE_SIZE = 5
+SEARCH_PAGE_SIZE = 10
+NEARBY_PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+COMMENT_REPLY_PREVIEW = 3
+REPLIES_PAGE_SIZE = 20
+
+
+def _for_you_page(user, cursor=None, page_number=None):
+    """Return one page of the ``'foryou'`` tab as ``(post_ids, next_cursor, next_page_number)``.
+    The user's ranked entries (see ``ranking``) come first; once they run out, or while
+    there is no fresh ranking, the page continues with the other posts newest first
+    (``for_you_backfill``). Cursors are tagged with the list they point into, ``r.`` for
+    the ranking and ``n.`` for the backfill, so a cursor stays valid when a ranking
+    appears or expires between two pages.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    source, _, position = (cursor or '').partition('.')
+    if source == 'n':
+        rows, next_position = paginate_keyset(for_you_backfill(user), LATEST_ORDERING, position, FEED_PAGE_SIZE)
+        return [row.id for row in rows], next_position and f'n.{next_position}', None
+
+    next_page_number = None
+    if source == 'r':
+        ranked, next_position = paginate_keyset(for_you_feed(user), FOR_YOU_ORDERING, position, FEED_PAGE_SIZE)
+        offset = 0
+    elif cursor:
+        raise ValueError('Invalid cursor.')
+    else:
+        try:
+            page = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            page = 1
+        start = (page - 1) * FEED_PAGE_SIZE
+        ranked = list(for_you_feed(user)[start:start + FEED_PAGE_SIZE + 1])
+        next_position = cursor_for(ranked[FEED_PAGE_SIZE - 1], FOR_YOU_ORDERING) if len(ranked) > FEED_PAGE_SIZE else None
+        ranked = ranked[:FEED_PAGE_SIZE]
+        next_page_number = page + 1
+        offset = 0
+        if start and not ranked:
+            # Past the ranking: skip the backfill posts of the earlier pages (ranks run 0..n-1)
+            last_rank = for_you_feed(user).order_by('-rank').values_list('rank', flat=True).first()
+            offset = start - (0 if last_rank is None else last_rank + 1)
+
+    post_ids = [row.post_id for row in ranked]
+    if next_position:
+        return post_ids, f'r.{next_position}', next_page_number
+
+    need = FEED_PAGE_SIZE - len(post_ids)
+    # One extra row tells whether another page exists
+    backfill = list(for_you_backfill(user)[offset:offset + need + 1])
+    post_ids += [row.id for row in backfill[:need]]
+    if len(backfill) <= need:
+        return post_ids, None, None
+    next_position = cursor_for(backfill[need - 1], LATEST_ORDERING) if need else ''
+    return post_ids, f'n.{next_position}', next_page_number
+
+
+def _get_feed_page(user, active_tab, cursor=None, page_number=None):
+    """Return one page of the feed as hydrated post dicts.
+    The ``'foryou'`` tab serves the user's precomputed ranking, then newest-first posts
+    (see ``_for_you_page``).
+    Pages are addressed by an opaque ``cursor`` (keyset pagination over the tab's ordering).
+    Without a cursor the page is taken by ``page_number`` for older clients; no ``COUNT(*)``
+    runs in either mode. The served posts are counted as viewed (see ``impressions.record_views``).
+    Args:
+        user: the viewer.
+        active_tab: ``'following'`` or ``'foryou'``.
+        cursor: the ``next_cursor`` returned with the previous page.
+        page_number: the legacy page number, used only when ``cursor`` is empty.
+    Returns:
+        dict: ``posts`` (see ``hydrate_posts``), ``has_next``, ``next_cursor`` and ``next_page_number``.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    if active_tab == 'following':
+        next_page_number = None
+        if cursor:
+            rows, next_cursor = paginate_keyset(following_timeline(user), TIMELINE_ORDERING, cursor, FEED_PAGE_SIZE)
+        else:
+            rows, next_page_number = paginate_offset(following_timeline(user).order_by(*TIMELINE_ORDERING), page_number, FEED_PAGE_SIZE)
+            next_cursor = cursor_for(rows[-1], TIMELINE_ORDERING) if next_page_number else None
+        post_ids = [row.post_id for row in rows]
+    else:
+        post_ids, next_cursor, next_page_number = _for_you_page(user, cursor, page_number)
+
+    posts = hydrate_posts(post_ids, user)
+    record_views(user, [post['id'] for post in posts])
+    return {
+        'posts': posts,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+        'next_page_number': next_page_number,
+    }
 
 @login_required
 def main_view(request):
     active_tab = request.GET.get('tab', 'foryou') 
 
-    # Annotate posts with whether the current user has liked them
-    user_likes = PostLike.objects.filter(post=OuterRef('pk'), user=request.user)
-    
-    if active_tab == 'following':
-        following_users = Follow.objects.filter(follower=request.user).values_list('followee', flat=True)
-        post_list = Post.objects.filter(user__in=following_users).annotate(has_liked=Exists(user_likes)).order_by('-created_at')
-    else:
-        post_list = Post.objects.all().annotate(has_liked=Exists(user_likes)).order_by('-created_at')
-
-    paginator = Paginator(post_list, 5)  # Show 5 posts per page
-    page_number = request.GET.get('page')
-    posts = paginator.get_page(page_number)
+    try:
+        feed = _get_feed_page(request.user, active_tab, request.GET.get('cursor'), request.GET.get('page'))
+    except ValueError:
+        feed = _get_feed_page(request.user, active_tab)
 
     form = PostForm()
     image_form = PostImageForm()
 
     # Popular tags
-    popular_tags = Hashtag.objects.annotate(post_count=Count('posthashtag')).order_by('-post_count')[:3]
+    popular_tags = trending_hashtags()
 
     # Suggested followers
-    following_users_ids = Follow.objects.filter(follower=request.user).values_list('followee_id', flat=True)
-    suggested_followers = User.objects.exclude(id__in=list(following_users_ids) + [request.user.id]).order_by('?')[:2]
+    suggested_followers = suggested_accounts(request.user)
 
 
     context = {
         'form': form,
         'image_form': image_form,
-        'posts': posts,
+        'posts': feed['posts'],
+        'has_next': feed['has_next'],
+        'next_cursor': feed['next_cursor'],
         'active_tab': active_tab,
         'popular_tags': popular_tags,
+        'popular_tags_version': namespace_version('hashtags'),
         'suggested_followers': suggested_followers,
     }
     return render(request, 'main.html', context)
@@ -65,10 +168,9 @@ def create_post_ajax(request):
             pass
 
     form = PostForm(data)
-    image_form = PostImageForm(request.POST, request.FILES)
 
     if not form.is_valid():
-        print("Form Errors:", form.errors)
+        logger.info("Rejected post form: %s", form.errors.as_json())
         return JsonResponse({'status': 'error', 'errors': form.errors})
 
     post = form.save(commit=False)
@@ -78,43 +180,29 @@ def create_post_ajax(request):
     badge_urls = [user_badge.badge.icon_url for user_badge in user_badges if user_badge.badge.icon_url]
     post.author_badges_url = ",".join(badge_urls)
 
-    hashtag_str = request.POST.get('hashtags')
-    hashtags_to_add = []
-    if hashtag_str:
-        hashtag_names = [name.strip() for name in hashtag_str.split(',') if name.strip()]
-        for name in hashtag_names:
-            hashtag, _ = Hashtag.objects.get_or_create(tag=name)
-            hashtags_to_add.append(hashtag)
-
-    # Now save the post
-    post.save()
-
-    # Then, create the relationships
-    if hashtags_to_add:
-        post.posthashtag_set.bulk_create([
-            PostHashtag(post=post, hashtag=hashtag) for hashtag in hashtags_to_add
-        ])
-
     time_h = request.POST.get('time_h')
     time_m = request.POST.get('time_m')
     if time_h and time_m:
         post.created_at = post.created_at.replace(hour=int(time_h), minute=int(time_m), second=0, microsecond=0)
-        post.save()
+
+    post.save()
+
+    # Links the (canonicalized) hashtags and counts them once created_at is final
+    set_post_hashtags(post, parse_hashtags(request.POST.get('hashtags')))
+    fan_out_post(post)
+    index_post(post)
 
     uploaded_file = request.FILES.get('image')
     
     if uploaded_file:
-        print(f"File diterima: {uploaded_file.name}")
-        
-        if image_form.is_valid():
-            post_image = image_form.save(commit=False)
-            post_image.post = post
-            post_image.save()
-            print("Sukses simpan gambar ke Cloudinary/DB")
+        try:
+            validate_image(uploaded_file)
+        except ValidationError as e:
+            # The post is kept; only the image is dropped
+            logger.info("Rejected post image: %s", e.messages)
         else:
-            print("Gagal Validasi Image:", image_form.errors) 
-    else:
-        print("TIDAK ADA file 'image' yang terbaca di request.FILES")
+            # Pushed to Cloudinary in the background; the post shows it once ready
+            enqueue_upload(PostImage.objects.create(post=post), 'image', uploaded_file)
 
     return JsonResponse({'status': 'success', 'message': 'Post created successfully!'})
 
@@ -122,40 +210,22 @@ def create_post_ajax(request):
 @login_required
 @require_POST
 def like_post_ajax(request):
-    post_id = request.POST.get('post_id')
-    post = get_object_or_404(Post, id=post_id)
-    
-    like, created = PostLike.objects.get_or_create(post=post, user=request.user)
-
-    if not created:
-        like.delete()
-        post.likes_count = F('likes_count') - 1
-        liked = False
-    else:
-        post.likes_count = F('likes_count') + 1
-        liked = True
-    
-    post.save(update_fields=['likes_count'])
-    post.refresh_from_db()
-
-    return JsonResponse({'status': 'success', 'likes_count': post.likes_count, 'liked': liked})
+    result = toggle_like(request.user, request.POST.get('post_id'))
+    if result is None:
+        raise Http404('Post not found.')
+    liked, likes_count = result
+    return JsonResponse({'status': 'success', 'likes_count': likes_count, 'liked': liked})
 
 @login_required
 def load_more_posts(request):
     active_tab = request.GET.get('tab', 'foryou')
-    user_likes = PostLike.objects.filter(post=OuterRef('pk'), user=request.user)
-    if active_tab == 'following':
-        following_users = Follow.objects.filter(follower=request.user).values_list('followee', flat=True)
-        post_list = Post.objects.filter(user__in=following_users).annotate(has_liked=Exists(user_likes)).order_by('-created_at')
-    else:
-        post_list = Post.objects.all().annotate(has_liked=Exists(user_likes)).order_by('-created_at')
+    try:
+        feed = _get_feed_page(request.user, active_tab, request.GET.get('cursor'), request.GET.get('page'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
 
-    paginator = Paginator(post_list, 5)
-    page_number = request.GET.get('page')
-    posts = paginator.get_page(page_number)
-
-    html = render_to_string('components/post_list.html', {'posts': posts})
-    return JsonResponse({'html': html, 'has_next': posts.has_next()})
+    html = render_to_string('components/post_list.html', {'posts': feed['posts']})
+    return JsonResponse({'html': html, 'has_next': feed['has_next'], 'next_cursor': feed['next_cursor']})
 
 @csrf_exempt
 @login_required
@@ -168,70 +238,93 @@ def add_comment_ajax(request):
         return JsonResponse({'status': 'error', 'message': 'Comment cannot be empty.'}, status=400)
 
     post = get_object_or_404(Post, id=post_id)
+    parent_id = _reply_parent_id(post, request.POST.get('parent_id'))
 
     comment = Comment.objects.create(
         post=post,
+        parent_id=parent_id,
         user=request.user,
         text=comment_text,
         author_display_name=request.user.profile.display_name or request.user.username,
         author_avatar_url=request.user.profile.avatar_url.url if hasattr(request.user, 'profile') and request.user.profile.avatar_url else ''
     )
 
-    post.comments_count = F('comments_count') + 1
-    post.save(update_fields=['comments_count'])
-    post.refresh_from_db()
+    increment(Post, post.pk, 'comments_count')
+    comments_count = read_counters(Post, post.pk, 'comments_count')['comments_count']
+
+    return JsonResponse({
+        'status': 'success',
+        'comment': _comment_data(comment),
+        'comments_count': comments_count
+    })
 
+def _comment_data(comment):
+    data = {
+        'id': str(comment.id),
+        'parent_id': str(comment.parent_id) if comment.parent_id else None,
+        'text': comment.text,
+        'author': comment.author_display_name,
+        'username': comment.user.username,
+        'avatar_url': comment.author_avatar_url,
+        'created_at': comment.created_at.strftime('%d %b, %Y'),
+    }
+    if hasattr(comment, 'preview_replies'):
+        data['reply_count'] = comment.reply_count
+        data['replies'] = [_comment_data(reply) for reply in comment.preview_replies]
+    return data
+
+def _comments_response(request):
+    """One page of a post's comment threads (see ``selectors.comment_threads``)."""
+    post = get_object_or_404(Post.objects.only('id'), id=request.GET.get('post_id'))
+    try:
+        comments, next_cursor = comment_threads(post.id, request.GET.get('cursor'), COMMENTS_PAGE_SIZE, COMMENT_REPLY_PREVIEW)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
     return JsonResponse({
         'status': 'success',
-        'comment': {
-            'text': comment.text,
-            'author': comment.author_display_name,
-            'username': comment.user.username,
-            'avatar_url': comment.author_avatar_url,
-            'created_at': comment.created_at.strftime('%d %b, %Y'),
-        },
-        'comments_count': post.comments_count
+        'comments': [_comment_data(comment) for comment in comments],
+        'next_cursor': next_cursor,
     })
 
+def _reply_parent_id(post, parent_id):
+    """Return the thread a reply to ``parent_id`` belongs to; replies to replies join the top-level thread."""
+    if not parent_id:
+        return None
+    try:
+        parent = Comment.objects.only('id', 'parent_id').get(id=parent_id, post=post)
+    except (Comment.DoesNotExist, ValidationError):
+        raise Http404('Comment not found.')
+    return parent.parent_id or parent.id
+
 @csrf_exempt
 @login_required
 def get_comments_ajax(request):
-    post_id = request.GET.get('post_id')
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comment_set.all().order_by('created_at')
-    
-    comments_data = [{
-        'text': c.text,
-        'author': c.author_display_name,
-        'username': c.user.username,
-        'avatar_url': c.author_avatar_url,
-        'created_at': c.created_at.strftime('%d %b, %Y'),
-    } for c in comments]
+    return _comments_response(request)
 
-    return JsonResponse({'status': 'success', 'comments': comments_data})
+@login_required
+def get_comment_replies(request, comment_id):
+    """One page of the replies to a top-level comment, for expanding a thread."""
+    comment = get_object_or_404(Comment.objects.only('id'), id=comment_id)
+    try:
+        replies, next_cursor = comment_replies(comment.id, request.GET.get('cursor'), REPLIES_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'replies': [_comment_data(reply) for reply in replies],
+        'next_cursor': next_cursor,
+    })
 
 @csrf_exempt
 @login_required
 def like_post_api(request):
     if request.method == 'POST':
         data = json.loads(request.body)
-        post_id = data.get('post_id')
-        post = get_object_or_404(Post, id=post_id)
-        
-        like, created = PostLike.objects.get_or_create(post=post, user=request.user)
-
-        if not created:
-            like.delete()
-            post.likes_count = F('likes_count') - 1
-            liked = False
-        else:
-            post.likes_count = F('likes_count') + 1
-            liked = True
-        
-        post.save(update_fields=['likes_count'])
-        post.refresh_from_db()
-
-        return JsonResponse({'status': 'success', 'likes_count': post.likes_count, 'liked': liked})
+        result = toggle_like(request.user, data.get('post_id'))
+        if result is None:
+            raise Http404('Post not found.')
+        liked, likes_count = result
+        return JsonResponse({'status': 'success', 'likes_count': likes_count, 'liked': liked})
     return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
 
 @csrf_exempt
@@ -246,93 +339,125 @@ def add_comment_api(request):
             return JsonResponse({'status': 'error', 'message': 'Comment cannot be empty.'}, status=400)
 
         post = get_object_or_404(Post, id=post_id)
+        parent_id = _reply_parent_id(post, data.get('parent_id'))
 
         comment = Comment.objects.create(
             post=post,
+            parent_id=parent_id,
             user=request.user,
             text=comment_text,
             author_display_name=request.user.profile.display_name or request.user.username,
             author_avatar_url=request.user.profile.avatar_url.url if hasattr(request.user, 'profile') and request.user.profile.avatar_url else ''
         )
 
-        post.comments_count = F('comments_count') + 1
-        post.save(update_fields=['comments_count'])
-        post.refresh_from_db()
+        increment(Post, post.pk, 'comments_count')
+        comments_count = read_counters(Post, post.pk, 'comments_count')['comments_count']
 
         return JsonResponse({
             'status': 'success',
-            'comment': {
-                'text': comment.text,
-                'author': comment.author_display_name,
-                'username': comment.user.username,
-                'avatar_url': comment.author_avatar_url,
-                'created_at': comment.created_at.strftime('%d %b, %Y'),
-            },
-            'comments_count': post.comments_count
+            'comment': _comment_data(comment),
+            'comments_count': comments_count
         })
     return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
 
 @login_required
 def get_comments_api(request):
-    post_id = request.GET.get('post_id')
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comment_set.all().order_by('created_at')
-    
-    comments_data = [{
-        'text': c.text,
-        'author': c.author_display_name,
-        'username': c.user.username,
-        'avatar_url': c.author_avatar_url,
-        'created_at': c.created_at.strftime('%d %b, %Y'),
-    } for c in comments]
-
-    return JsonResponse({'status': 'success', 'comments': comments_data})
+    return _comments_response(request)
 
 @login_required
-def load_more_posts_api(request):
+async def load_more_posts_api(request):
+    user = await request.auser()
     active_tab = request.GET.get('tab', 'foryou')
-    user_likes = PostLike.objects.filter(post=OuterRef('pk'), user=request.user)
-    if active_tab == 'following':
-        following_users = Follow.objects.filter(follower=request.user).values_list('followee', flat=True)
-        post_list = Post.objects.filter(user__in=following_users).annotate(has_liked=Exists(user_likes)).order_by('-created_at')
-    else:
-        post_list = Post.objects.all().annotate(has_liked=Exists(user_likes)).order_by('-created_at')
+    try:
+        feed = await sync_to_async(_get_feed_page)(user, active_tab, request.GET.get('cursor'), request.GET.get('page', 1))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
 
-    paginator = Paginator(post_list, 5)
-    page_number = request.GET.get('page', 1)
-    posts = paginator.get_page(page_number)
+    posts_data = [
+        {**post, 'created_at': post['created_at'].strftime('%Y-%m-%d %H:%M:%S')}
+        for post in feed['posts']
+    ]
 
-    posts_data = []
+    return JsonResponse({
+        'posts': posts_data, 
+        'has_next': feed['has_next'],
+        'next_page_number': feed['next_page_number'],
+        'next_cursor': feed['next_cursor'],
+    })
+
+
+def _nearby_page(user, lat, lng, radius, cursor=None):
+    """Return one page of the posts located within ``radius`` km, nearest first, plus the next cursor.
+    Each post dict gets a ``distance_km`` key.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    rows, next_cursor = nearby(Post.objects.all(), lat, lng, radius, cursor, NEARBY_PAGE_SIZE)
+    distances = dict(rows)
+    posts = hydrate_posts(distances, user)
     for post in posts:
-        
-        # 1. Get all image URLs for the post
-        image_urls = [image.image.url for image in post.images.all()]
-        
-        # 2. Get all hashtag names for the post
-        hashtags = [ph.hashtag.tag for ph in post.posthashtag_set.all()]
-
-        posts_data.append({
-    'id': post.id,
-    'user': post.user.username,
-    'text': post.text,
-
-    'sport': post.sport.name if post.sport else None,
-    'sport_id': post.sport_id,  # optional tapi berguna di FE
-
-    'likes_count': post.likes_count,
-    'comments_count': post.comments_count,
-    'created_at': post.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-    'has_liked': post.has_liked,
-    'author_badges_url': post.author_badges_url,
-    'author_display_name': post.user.profile.display_name if hasattr(post.user, 'profile') else post.user.username,
-    'author_avatar_url': post.user.profile.avatar_url.url if hasattr(post.user, 'profile') and post.user.profile.avatar_url else '',
-
-    'image_urls': image_urls,
-    'hashtags': hashtags,
-})
+        post['distance_km'] = round(distances[post['id']], 3)
+    record_views(user, [post['id'] for post in posts])
+    return {'posts': posts, 'next_cursor': next_cursor}
 
+@login_required
+async def nearby_posts_api(request):
+    """Posts located within ``radius`` km (default 5, max 50) of ``lat``/``lng``, nearest first.
+    Returns the posts both as JSON and as a rendered ``post_list.html`` fragment.
+    """
+    user = await request.auser()
+    try:
+        lat, lng, radius = parse_point(request.GET)
+        page = await sync_to_async(_nearby_page)(user, lat, lng, radius, request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    html = await sync_to_async(render_to_string)('components/post_list.html', {'posts': page['posts']})
+    posts_data = [
+        {**post, 'created_at': post['created_at'].strftime('%Y-%m-%d %H:%M:%S')}
+        for post in page['posts']
+    ]
     return JsonResponse({
-        'posts': posts_data, 
-        'has_next': posts.has_next(),
-        'next_page_number': posts.next_page_number() if posts.has_next() else None
-    })
\ No newline at end of file
+        'posts': posts_data,
+        'html': html,
+        'has_next': page['next_cursor'] is not None,
+        'next_cursor': page['next_cursor'],
+    })
+
+
+def _search_page(user, query, cursor=None):
+    """Return one page of search results as hydrated post dicts plus the next cursor.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    post_ids, next_cursor = search_posts(query, cursor, SEARCH_PAGE_SIZE)
+    posts = hydrate_posts(post_ids, user)
+    record_views(user, [post['id'] for post in posts])
+    return {'posts': posts, 'next_cursor': next_cursor}
+
+@login_required
+async def search_posts_api(request):
+    """Full-text search over captions, hashtags, sports and locations.
+    Returns the matching posts both as JSON and as a rendered ``post_list.html`` fragment.
+    """
+    user = await request.auser()
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'posts': [], 'html': '', 'has_next': False, 'next_cursor': None})
+
+    try:
+        page = await sync_to_async(_search_page)(user, query, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
+
+    html = await sync_to_async(render_to_string)('components/post_list.html', {'posts': page['posts']})
+    posts_data = [
+        {**post, 'created_at': post['created_at'].strftime('%Y-%m-%d %H:%M:%S')}
+        for post in page['posts']
+    ]
+    return JsonResponse({
+        'posts': posts_data,
+        'html': html,
+        'has_next': page['next_cursor'] is not None,
+        'next_cursor': page['next_cursor'],
+    })
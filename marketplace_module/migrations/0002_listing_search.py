@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+FTS_TABLE = 'marketplace_listing_fts'
+
+
+def _vector_index():
+    # Same expression as marketplace_module.search.LISTING_VECTOR, so queries match the index
+    return GinIndex(
+        SearchVector('title', weight='A', config='simple') + SearchVector('description', weight='B', config='simple'),
+        name='listing_search_vector',
+    )
+
+
+def create_search_index(apps, schema_editor):
+    Listing = apps.get_model('marketplace_module', 'Listing')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(Listing, _vector_index())
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(listing_id UNINDEXED, title, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (listing_id, title, description) VALUES (%s, %s, %s)',
+                [[pk.hex, title, description] for pk, title, description in Listing.objects.values_list('pk', 'title', 'description')],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    Listing = apps.get_model('marketplace_module', 'Listing')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(Listing, _vector_index())
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace_module', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'condition', 'price', 'created_at'], name='listing_active_cond_price'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='listing_active_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'price', 'id'], name='listing_active_price'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
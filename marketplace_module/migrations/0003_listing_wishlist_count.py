@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_wishlist_counts(apps, schema_editor):
+    Listing = apps.get_model('marketplace_module', 'Listing')
+    Wishlist = apps.get_model('marketplace_module', 'Wishlist')
+
+    listings = []
+    for row in Wishlist.objects.values('listing_id').annotate(total=Count('id')):
+        listings.append(Listing(pk=row['listing_id'], wishlist_count=row['total']))
+    Listing.objects.bulk_update(listings, ['wishlist_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace_module', '0002_listing_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='wishlist_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-wishlist_count', '-id'], name='listing_active_popular'),
+        ),
+        migrations.RunPython(backfill_wishlist_counts, migrations.RunPython.noop),
+    ]
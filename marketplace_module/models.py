@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from common.models import Sport
 from common.choices import ListingCondition
+from common.cache import bump_namespace
+from .search import index_listing, unindex_listing
 from cloudinary.models import CloudinaryField
 from common.utils.validator_image import validate_image_size
 
@@ -30,6 +32,8 @@ class Listing(models.Model):
     image_url = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained by marketplace_module.services; reconcile_wishlist_counts repairs drift
+    wishlist_count = models.PositiveIntegerField(default=0)
     wishlisted_by = models.ManyToManyField(
         User,
         related_name="wishlisted_listings",
@@ -40,10 +44,31 @@ class Listing(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Filter + sort paths of marketplace_module.search.search_listings
+            models.Index(fields=["is_active", "condition", "price", "created_at"], name="listing_active_cond_price"),
+            models.Index(fields=["is_active", "-created_at", "-id"], name="listing_active_recent"),
+            models.Index(fields=["is_active", "price", "id"], name="listing_active_price"),
+            models.Index(fields=["is_active", "-wishlist_count", "-id"], name="listing_active_popular"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"title", "description"} & set(update_fields):
+            index_listing(self)
+        bump_namespace("listings")
+
+    def delete(self, *args, **kwargs):
+        listing_id = self.pk
+        result = super().delete(*args, **kwargs)
+        unindex_listing(listing_id)
+        bump_namespace("listings")
+        return result
+
     @property
     def seller(self): return self.owner
     @seller.setter
@@ -0,0 +1,192 @@
+"""
+Listing search for the marketplace.
+
+Filters (price range, condition, location, owner) run on the composite indexes of
+``Listing``; the free-text part matches title and description with the database's
+full-text engine:
+
+* PostgreSQL: a weighted ``tsvector`` expression (title ``A``, description ``B``)
+  behind the GIN index created in migration 0002;
+* SQLite: the ``marketplace_listing_fts`` FTS5 table, kept in step by
+  ``Listing.save`` / ``Listing.delete``.
+
+Results are keyset-paginated for every sort order.
+
+Functions:
+    index_listing: Mirrors a listing into the SQLite FTS table.
+    unindex_listing: Removes a listing from the SQLite FTS table.
+    rebuild_listing_search_index: Re-fills the SQLite FTS table.
+    search_listings: Returns one page of listings matching the given filters.
+"""
+
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from common.utils.pagination import paginate_keyset
+
+SEARCH_CONFIG = "simple"
+FTS_TABLE = "marketplace_listing_fts"
+
+# Keep in sync with the index expression in migrations/0002_listing_search.py
+LISTING_VECTOR = (
+    SearchVector("title", weight="A", config=SEARCH_CONFIG)
+    + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+)
+
+SORTS = {
+    "newest": ("-created_at", "-id"),
+    "price_asc": ("price", "id"),
+    "price_desc": ("-price", "-id"),
+    "popular": ("-wishlist_count", "-id"),
+    "relevance": ("-rank", "-id"),
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_key(listing_id) -> str:
+    # Django stores UUID primary keys on SQLite as 32 hex characters
+    return listing_id.hex
+
+
+def index_listing(listing) -> None:
+    """Mirror ``listing`` into the FTS table (SQLite only; PostgreSQL indexes the columns directly)."""
+    if connection.vendor != "sqlite":
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE listing_id = %s", [_fts_key(listing.pk)])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (listing_id, title, description) VALUES (%s, %s, %s)",
+            [_fts_key(listing.pk), listing.title, listing.description],
+        )
+
+
+def unindex_listing(listing_id) -> None:
+    """Remove a listing from the FTS table (SQLite only)."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE listing_id = %s", [_fts_key(listing_id)])
+
+
+@transaction.atomic
+def rebuild_listing_search_index() -> int:
+    """
+    Re-fill the FTS table from ``Listing`` (after bulk imports); a no-op outside SQLite.
+    Returns:
+        int: The number of listings indexed.
+    """
+    from .models import Listing
+
+    if connection.vendor != "sqlite":
+        return 0
+    rows = [
+        [_fts_key(pk), title, description]
+        for pk, title, description in Listing.objects.values_list("pk", "title", "description")
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.executemany(f"INSERT INTO {FTS_TABLE} (listing_id, title, description) VALUES (%s, %s, %s)", rows)
+    return len(rows)
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every token so user input is never parsed as FTS5 syntax; the last token
+    # is a prefix match so results appear while typing
+    tokens = [f'"{token}"' for token in _TOKEN.findall(query)]
+    if tokens:
+        tokens[-1] += "*"
+    return " ".join(tokens)
+
+
+def _match_text(listings: QuerySet, query: str, with_rank: bool) -> QuerySet:
+    """Keep the listings matching ``query``; with ``with_rank`` also annotate ``rank`` (higher is better)."""
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        listings = listings.annotate(document=LISTING_VECTOR).filter(document=search_query)
+        return listings.annotate(rank=SearchRank(LISTING_VECTOR, search_query)) if with_rank else listings
+
+    if connection.vendor == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return listings.none()
+        listings = listings.filter(id__in=RawSQL(f"SELECT listing_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+        if not with_rank:
+            return listings
+        # bm25() is lower-is-better; negate it so every backend sorts by "-rank"
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 0, 4.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.listing_id = {listings.model._meta.db_table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        return listings.annotate(rank=rank)
+
+    for token in _TOKEN.findall(query):
+        listings = listings.filter(Q(title__icontains=token) | Q(description__icontains=token))
+    return listings.annotate(rank=Value(0.0)) if with_rank else listings
+
+
+def search_listings(
+    query: str = "",
+    *,
+    condition: str | None = None,
+    min_price: int | None = None,
+    max_price: int | None = None,
+    location: str | None = None,
+    owner: str | None = None,
+    wishlisted_for=None,
+    sort: str = "newest",
+    cursor: str | None = None,
+    page_size: int = 24,
+) -> tuple[list[dict], str | None]:
+    """
+    Return one page of active listings matching every given filter.
+    Args:
+        query: Free text matched against title and description.
+        condition: A ``Listing.Condition`` value.
+        min_price: Lowest price, inclusive.
+        max_price: Highest price, inclusive.
+        location: Prefix of the listing location (case-insensitive).
+        owner: Owner id or username.
+        wishlisted_for: When given, a user whose ``wishlisted`` flag is added to each row.
+        sort: One of ``SORTS``; ``"relevance"`` falls back to ``"newest"`` without a query.
+        cursor: The cursor returned for the previous page, or ``None``.
+        page_size: Number of listings per page.
+    Returns:
+        tuple: ``(rows, next_cursor)`` where rows are ``serializers.listing_values`` dicts.
+    Raises:
+        ValueError: If ``sort`` is unknown or ``cursor`` is malformed.
+    """
+    # Imported here: models.py imports this module for the FTS hooks
+    from .models import Listing
+    from .selectors import annotate_wishlisted
+    from .serializers import listing_values
+
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort {sort!r}.")
+
+    listings = Listing.objects.filter(is_active=True)
+    if condition:
+        listings = listings.filter(condition=condition)
+    if min_price is not None:
+        listings = listings.filter(price__gte=min_price)
+    if max_price is not None:
+        listings = listings.filter(price__lte=max_price)
+    if location:
+        listings = listings.filter(location__istartswith=location)
+    if owner:
+        listings = listings.filter(owner_id=owner) if owner.isdigit() else listings.filter(owner__username=owner)
+
+    query = query.strip()
+    if not query and sort == "relevance":
+        sort = "newest"
+    if query:
+        listings = _match_text(listings, query, with_rank=sort == "relevance")
+
+    if wishlisted_for is not None:
+        listings = annotate_wishlisted(listings, wishlisted_for)
+
+    return paginate_keyset(listing_values(listings), SORTS[sort], cursor, page_size)
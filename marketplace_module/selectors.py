@@ -0,0 +1,22 @@
+"""
+Read-side helpers for marketplace_module.
+Functions:
+    annotate_wishlisted: Adds a per-viewer ``wishlisted`` flag to a listing queryset.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import BooleanField, Exists, OuterRef, QuerySet, Value
+from .models import Wishlist
+
+
+def annotate_wishlisted(listings: QuerySet, user: User) -> QuerySet:
+    """
+    Annotate ``wishlisted`` on ``listings``: whether ``user`` saved each listing.
+    Computed with an ``EXISTS`` subquery (served by the ``(user, listing)`` unique index),
+    so the flag comes back in the same query as the listings. Anonymous users get ``False``.
+    """
+    if not user.is_authenticated:
+        return listings.annotate(wishlisted=Value(False, output_field=BooleanField()))
+    return listings.annotate(
+        wishlisted=Exists(Wishlist.objects.filter(user=user, listing=OuterRef("pk")))
+    )
@@ -0,0 +1,137 @@
+"""
+JSON serialization for marketplace_module responses.
+
+Listings are read with ``.values()`` (owner username joined in the same query) and
+encoded one row at a time, so a response never builds model instances, parses its
+own output back or holds a second copy of itself.
+
+Two payload shapes are supported, picked with the ``v`` query parameter:
+    1 (default): ``{"model", "pk", "fields", "isMine"}`` as produced by
+        ``django.core.serializers``; the Flutter client parses this shape.
+    2: one flat object per listing, the shape of ``search_listings_api``.
+
+Functions:
+    requested_version: Reads the payload version from a request.
+    listing_values: Returns a ``.values()`` queryset with every field the encoders need.
+    encode_listing: Turns one ``listing_values`` row into a JSON-ready dict.
+    iter_json_array: Yields a JSON array of encoded rows chunk by chunk.
+    listings_response: Builds a (streaming) JSON response for a listing queryset.
+"""
+
+from typing import Iterable, Iterator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+
+VERSIONS = (1, 2)
+CHUNK_ROWS = 100
+ITERATOR_CHUNK_SIZE = 500
+
+VALUE_FIELDS = (
+    "id", "title", "description", "price", "condition", "location", "image_url", "owner_id", "created_at",
+    "wishlist_count",
+)
+
+_encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+
+def requested_version(request) -> int:
+    """Return the payload version asked for with ``?v=``; unknown values fall back to 1."""
+    try:
+        version = int(request.GET.get("v", 1))
+    except ValueError:
+        return 1
+    return version if version in VERSIONS else 1
+
+
+def listing_values(listings: QuerySet) -> QuerySet:
+    """
+    Select exactly the columns the encoders read, with the owner's username joined in.
+    The ``wishlisted`` (``selectors.annotate_wishlisted``) and ``rank`` (search relevance)
+    annotations are carried along when present.
+    """
+    extra = tuple(name for name in ("wishlisted", "rank") if name in listings.query.annotations)
+    return listings.values(*VALUE_FIELDS, *extra, owner_username=F("owner__username"))
+
+
+def encode_listing(row: dict, viewer_id: int | None, version: int = 1) -> dict:
+    """
+    Turn one ``listing_values`` row into the dict sent to clients.
+    Rows carrying ``wishlisted`` also get ``isWishlisted`` (v1) / ``wishlisted`` (v2).
+    Args:
+        row: A row from ``listing_values`` (extra keys such as ``rank`` are ignored).
+        viewer_id: Id of the requesting user, used for ``isMine``; ``None`` when anonymous.
+        version: Payload shape, see the module docstring.
+    """
+    is_mine = viewer_id is not None and row["owner_id"] == viewer_id
+    if version == 2:
+        item = {
+            "id": str(row["id"]),
+            "title": row["title"],
+            "description": row["description"],
+            "price": row["price"],
+            "condition": row["condition"],
+            "location": row["location"],
+            "image_url": row["image_url"],
+            "owner": row["owner_id"],
+            "owner_username": row["owner_username"] or "",
+            "created_at": row["created_at"],
+            "wishlist_count": row["wishlist_count"],
+            "isMine": is_mine,
+        }
+        if "wishlisted" in row:
+            item["wishlisted"] = bool(row["wishlisted"])
+        return item
+    item = {
+        "model": "marketplace_module.listing",
+        "pk": str(row["id"]),
+        "fields": {
+            "title": row["title"],
+            "price": row["price"],
+            "condition": row["condition"],
+            "location": row["location"],
+            "image_url": row["image_url"],
+            "owner": row["owner_id"],
+            "description": row["description"],
+            "owner_username": row["owner_username"] or "",
+            "wishlist_count": row["wishlist_count"],
+        },
+        "isMine": is_mine,
+    }
+    if "wishlisted" in row:
+        item["isWishlisted"] = bool(row["wishlisted"])
+    return item
+
+
+def iter_json_array(items: Iterable[dict]) -> Iterator[bytes]:
+    """Yield the JSON encoding of ``items`` as an array, ``CHUNK_ROWS`` items per chunk."""
+    yield b"["
+    batch = []
+    first = True
+    for item in items:
+        batch.append(_encoder.encode(item))
+        if len(batch) == CHUNK_ROWS:
+            yield (("" if first else ",") + ",".join(batch)).encode("utf-8")
+            batch, first = [], False
+    if batch:
+        yield (("" if first else ",") + ",".join(batch)).encode("utf-8")
+    yield b"]"
+
+
+def listings_response(listings: QuerySet, viewer_id: int | None, version: int = 1, stream: bool = True) -> HttpResponse:
+    """
+    Serialize ``listings`` into a JSON array response.
+    Args:
+        listings: The listings to send, already filtered and ordered.
+        viewer_id: Id of the requesting user (see ``encode_listing``).
+        version: Payload shape, see the module docstring.
+        stream: Send a ``StreamingHttpResponse`` that reads rows from a server-side
+            iterator while writing; otherwise build the body in one go (small results).
+    """
+    rows = listing_values(listings)
+    rows = rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE) if stream else rows
+    chunks = iter_json_array(encode_listing(row, viewer_id, version) for row in rows)
+    if stream:
+        return StreamingHttpResponse(chunks, content_type="application/json")
+    return HttpResponse(b"".join(chunks), content_type="application/json")
+
@@ -0,0 +1,133 @@
+"""
+Write-side helpers for marketplace_module.
+Functions:
+    toggle_wishlist: Adds a listing to a wishlist, or removes it if already saved.
+    apply_wishlist_changes: Applies a batch of wishlist adds and removes in one transaction.
+    reconcile_wishlist_counts: Repairs ``Listing.wishlist_count`` drift from ``Wishlist``.
+"""
+
+import uuid
+from typing import Iterable
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from common.cache import bump_namespace
+from .models import Listing, Wishlist
+
+RECONCILE_BATCH_SIZE = 500
+
+
+def _invalidate_listings() -> None:
+    # Cached listing pages carry wishlist_count and the sort=popular order; drop them
+    # once the new counts are visible to the request that refills the cache
+    transaction.on_commit(lambda: bump_namespace("listings"))
+
+
+def _bump_wishlist_count(listing_ids: Iterable[uuid.UUID], delta: int) -> None:
+    # A single UPDATE with F() so concurrent taps never lose an increment
+    listing_ids = list(listing_ids)
+    if listing_ids:
+        Listing.objects.filter(pk__in=listing_ids).update(
+            wishlist_count=Greatest(F("wishlist_count") + delta, Value(0))
+        )
+        _invalidate_listings()
+
+
+def _lock_wishlist(user: User) -> None:
+    # Serializes the wishlist writes of one user on their row, so what a transaction
+    # read as saved stays true until it commits and counts are bumped exactly once
+    list(User.objects.select_for_update().filter(pk=user.pk).values_list("pk", flat=True))
+
+
+def toggle_wishlist(user: User, listing_id: uuid.UUID) -> str | None:
+    """
+    Flip whether ``listing_id`` is in ``user``'s wishlist and keep ``wishlist_count`` in step.
+    Returns:
+        str | None: ``"added"`` or ``"removed"``; ``None`` if the listing does not exist.
+    """
+    with transaction.atomic():
+        _lock_wishlist(user)
+        deleted, _ = Wishlist.objects.filter(user=user, listing_id=listing_id).delete()
+        if deleted:
+            _bump_wishlist_count([listing_id], -1)
+            return "removed"
+        if not Listing.objects.filter(pk=listing_id).exists():
+            return None
+        try:
+            with transaction.atomic():
+                Wishlist.objects.create(user=user, listing_id=listing_id)
+        except IntegrityError:
+            # A concurrent tap saved it first and already counted it
+            return "added"
+        _bump_wishlist_count([listing_id], 1)
+    return "added"
+
+
+def apply_wishlist_changes(user: User, add: Iterable[uuid.UUID], remove: Iterable[uuid.UUID]) -> dict:
+    """
+    Put the listings in ``add`` into ``user``'s wishlist and take those in ``remove`` out.
+    Adds are idempotent (``bulk_create(ignore_conflicts=True)``) and every remove goes
+    through one ``DELETE``, so replaying a queue of offline taps is safe and costs a
+    fixed number of queries. The user's wishlist writes are serialized for the
+    transaction, so ``wishlist_count`` moves only for rows that really changed.
+    Args:
+        user: Owner of the wishlist.
+        add: Listing ids that should end up saved; unknown or inactive ids are skipped.
+        remove: Listing ids that should end up not saved.
+    Returns:
+        dict: Listing ids (as strings): ``added`` (saved after the call), ``removed``
+        (actually taken out) and ``ignored`` (unknown or inactive adds).
+    """
+    add, remove = set(add), set(remove)
+    with transaction.atomic():
+        _lock_wishlist(user)
+        addable = set(Listing.objects.filter(pk__in=add, is_active=True).values_list("pk", flat=True)) if add else set()
+        saved = set(
+            Wishlist.objects.filter(user=user, listing_id__in=addable | remove).values_list("listing_id", flat=True)
+        ) if addable or remove else set()
+
+        new = addable - saved
+        Wishlist.objects.bulk_create(
+            [Wishlist(user=user, listing_id=listing_id) for listing_id in new],
+            ignore_conflicts=True,
+        )
+        _bump_wishlist_count(new, 1)
+
+        dropped = remove & saved
+        if dropped:
+            Wishlist.objects.filter(user=user, listing_id__in=dropped).delete()
+            _bump_wishlist_count(dropped, -1)
+    return {
+        "added": sorted(str(listing_id) for listing_id in addable),
+        "removed": sorted(str(listing_id) for listing_id in dropped),
+        "ignored": sorted(str(listing_id) for listing_id in add - addable),
+    }
+
+
+def reconcile_wishlist_counts() -> int:
+    """
+    Recount ``wishlist_count`` from ``Wishlist`` for listings whose counter drifted
+    (rows written outside the services above, or races between batches).
+    Returns:
+        int: The number of listings corrected.
+    """
+    actual = Coalesce(
+        Subquery(
+            Wishlist.objects.filter(listing=OuterRef("pk"))
+            .values("listing")
+            .annotate(total=Count("id"))
+            .values("total")
+        ),
+        Value(0),
+    )
+    drifted = [
+        Listing(pk=pk, wishlist_count=total)
+        for pk, total in Listing.objects.annotate(actual=actual)
+        .exclude(wishlist_count=F("actual"))
+        .values_list("pk", "actual")
+    ]
+    Listing.objects.bulk_update(drifted, ["wishlist_count"], batch_size=RECONCILE_BATCH_SIZE)
+    if drifted:
+        _invalidate_listings()
+    return len(drifted)
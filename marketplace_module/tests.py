@@ -1,9 +1,26 @@
 import json
+import uuid
+from io import StringIO
+from unittest.mock import patch
 from decimal import Decimal
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth.models import User
 from .models import Listing, Wishlist
+from .search import rebuild_listing_search_index
+from .services import reconcile_wishlist_counts
+
+
+def _read_json(response):
+    """Decode a JSON body, draining it first when the view streamed it."""
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return response.json()
+
 
 class MarketplaceModelTests(TestCase):
     """
@@ -115,7 +132,7 @@ class MarketplaceAPITests(TestCase):
     def test_get_listings_api(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _read_json(response)
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['fields']['title'], 'API Item')
 
@@ -123,7 +140,7 @@ class MarketplaceAPITests(TestCase):
         Listing.objects.create(owner=self.other_user, title='Other Item', price=100, condition='USED', location='X')
         
         response = self.client.get(self.list_url, {'q': 'API'})
-        data = response.json()
+        data = _read_json(response)
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['fields']['title'], 'API Item')
 
@@ -131,7 +148,7 @@ class MarketplaceAPITests(TestCase):
         Listing.objects.create(owner=self.other_user, title='Used Item', price=100, condition='USED', location='X')
         
         response = self.client.get(self.list_url, {'condition': 'USED'})
-        data = response.json()
+        data = _read_json(response)
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['fields']['title'], 'Used Item')
 
@@ -233,6 +250,287 @@ class MarketplaceAPITests(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.content)
+        data = _read_json(response)
         self.assertEqual(len(data), 1)
-        self.assertEqual(data[0]['pk'], str(self.listing.id))
\ No newline at end of file
+        self.assertEqual(data[0]['pk'], str(self.listing.id))
+
+class MarketplaceCacheTests(TestCase):
+    """
+    Test suite untuk caching get_listings dan invalidasinya.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cache_seller', password='password')
+        self.list_url = reverse('marketplace_module:get_listings')
+
+    def test_listings_are_cached_until_a_listing_changes(self):
+        listing = Listing.objects.create(owner=self.user, title='Cached Ball', description='d', price=10, condition='USED', location='X')
+        # The streamed body is cached once it has been read to the end
+        _read_json(self.client.get(self.list_url))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(_read_json(self.client.get(self.list_url))[0]['fields']['title'], 'Cached Ball')
+
+        listing.title = 'Renamed Ball'
+        listing.save()
+        self.assertEqual(_read_json(self.client.get(self.list_url))[0]['fields']['title'], 'Renamed Ball')
+
+    def test_streams_over_the_size_limit_are_not_cached(self):
+        Listing.objects.create(owner=self.user, title='Big Ball', description='d' * 200, price=10, condition='USED', location='X')
+        with patch('common.cache.STREAM_CACHE_LIMIT', 100):
+            self.assertEqual(_read_json(self.client.get(self.list_url))[0]['fields']['title'], 'Big Ball')
+            response = self.client.get(self.list_url)
+        self.assertTrue(response.streaming)
+        _read_json(response)
+
+
+class ListingSearchTests(TestCase):
+    """
+    Test suite untuk search_listings_api (filter, sort, full-text, keyset pagination).
+    """
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller_a', password='password')
+        self.other = User.objects.create_user(username='seller_b', password='password')
+        self.url = reverse('marketplace_module:search_listings_api')
+        self.ball = Listing.objects.create(owner=self.seller, title='Futsal ball', description='Size 4, barely used',
+                                           price=150000, condition='USED', location='Jakarta Selatan')
+        self.shoes = Listing.objects.create(owner=self.seller, title='Running shoes', description='Comes with a spare ball pump',
+                                            price=400000, condition='BRAND_NEW', location='Bandung')
+        self.racket = Listing.objects.create(owner=self.other, title='Badminton racket', description='Yonex',
+                                             price=250000, condition='USED', location='Jakarta Barat')
+        Listing.objects.create(owner=self.other, title='Old ball', description='Hidden', price=1,
+                               condition='USED', location='Jakarta', is_active=False)
+
+    def _titles(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.json()['listings']]
+
+    def test_filters_combine(self):
+        self.assertEqual(self._titles(condition='USED', location='jakarta'), ['Badminton racket', 'Futsal ball'])
+        self.assertEqual(self._titles(min_price=200000, max_price=300000), ['Badminton racket'])
+        self.assertEqual(self._titles(owner='seller_b'), ['Badminton racket'])
+        self.assertEqual(self._titles(owner=str(self.seller.id), condition='BRAND_NEW'), ['Running shoes'])
+
+    def test_full_text_matches_title_and_description_and_ranks_title_first(self):
+        self.assertEqual(self._titles(q='ball', sort='relevance'), ['Futsal ball', 'Running shoes'])
+        self.assertEqual(self._titles(q='yonex'), ['Badminton racket'])
+        self.assertEqual(self._titles(q='badm'), ['Badminton racket'])
+        self.assertEqual(self._titles(q='"ball" OR NEAR('), [])
+
+    def test_sorts_and_keyset_pagination(self):
+        self.assertEqual(self._titles(sort='price_asc'), ['Futsal ball', 'Badminton racket', 'Running shoes'])
+        self.assertEqual(self._titles(sort='price_desc'), ['Running shoes', 'Badminton racket', 'Futsal ball'])
+
+        first = self.client.get(self.url, {'sort': 'price_asc', 'limit': 2}).json()
+        self.assertEqual(len(first['listings']), 2)
+        rest = self.client.get(self.url, {'sort': 'price_asc', 'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([row['title'] for row in rest['listings']], ['Running shoes'])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'condition': 'MINT'}, {'min_price': 'cheap'}, {'sort': 'random'}, {'cursor': 'bad'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.ball.title = 'Futsal net'
+        self.ball.save(update_fields=['title'])
+        self.assertEqual(self._titles(q='net'), ['Futsal net'])
+
+        self.racket.delete()
+        self.assertEqual(self._titles(q='yonex'), [])
+        self.assertEqual(rebuild_listing_search_index(), 3)
+        self.assertEqual(self._titles(q='ball'), ['Running shoes'])
+
+    def test_is_mine_and_owner_username(self):
+        self.client.login(username='seller_b', password='password')
+        rows = self.client.get(self.url, {'q': 'racket'}).json()['listings']
+        self.assertEqual(rows[0]['owner_username'], 'seller_b')
+        self.assertTrue(rows[0]['isMine'])
+
+
+class ListingSerializerTests(TestCase):
+    """
+    Test suite untuk serializer listing (payload v1/v2, streaming, jumlah query).
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='stream_seller', password='password')
+        for i in range(150):
+            Listing.objects.create(owner=self.user, title=f'Item {i}', description='d', price=i, condition='USED', location='X')
+        self.client.login(username='stream_seller', password='password')
+
+    def test_get_listings_streams_legacy_shape_in_one_query(self):
+        with self.assertNumQueries(3):  # session, user, then one values() query joined to auth_user
+            response = self.client.get(reverse('marketplace_module:get_listings'))
+            data = _read_json(response)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(data), 150)
+        self.assertEqual(set(data[0]), {'model', 'pk', 'fields', 'isMine'})
+        self.assertEqual(data[0]['fields']['owner_username'], 'stream_seller')
+        self.assertTrue(data[0]['isMine'])
+
+    def test_compact_shape_and_detail(self):
+        listing = Listing.objects.first()
+        data = _read_json(self.client.get(reverse('marketplace_module:get_listings'), {'v': 2}))
+        self.assertEqual(data[0]['owner_username'], 'stream_seller')
+        self.assertNotIn('fields', data[0])
+
+        url = reverse('marketplace_module:get_listing_detail', args=[listing.id])
+        detail = self.client.get(url).json()
+        self.assertEqual(detail[0]['pk'], str(listing.id))
+        self.assertEqual(detail[0]['fields']['owner_username'], 'stream_seller')
+        self.assertEqual(self.client.get(url, {'v': 2}).json()[0]['id'], str(listing.id))
+
+
+class WishlistBatchTests(TestCase):
+    """
+    Test suite untuk include=wishlisted, toggle hemat query, dan batch wishlist.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='collector', password='password')
+        seller = User.objects.create_user(username='batch_seller', password='password')
+        self.listings = [
+            Listing.objects.create(owner=seller, title=f'Batch {i}', description='d', price=i, condition='USED', location='X')
+            for i in range(4)
+        ]
+        self.inactive = Listing.objects.create(owner=seller, title='Gone', description='d', price=1,
+                                               condition='USED', location='X', is_active=False)
+        self.batch_url = reverse('marketplace_module:wishlist_batch')
+        self.client.login(username='collector', password='password')
+
+    def _batch(self, **payload):
+        return self.client.post(self.batch_url, json.dumps(payload), content_type='application/json')
+
+    def test_include_wishlisted_is_annotated_in_the_same_query(self):
+        Wishlist.objects.create(user=self.user, listing=self.listings[1])
+        url = reverse('marketplace_module:get_listings')
+
+        with self.assertNumQueries(3):  # session, user, listings with EXISTS(wishlist)
+            data = _read_json(self.client.get(url, {'include': 'wishlisted'}))
+        flags = {row['pk']: row['isWishlisted'] for row in data}
+        self.assertTrue(flags[str(self.listings[1].id)])
+        self.assertFalse(flags[str(self.listings[0].id)])
+        self.assertNotIn('isWishlisted', _read_json(self.client.get(url))[0])
+
+        rows = self.client.get(reverse('marketplace_module:search_listings_api'), {'include': 'wishlisted'}).json()['listings']
+        self.assertEqual([row['title'] for row in rows if row['wishlisted']], ['Batch 1'])
+
+    def test_wishlisted_flag_is_not_served_stale_from_cache(self):
+        url = reverse('marketplace_module:search_listings_api')
+        self.client.get(url, {'include': 'wishlisted'})
+        self.client.post(reverse('marketplace_module:wishlist_toggle'), {'listing_id': self.listings[0].id})
+        rows = self.client.get(url, {'include': 'wishlisted'}).json()['listings']
+        self.assertEqual([row['title'] for row in rows if row['wishlisted']], ['Batch 0'])
+
+    def test_toggle_removal_is_a_single_delete(self):
+        Wishlist.objects.create(user=self.user, listing=self.listings[0])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('marketplace_module:wishlist_toggle'), {'listing_id': self.listings[0].id})
+        self.assertEqual(response.json()['status'], 'removed')
+        wishlist_queries = [q['sql'] for q in ctx.captured_queries if '"marketplace_module_wishlist"' in q['sql']]
+        self.assertEqual(len(wishlist_queries), 1)
+        self.assertTrue(wishlist_queries[0].startswith('DELETE'))
+
+        missing = self.client.post(reverse('marketplace_module:wishlist_toggle'), {'listing_id': uuid.uuid4()})
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(self.client.post(reverse('marketplace_module:wishlist_toggle'), {'listing_id': 'x'}).status_code, 400)
+
+    def test_batch_applies_adds_and_removes_idempotently(self):
+        Wishlist.objects.create(user=self.user, listing=self.listings[0])
+        payload = {
+            'add': [str(self.listings[1].id), str(self.listings[2].id), str(self.inactive.id)],
+            'remove': [str(self.listings[0].id)],
+        }
+        data = self._batch(**payload).json()
+        self.assertEqual(data['added'], sorted([str(self.listings[1].id), str(self.listings[2].id)]))
+        self.assertEqual(data['removed'], [str(self.listings[0].id)])
+        self.assertEqual(data['ignored'], [str(self.inactive.id)])
+
+        # Replaying the same queue changes nothing, and reports nothing as removed
+        data = self._batch(**payload).json()
+        self.assertEqual(data['removed'], [])
+        saved = set(Wishlist.objects.filter(user=self.user).values_list('listing_id', flat=True))
+        self.assertEqual(saved, {self.listings[1].id, self.listings[2].id})
+
+    def test_batch_rejects_bad_payloads(self):
+        self.assertEqual(self._batch(add=['not-a-uuid']).status_code, 400)
+        listing_id = str(self.listings[0].id)
+        self.assertEqual(self._batch(add=[listing_id], remove=[listing_id]).status_code, 400)
+        self.assertEqual(self.client.post(self.batch_url, 'nope', content_type='application/json').status_code, 400)
+
+
+class WishlistCountTests(TestCase):
+    """
+    Test suite untuk wishlist_count yang didenormalisasi dan sort=popular.
+    """
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user(username='count_seller', password='password')
+        self.users = [User.objects.create_user(username=f'fan{i}', password='password') for i in range(3)]
+        self.a, self.b, self.c = [
+            Listing.objects.create(owner=seller, title=title, description='d', price=1, condition='USED', location='X')
+            for title in ('A', 'B', 'C')
+        ]
+        self.toggle_url = reverse('marketplace_module:wishlist_toggle')
+
+    def _toggle(self, user, listing):
+        self.client.force_login(user)
+        return self.client.post(self.toggle_url, {'listing_id': listing.id}).json()['status']
+
+    def _count(self, listing):
+        listing.refresh_from_db(fields=['wishlist_count'])
+        return listing.wishlist_count
+
+    def test_toggle_and_batch_keep_counts_in_step(self):
+        for user in self.users:
+            self._toggle(user, self.b)
+        self._toggle(self.users[0], self.c)
+        self.assertEqual((self._count(self.a), self._count(self.b), self._count(self.c)), (0, 3, 1))
+
+        self.assertEqual(self._toggle(self.users[0], self.b), 'removed')
+        self.assertEqual(self._count(self.b), 2)
+
+        # Re-adding an already saved listing in a batch must not count it twice
+        batch = {'add': [str(self.c.id), str(self.a.id)], 'remove': [str(self.b.id)]}
+        self.client.post(reverse('marketplace_module:wishlist_batch'), json.dumps(batch), content_type='application/json')
+        self.assertEqual((self._count(self.a), self._count(self.b), self._count(self.c)), (1, 2, 1))
+
+    def test_sort_popular_without_aggregation(self):
+        for user in self.users:
+            self._toggle(user, self.c)
+        self._toggle(self.users[0], self.a)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = _read_json(self.client.get(reverse('marketplace_module:get_listings'), {'sort': 'popular'}))
+        self.assertEqual([row['fields']['title'] for row in data], ['C', 'A', 'B'])
+        self.assertEqual(data[0]['fields']['wishlist_count'], 3)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+        rows = self.client.get(reverse('marketplace_module:search_listings_api'), {'sort': 'popular'}).json()['listings']
+        self.assertEqual([row['title'] for row in rows], ['C', 'A', 'B'])
+
+    def test_wishlist_changes_invalidate_cached_popular_page(self):
+        url = reverse('marketplace_module:get_listings')
+        self._toggle(self.users[0], self.a)
+        self.assertEqual(_read_json(self.client.get(url, {'sort': 'popular'}))[0]['fields']['title'], 'A')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users[:2]:
+                self._toggle(user, self.c)
+        self.assertEqual(_read_json(self.client.get(url, {'sort': 'popular'}))[0]['fields']['title'], 'C')
+
+        # Rows written behind the services' back only show up after a reconcile
+        Wishlist.objects.bulk_create([Wishlist(user=user, listing=self.b) for user in self.users])
+        with self.captureOnCommitCallbacks(execute=True):
+            reconcile_wishlist_counts()
+        self.assertEqual(_read_json(self.client.get(url, {'sort': 'popular'}))[0]['fields']['title'], 'B')
+
+    def test_reconcile_repairs_drift(self):
+        Wishlist.objects.create(user=self.users[0], listing=self.a)
+        Listing.objects.filter(pk=self.b.pk).update(wishlist_count=7)
+        call_command('reconcile_wishlist_counts', stdout=StringIO())
+        self.assertEqual((self._count(self.a), self._count(self.b)), (1, 0))
+        self.assertEqual(reconcile_wishlist_counts(), 0)
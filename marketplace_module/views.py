@@ -2,7 +2,6 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_GET, require_POST
-from django.core import serializers
 from django.urls import reverse
 import json, uuid  
 from marketplace_module.models import Listing, Wishlist
@@ -11,6 +10,11 @@ from django.utils.html import strip_tags
 from decimal import Decimal, InvalidOperation
 from django.middleware.csrf import get_token
 from django.contrib.auth.models import User
+from common.cache import cache_view
+from .search import SORTS, search_listings
+from .selectors import annotate_wishlisted
+from .serializers import encode_listing, listing_values, listings_response, requested_version
+from .services import apply_wishlist_changes, toggle_wishlist
 
 
 # show todays pick page
@@ -20,10 +24,9 @@ def todays_pick(request):
     
     page_configuration = {
         "isAuthenticated": request.user.is_authenticated,
-        "apiListings": reverse("marketplace_module:get_listings"),
+        "apiListings": reverse("marketplace_module:search_listings_api"),
         "detailUrlPattern": reverse("marketplace_module:listing_detail",kwargs={"listing_id": placeholder_uuid}),
         "currentUserId": request.user.id if request.user.is_authenticated else None,
-        "wishlistIdsUrl": reverse("marketplace_module:wishlist_ids"),
         "wishlistToggleUrl": reverse("marketplace_module:wishlist_toggle"),
         "apiWishlistListings": reverse("marketplace_module:wishlist_listings"),
         "apiToggleWishlist": reverse("marketplace_module:wishlist_toggle"),
@@ -86,17 +89,80 @@ def add_listing_entry_ajax(request):
     except Exception as e:
         return JsonResponse({"error": "exception", "message": str(e)}, status=500)
 
-import json
-from django.http import HttpResponse
-from django.core import serializers
-from django.views.decorators.http import require_GET
+SEARCH_PAGE_SIZE = 24
+SEARCH_MAX_PAGE_SIZE = 60
+WISHLIST_BATCH_LIMIT = 200
+
+
+def _optional_int(request, name):
+    raw = request.GET.get(name, "").strip()
+    if not raw:
+        return None
+    value = int(raw)
+    if value < 0:
+        raise ValueError(name)
+    return value
+
+
+def _wants_wishlisted(request):
+    return "wishlisted" in request.GET.get("include", "").split(",")
+
+
+def _search_listings(request):
+    condition = request.GET.get("condition", "").strip()
+    if condition and condition not in Listing.Condition.values:
+        return JsonResponse({"error": "invalid_condition"}, status=400)
+    try:
+        min_price = _optional_int(request, "min_price")
+        max_price = _optional_int(request, "max_price")
+    except ValueError:
+        return JsonResponse({"error": "invalid_price"}, status=400)
+    try:
+        limit = min(max(int(request.GET.get("limit", SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+
+    try:
+        rows, next_cursor = search_listings(
+            request.GET.get("q", ""),
+            condition=condition or None,
+            min_price=min_price,
+            max_price=max_price,
+            location=request.GET.get("location", "").strip() or None,
+            owner=request.GET.get("owner", "").strip() or None,
+            wishlisted_for=request.user if _wants_wishlisted(request) else None,
+            sort=request.GET.get("sort", "newest"),
+            cursor=request.GET.get("cursor") or None,
+            page_size=limit,
+        )
+    except ValueError:
+        return JsonResponse({"error": "invalid_query"}, status=400)
+
+    user_id = request.user.id if request.user.is_authenticated else None
+    return JsonResponse({
+        "listings": [encode_listing(row, user_id, version=2) for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+_cached_search_listings = cache_view("listings", per_user=True)(_search_listings)
 
-from .models import Listing
 
 @require_GET
-def get_listings(request):
-    VALID_CONDITIONS = ("BRAND_NEW", "USED")
-    print("GET params:", request.GET)
+def search_listings_api(request):
+    """Filtered, sorted, keyset-paginated listing search.
+    Query params: ``q``, ``condition``, ``min_price``, ``max_price``, ``location``, ``owner``,
+    ``sort`` (newest, price_asc, price_desc, popular, relevance), ``cursor``, ``limit`` and
+    ``include=wishlisted``.
+    Returns ``{"listings": [...], "next_cursor": ...}``.
+    Responses with ``include=wishlisted`` change with the viewer's wishlist and bypass the cache.
+    """
+    if _wants_wishlisted(request):
+        return _search_listings(request)
+    return _cached_search_listings(request)
+
+
+def _listings(request):
     listings_queryset = Listing.objects.filter(is_active=True)
 
     # search filter
@@ -106,55 +172,44 @@ def get_listings(request):
 
     # condition filter
     condition_filter = request.GET.get("condition")
-    if condition_filter in VALID_CONDITIONS:
+    if condition_filter in Listing.Condition.values:
         listings_queryset = listings_queryset.filter(condition=condition_filter)
 
-    # serialize 
-    serialized_listings = serializers.serialize(
-        "json",
-        listings_queryset,
-        fields=("title", "price", "condition", "location", "image_url", "owner","description"),
-    )
+    # popular: ordered scan of listing_active_popular, no per-request Count()
+    if request.GET.get("sort") == "popular":
+        listings_queryset = listings_queryset.order_by(*SORTS["popular"])
+
+    if _wants_wishlisted(request):
+        listings_queryset = annotate_wishlisted(listings_queryset, request.user)
 
-    data = json.loads(serialized_listings)
     user_id = request.user.id if request.user.is_authenticated else None
+    return listings_response(listings_queryset, user_id, requested_version(request))
 
-    owner_ids = set(obj['fields']['owner'] for obj in data)
-    users_map = User.objects.filter(id__in=owner_ids).in_bulk()
 
-    for obj in data:
-        owner_id = obj["fields"]["owner"] 
-        obj["isMine"] = bool(user_id is not None and owner_id == user_id)
-        owner_user = users_map.get(owner_id)
-        obj["fields"]["owner_username"] = owner_user.username if owner_user else ""
+_cached_listings = cache_view("listings", per_user=True)(_listings)
 
-    return HttpResponse(
-        json.dumps(data),
-        content_type="application/json",
-    )
+
+@require_GET
+def get_listings(request):
+    """Every active listing, streamed (``?v=2`` for the compact shape, ``sort=popular`` for most wishlisted first).
+    ``include=wishlisted`` adds the viewer's wishlist flag in the same query and bypasses the cache.
+    New clients should use ``search_listings_api``, which is paginated.
+    """
+    if _wants_wishlisted(request):
+        return _listings(request)
+    return _cached_listings(request)
 
 
 # get listing detail
 @require_GET
 def get_listing_detail(request, listing_id):
-    listing_queryset = Listing.objects.filter(pk=listing_id, is_active=True)
-    
-    if not listing_queryset.exists():
+    rows = list(listing_values(Listing.objects.filter(pk=listing_id, is_active=True)))
+    if not rows:
         return JsonResponse({"detail": "Not found"}, status=404)
 
-    serialized_listing = serializers.serialize(
-        "json",
-        listing_queryset,
-        fields=("title", "price", "condition", "location", "image_url", "description", "owner"),
-    )
-    
-    data = json.loads(serialized_listing)
-
-    if data:
-        listing_obj = listing_queryset.first()
-        data[0]['fields']['owner_username'] = listing_obj.owner.username
-
-    return HttpResponse(json.dumps(data), content_type="application/json")
+    user_id = request.user.id if request.user.is_authenticated else None
+    data = [encode_listing(rows[0], user_id, requested_version(request))]
+    return JsonResponse(data, safe=False)
 
 # show wishlist page
 @login_required
@@ -189,33 +244,49 @@ def wishlist_ids(request):
 @login_required
 @require_GET
 def wishlist_listings(request):
-    from marketplace_module.models import Wishlist, Listing
-    listing_ids = Wishlist.objects.filter(user=request.user)\
-                                  .values_list("listing_id", flat=True)
-    qs = Listing.objects.filter(pk__in=listing_ids, is_active=True)
-    data = serializers.serialize(
-        "json",
-        qs,
-        fields=("title", "price", "condition", "location", "image_url", "owner"),
+    listings = Listing.objects.filter(
+        pk__in=Wishlist.objects.filter(user=request.user).values("listing_id"),
+        is_active=True,
     )
-    return HttpResponse(data, content_type="application/json")
+    return listings_response(listings, request.user.id, requested_version(request))
 
 # toggle wishlist
 @csrf_exempt
 @require_POST
 @login_required
 def wishlist_toggle(request):
-    from marketplace_module.models import Wishlist, Listing
-    listing_id = request.POST.get("listing_id")
-    if not listing_id:
+    try:
+        listing_id = uuid.UUID(request.POST.get("listing_id", ""))
+    except ValueError:
         return JsonResponse({"error": "missing_listing_id"}, status=400)
 
-    listing = get_object_or_404(Listing, pk=listing_id)
-    obj, created = Wishlist.objects.get_or_create(user=request.user, listing=listing)
-    if created:
-        return JsonResponse({"status": "added", "id": str(listing.pk)})
-    obj.delete()
-    return JsonResponse({"status": "removed", "id": str(listing.pk)})
+    status = toggle_wishlist(request.user, listing_id)
+    if status is None:
+        return JsonResponse({"detail": "Not found"}, status=404)
+    return JsonResponse({"status": status, "id": str(listing_id)})
+
+# apply queued wishlist changes
+@csrf_exempt
+@require_POST
+@login_required
+def wishlist_batch(request):
+    """Apply many wishlist changes at once (offline clients replaying queued taps).
+    Body (JSON): ``{"add": [listing ids], "remove": [listing ids]}``.
+    Returns the ``added``, ``removed`` and ``ignored`` ids.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+        add = [uuid.UUID(str(listing_id)) for listing_id in payload.get("add", [])]
+        remove = [uuid.UUID(str(listing_id)) for listing_id in payload.get("remove", [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({"error": "invalid_payload"}, status=400)
+
+    if len(add) + len(remove) > WISHLIST_BATCH_LIMIT:
+        return JsonResponse({"error": "too_many_ids", "limit": WISHLIST_BATCH_LIMIT}, status=400)
+    if set(add) & set(remove):
+        return JsonResponse({"error": "conflicting_ids"}, status=400)
+
+    return JsonResponse({"status": "ok", **apply_wishlist_changes(request.user, add, remove)})
 
 # edit listing with AJAX
 @csrf_exempt
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_pairs(apps, schema_editor):
+    Conversation = apps.get_model('message_module', 'Conversation')
+    ConversationMember = apps.get_model('message_module', 'ConversationMember')
+
+    members = {}
+    for conversation_id, user_id in ConversationMember.objects.values_list('conversation_id', 'user_id').iterator():
+        members.setdefault(conversation_id, set()).add(user_id)
+
+    # When duplicates already exist, the most recently active chat owns the pair
+    seen = set()
+    ordering = (models.F('last_message_at').desc(nulls_last=True), '-created_at')
+    for conversation in Conversation.objects.order_by(*ordering).only('id').iterator():
+        user_ids = members.get(conversation.id, set())
+        if len(user_ids) != 2:
+            continue
+        pair = tuple(sorted(user_ids))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        Conversation.objects.filter(pk=conversation.pk).update(user_low_id=pair[0], user_high_id=pair[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_module', '0004_message_conversation_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='user_high',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_low',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='conversation_unique_pair'),
+        ),
+    ]
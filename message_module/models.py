@@ -4,6 +4,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
+from common.choices import MediaStatus
 from common.utils.validator_image import validate_image_size
 from profile_module.models import Profile
 from django.core.exceptions import ValidationError
@@ -16,8 +17,13 @@ class Conversation(models.Model):
         title (CharField): An optional title for the conversation.
         last_message_preview (CharField): A preview of the last message in the conversation.
         last_message_at (DateTimeField): The timestamp of the last message in the conversation.
+        user_low (ForeignKey): For a two-person chat, the participant with the smaller user id.
+        user_high (ForeignKey): For a two-person chat, the participant with the larger user id.
         created_at (DateTimeField): The timestamp when the conversation was created.
         updated_at (DateTimeField): The timestamp when the conversation was last updated.
+    Meta:
+        constraints (list): At most one two-person chat per ``(user_low, user_high)`` pair;
+                            the unique index also serves the pair lookup.
     Methods:
         update_last_message(message): Updates the last message preview and timestamp.
         __str__(): Returns a string representation of the conversation.
@@ -31,9 +37,33 @@ class Conversation(models.Model):
     title = models.CharField(max_length=255, blank=True, null=True)
     last_message_preview = models.CharField(max_length=200, blank=True, null=True)
     last_message_at = models.DateTimeField(null=True, blank=True)
+    user_low = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    user_high = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_low", "user_high"], name="conversation_unique_pair"),
+        ]
+
+    @staticmethod
+    def pair_key(user_a, user_b):
+        """Return the ``(user_low_id, user_high_id)`` key of a two-person chat between two users."""
+        return tuple(sorted((user_a.pk, user_b.pk)))
+
     def clean(self):
         """Ensure that a conversation has at most 2 members."""
         if self.pk and self.members.count() > 2:
@@ -64,7 +94,10 @@ class Message(models.Model):
         sender (ForeignKey): The user who sent the message.
         body (TextField): The text content of the message.
         image (CloudinaryField): An optional image associated with the message.
+        image_status (CharField): Upload state of ``image`` (see ``common.media``).
         created_at (DateTimeField): The timestamp when the message was created.
+    Meta:
+        indexes (list): Serves the newest-messages range scans of a single conversation.
     Methods:
         sender_display_name(): Returns the display name of the sender.
         sender_display_avatar(): Returns the avatar URL of the sender.
@@ -83,8 +116,14 @@ class Message(models.Model):
     )
     body = models.TextField(blank=True)
     image = CloudinaryField("image", blank=True, null=True, validators=[validate_image_size])
+    image_status = models.CharField(max_length=10, choices=MediaStatus.choices, default=MediaStatus.READY)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["conversation", "created_at", "id"], name="message_conversation_recent"),
+        ]
+
     @property
     def sender_display_name(self):
         if hasattr(self.sender, 'profile') and self.sender.profile:
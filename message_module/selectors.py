@@ -0,0 +1,33 @@
+"""
+Read-side helpers for message_module.
+Functions:
+    unread_counts: Number of unread messages per conversation of a user.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Q, QuerySet
+from .models import Message
+
+
+def unread_counts(user: User) -> QuerySet:
+    """
+    Return ``{"conversation_id", "unread"}`` rows for the conversations of ``user``
+    that have unread messages, as one grouped query.
+    A message is unread when someone else sent it after the member's ``last_read_at``
+    (every message counts while ``last_read_at`` is empty).
+    """
+    # Both conditions sit in one filter() so they apply to the same membership row
+    return (
+        Message.objects
+        .filter(
+            Q(conversation__members__user=user)
+            & (
+                Q(conversation__members__last_read_at__isnull=True)
+                | Q(created_at__gt=F("conversation__members__last_read_at"))
+            )
+        )
+        .exclude(sender=user)
+        .values("conversation_id")
+        .annotate(unread=Count("id"))
+        .order_by()
+    )
@@ -0,0 +1,42 @@
+"""
+Write-side helpers for message_module.
+Functions:
+    get_or_create_direct_conversation: Finds or creates the two-person chat between two users.
+"""
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from .models import Conversation, ConversationMember
+
+
+def get_or_create_direct_conversation(user: User, other: User) -> tuple[Conversation, bool]:
+    """
+    Return the two-person chat between ``user`` and ``other``, creating it if needed.
+    The lookup is a single probe of the ``conversation_unique_pair`` index. Creation runs
+    in a transaction; when a concurrent request wins the race, the unique constraint
+    rejects the duplicate and the winner's conversation is returned instead.
+    Args:
+        user: the user starting the chat (recorded as ``created_by``).
+        other: the other participant; must differ from ``user``.
+    Returns:
+        tuple: ``(conversation, created)``.
+    """
+    user_low_id, user_high_id = Conversation.pair_key(user, other)
+    conversation = Conversation.objects.filter(user_low_id=user_low_id, user_high_id=user_high_id).first()
+    if conversation is not None:
+        return conversation, False
+
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(
+                created_by=user,
+                user_low_id=user_low_id,
+                user_high_id=user_high_id,
+            )
+            ConversationMember.objects.bulk_create([
+                ConversationMember(conversation=conversation, user=user),
+                ConversationMember(conversation=conversation, user=other),
+            ])
+    except IntegrityError:
+        return Conversation.objects.get(user_low_id=user_low_id, user_high_id=user_high_id), False
+    return conversation, True
@@ -1,12 +1,26 @@
+import asyncio
+import importlib
+import tempfile
+import threading
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.utils.html import escape
+from message_module import views
 from message_module.models import Conversation, ConversationMember, Message
 from profile_module.models import Profile
 from django.core.exceptions import ValidationError
 from uuid import uuid4
+from common.pubsub import LocalBus
+from profile_module import search
+from message_module.selectors import unread_counts
+from message_module.services import get_or_create_direct_conversation
 
 
 class MessageModuleTests(TestCase):
@@ -106,6 +120,26 @@ class MessageModuleTests(TestCase):
         resp = self.client.post(url, {"image": bad})
         self.assertEqual(resp.status_code, 400)
 
+    def test_send_message_image_is_uploaded_in_background(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from common.media import process_pending_uploads
+
+        self.login_u1()
+        conv = self.make_conversation()
+        url = reverse("message_module:send_message", args=[conv.id])
+        img = SimpleUploadedFile("pic.png", b"png-bytes", content_type="image/png")
+        with tempfile.TemporaryDirectory() as tmp, self.settings(
+            MEDIA_BACKEND="common.media.LocalBackend", MEDIA_SPOOL_DIR=tmp, MEDIA_LOCAL_BACKEND_DIR=tmp, MEDIA_UPLOAD_WORKERS=0,
+        ):
+            data = self.client.post(url, {"image": img}).json()
+            self.assertIsNone(data["image_url"])
+            self.assertEqual(data["image_status"], "pending")
+
+            self.assertEqual(process_pending_uploads(), 1)
+        msg = Message.objects.get(id=data["id"])
+        self.assertEqual(msg.image_status, "ready")
+        self.assertTrue(msg.image)
+
     def test_send_message_requires_membership(self):
         conv = self.make_conversation()
         self.login_u3()
@@ -247,4 +281,338 @@ class MessageModuleViewsExtraBranchesTests(TestCase):
         resp = self.client.get(url, {"last_msg_id": uuid4()})
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
-        self.assertEqual(data["messages"], [])
\ No newline at end of file
+        self.assertEqual(data["messages"], [])
+
+    def test_poll_messages_rejects_non_members(self):
+        User.objects.create_user(username="eve", password="pw123")
+        Message.objects.create(conversation=self.conv, sender=self.u1, body="private")
+        self.client.login(username="eve", password="pw123")
+        resp = self.client.get(reverse("message_module:poll_messages", args=[self.conv.id]))
+        self.assertEqual(resp.status_code, 403)
+        self.assertNotIn("private", resp.content.decode())
+
+    def test_poll_messages_delivers_messages_sharing_a_timestamp(self):
+        self.client.login(username="alice", password="pw123")
+        sent = [Message.objects.create(conversation=self.conv, sender=self.u1, body=f"m{i}") for i in range(3)]
+        Message.objects.filter(pk__in=[m.pk for m in sent]).update(created_at=timezone.now())
+        first, *rest = sorted(sent, key=lambda m: m.id)
+
+        url = reverse("message_module:poll_messages", args=[self.conv.id])
+        data = self.client.get(url, {"last_msg_id": str(first.id)}).json()["messages"]
+        self.assertEqual([m["id"] for m in data], [str(m.id) for m in rest])
+
+class MessagePushTests(TestCase):
+    """
+    Tests for the pub/sub bus and the long-poll endpoint
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.u1 = User.objects.create_user(username="alice", password="pw123")
+        self.u2 = User.objects.create_user(username="bob", password="pw123")
+        self.u3 = User.objects.create_user(username="charlie", password="pw123")
+        Profile.objects.create(user=self.u1, display_name="Alice")
+        Profile.objects.create(user=self.u2, display_name="Bob")
+
+        self.conv = Conversation.objects.create(created_by=self.u1)
+        ConversationMember.objects.create(conversation=self.conv, user=self.u1)
+        ConversationMember.objects.create(conversation=self.conv, user=self.u2)
+        self.url = reverse("message_module:wait_messages", args=[self.conv.id])
+        self.client.login(username="alice", password="pw123")
+
+    def test_local_bus_wakes_waiter(self):
+        bus = LocalBus()
+        threading.Timer(0.05, bus.publish, args=["room"]).start()
+        self.assertEqual(bus.wait("room", 0, timeout=5), 1)
+        self.assertEqual(bus.wait("room", 1, timeout=0.01), 1)
+
+    def test_wait_without_version_returns_messages_now(self):
+        Message.objects.create(conversation=self.conv, sender=self.u2, body="hi")
+
+        data = self.client.get(self.url).json()
+
+        self.assertEqual([m["body"] for m in data["messages"]], ["hi"])
+        self.assertTrue(data["version"])
+
+    def test_idle_wait_times_out_without_reading_messages(self):
+        version = self.client.get(self.url).json()["version"]
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {"version": version, "timeout": 0}).json()
+
+        self.assertEqual(data, {"messages": [], "version": version})
+        self.assertFalse(any("message_module_message" in q["sql"] for q in queries.captured_queries))
+
+    def test_send_message_publishes_to_waiters(self):
+        version = self.client.get(self.url).json()["version"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("message_module:send_message", args=[self.conv.id]), {"message": "ping"})
+
+        data = self.client.get(self.url, {"version": version, "timeout": 0}).json()
+
+        self.assertNotEqual(data["version"], version)
+        self.assertEqual([m["body"] for m in data["messages"]], ["ping"])
+
+    async def test_await_change_wakes_coroutine(self):
+        bus = LocalBus()
+        asyncio.get_running_loop().call_later(0.05, bus.publish, "room")
+        self.assertEqual(await bus.await_change("room", 0, timeout=5), 1)
+        self.assertEqual(await bus.await_change("room", 1, timeout=0.01), 1)
+
+    async def test_wait_messages_is_served_asynchronously(self):
+        self.assertTrue(asyncio.iscoroutinefunction(views.wait_messages))
+        await self.async_client.aforce_login(self.u1)
+
+        response = await self.async_client.get(self.url, {"timeout": 0})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["messages"], [])
+
+    def test_wait_requires_membership(self):
+        self.client.login(username="charlie", password="pw123")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class MessageUnreadTests(TestCase):
+    """
+    Tests for read cursors and unread counts
+    """
+    def setUp(self):
+        self.client = Client()
+        self.u1 = User.objects.create_user(username="alice", password="pw123")
+        self.u2 = User.objects.create_user(username="bob", password="pw123")
+        self.u3 = User.objects.create_user(username="charlie", password="pw123")
+        for user, name in ((self.u1, "Alice"), (self.u2, "Bob"), (self.u3, "Charlie")):
+            Profile.objects.create(user=user, display_name=name)
+
+        self.conv_bob = Conversation.objects.create(created_by=self.u1)
+        ConversationMember.objects.create(conversation=self.conv_bob, user=self.u1)
+        ConversationMember.objects.create(conversation=self.conv_bob, user=self.u2)
+        self.conv_charlie = Conversation.objects.create(created_by=self.u1)
+        ConversationMember.objects.create(conversation=self.conv_charlie, user=self.u1)
+        ConversationMember.objects.create(conversation=self.conv_charlie, user=self.u3)
+
+        self.m1 = Message.objects.create(conversation=self.conv_bob, sender=self.u2, body="one")
+        self.m2 = Message.objects.create(conversation=self.conv_bob, sender=self.u2, body="two")
+        Message.objects.create(conversation=self.conv_bob, sender=self.u1, body="mine")
+        Message.objects.create(conversation=self.conv_charlie, sender=self.u3, body="hey")
+        self.client.login(username="alice", password="pw123")
+
+    def unread_by_id(self):
+        data = self.client.get(reverse("message_module:api_conversations")).json()["conversations"]
+        return {c["id"]: c["unread_count"] for c in data}
+
+    def test_conversation_list_reports_unread_counts(self):
+        self.assertEqual(self.unread_by_id(), {str(self.conv_bob.id): 2, str(self.conv_charlie.id): 1})
+
+    def test_unread_counts_use_one_query(self):
+        with self.assertNumQueries(1):
+            rows = list(unread_counts(self.u1))
+        self.assertEqual(len(rows), 2)
+
+    def test_mark_read_up_to_message(self):
+        url = reverse("message_module:api_mark_read", args=[self.conv_bob.id])
+        resp = self.client.post(url, {"last_msg_id": str(self.m1.id)})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.unread_by_id()[str(self.conv_bob.id)], 1)
+
+        self.client.post(url)
+        self.assertEqual(self.unread_by_id()[str(self.conv_bob.id)], 0)
+
+        # An older message never moves the cursor back
+        self.client.post(url, {"last_msg_id": str(self.m1.id)})
+        self.assertEqual(self.unread_by_id()[str(self.conv_bob.id)], 0)
+
+    def test_mark_read_rejects_non_members_and_unknown_messages(self):
+        url = reverse("message_module:api_mark_read", args=[self.conv_charlie.id])
+        self.assertEqual(self.client.post(url, {"last_msg_id": str(self.m1.id)}).status_code, 400)
+
+        self.client.login(username="bob", password="pw123")
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_opening_chat_marks_it_read(self):
+        self.client.get(reverse("message_module:chat_view", args=[self.conv_bob.id]))
+        self.assertEqual(self.unread_by_id(), {str(self.conv_bob.id): 0, str(self.conv_charlie.id): 1})
+
+
+class DirectConversationTests(TestCase):
+    """
+    Tests for the canonical pair key of two-person chats
+    """
+    def setUp(self):
+        self.client = Client()
+        self.u1 = User.objects.create_user(username="alice", password="pw123")
+        self.u2 = User.objects.create_user(username="bob", password="pw123")
+        Profile.objects.create(user=self.u1, display_name="Alice")
+        Profile.objects.create(user=self.u2, display_name="Bob")
+
+    def test_pair_is_order_independent(self):
+        convo, created = get_or_create_direct_conversation(self.u2, self.u1)
+        self.assertTrue(created)
+        self.assertEqual((convo.user_low_id, convo.user_high_id), (self.u1.id, self.u2.id))
+        self.assertEqual(convo.members.count(), 2)
+
+        with self.assertNumQueries(1):
+            again, created = get_or_create_direct_conversation(self.u1, self.u2)
+        self.assertFalse(created)
+        self.assertEqual(again, convo)
+
+    def test_duplicate_pair_is_rejected(self):
+        get_or_create_direct_conversation(self.u1, self.u2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Conversation.objects.create(created_by=self.u2, user_low=self.u1, user_high=self.u2)
+
+    def test_losing_a_creation_race_returns_the_winner(self):
+        winner, _ = get_or_create_direct_conversation(self.u1, self.u2)
+        with patch.object(QuerySet, "first", return_value=None):
+            convo, created = get_or_create_direct_conversation(self.u2, self.u1)
+        self.assertFalse(created)
+        self.assertEqual(convo, winner)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_start_chat_api_reuses_conversation(self):
+        self.client.login(username="alice", password="pw123")
+        url = reverse("message_module:api_start_chat", args=["bob"])
+
+        first = self.client.post(url)
+        second = self.client.post(url)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.json(), {"status": "exists", "conversation_id": first.json()["conversation_id"]})
+
+
+class MessageHistoryTests(TestCase):
+    """
+    Tests for the paginated message history of the chat view
+    """
+    def setUp(self):
+        self.client = Client()
+        self.u1 = User.objects.create_user(username="alice", password="pw123")
+        self.u2 = User.objects.create_user(username="bob", password="pw123")
+        self.u3 = User.objects.create_user(username="charlie", password="pw123")
+        Profile.objects.create(user=self.u1, display_name="Alice")
+        Profile.objects.create(user=self.u2, display_name="Bob")
+        self.conv, _ = get_or_create_direct_conversation(self.u1, self.u2)
+        self.total = views.HISTORY_PAGE_SIZE + 5
+        self.messages = [
+            Message.objects.create(conversation=self.conv, sender=self.u2, body=f"msg {i}")
+            for i in range(self.total)
+        ]
+        self.client.login(username="alice", password="pw123")
+
+    def test_chat_view_renders_only_newest_page(self):
+        resp = self.client.get(reverse("message_module:chat_view", args=[self.conv.id]))
+
+        shown = resp.context["messages"]
+        self.assertEqual(len(shown), views.HISTORY_PAGE_SIZE)
+        self.assertEqual(shown[-1], self.messages[-1])
+        self.assertEqual(resp.context["last_message_id"], str(self.messages[-1].id))
+        self.assertTrue(resp.context["older_cursor"])
+        self.assertNotIn("users", resp.context)
+
+    def test_history_pages_back_to_the_first_message(self):
+        resp = self.client.get(reverse("message_module:chat_view", args=[self.conv.id]))
+        url = reverse("message_module:message_history", args=[self.conv.id])
+
+        data = self.client.get(url, {"before": resp.context["older_cursor"]}).json()
+
+        self.assertIsNone(data["before"])
+        self.assertEqual(data["html"].count("data-id="), 5)
+        self.assertIn("msg 0", data["html"])
+        self.assertNotIn(f"msg {self.total - 1}", data["html"])
+
+    def test_history_rejects_bad_cursor_and_non_members(self):
+        url = reverse("message_module:message_history", args=[self.conv.id])
+        self.assertEqual(self.client.get(url, {"before": "not-a-cursor"}).status_code, 400)
+
+        self.client.login(username="charlie", password="pw123")
+        self.assertEqual(self.client.get(url).status_code, 404)
+        resp = self.client.get(reverse("message_module:chat_view", args=[self.conv.id]))
+        self.assertEqual(resp.url, reverse("message_module:chat_home"))
+
+
+class UserSearchTests(TestCase):
+    """
+    Tests for the ranked, paginated user search API
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.me = User.objects.create_user(username="me", password="pw123")
+        self.exact = User.objects.create_user(username="alex", password="pw123")
+        self.prefix = User.objects.create_user(username="alexander", password="pw123")
+        self.fuzzy = User.objects.create_user(username="malexa", password="pw123")
+        self.other = User.objects.create_user(username="bob", password="pw123")
+        Profile.objects.create(user=self.other, display_name="Bobby Alexson")
+        self.url = reverse("message_module:api_search_users")
+        self.client.login(username="me", password="pw123")
+
+    def usernames(self, **params):
+        return [u["username"] for u in self.client.get(self.url, params).json()["users"]]
+
+    def test_ranks_exact_then_prefix_then_fuzzy(self):
+        found = self.usernames(q="alex")
+        self.assertEqual(found[0], "alex")
+        self.assertLess(found.index("alexander"), found.index("malexa"))
+        self.assertIn("bob", found)
+        self.assertNotIn("me", found)
+
+    def test_followed_and_chat_partners_are_boosted(self):
+        from profile_module.models import Follow
+        Follow.objects.create(follower=self.me, followee=self.fuzzy)
+        get_or_create_direct_conversation(self.me, self.other)
+
+        found = self.usernames(q="alex")
+        self.assertEqual(found[0], "alex")
+        # Inside the "word prefix" tier the chat partner outranks the stranger
+        self.assertLess(found.index("bob"), found.index("alexander"))
+        self.assertEqual(self.usernames(q=""), ["malexa", "bob"])
+
+    def test_cursor_pagination_and_short_queries(self):
+        first = self.client.get(self.url, {"q": "alex", "limit": 2}).json()
+        self.assertEqual(len(first["users"]), 2)
+        rest = self.client.get(self.url, {"q": "alex", "limit": 2, "cursor": first["next_cursor"]}).json()
+        self.assertIsNone(rest["next_cursor"])
+        names = [u["username"] for u in first["users"] + rest["users"]]
+        self.assertEqual(sorted(names), ["alex", "alexander", "bob", "malexa"])
+
+        self.assertEqual(self.usernames(q="a"), [])
+        self.assertEqual(self.client.get(self.url, {"q": "alex", "cursor": "bad"}).status_code, 400)
+
+    def test_renames_invalidate_the_index(self):
+        self.assertEqual(self.usernames(q="zed"), [])
+        self.other.profile.display_name = "Zed"
+        self.other.profile.save()
+        self.assertEqual(self.usernames(q="zed"), ["bob"])
+
+    def test_renames_are_applied_without_a_full_rebuild(self):
+        self.assertEqual(self.usernames(q="zed"), [])
+        with patch.object(search._NgramIndex, "_rebuild") as rebuild:
+            self.other.profile.display_name = "Zed"
+            self.other.profile.save()
+            self.prefix.username = "zedder"
+            self.prefix.save()
+            self.assertEqual(sorted(self.usernames(q="zed")), ["bob", "zedder"])
+            self.assertNotIn("zedder", self.usernames(q="alexander"))
+        rebuild.assert_not_called()
+
+        # A change that fell out of the log forces a rebuild
+        search.invalidate_user_search()
+        self.fuzzy.delete()
+        self.assertNotIn("malexa", self.usernames(q="alex"))
+
+    def test_migration_skips_trigram_indexes_without_pg_trgm(self):
+        migration = importlib.import_module("profile_module.migrations.0006_user_search_trgm")
+        schema_editor = MagicMock()
+        schema_editor.connection.vendor = "postgresql"
+        schema_editor.connection.alias = "default"
+        cursor = schema_editor.connection.cursor.return_value.__enter__.return_value
+        # Not installed yet, available on the server, but the role may not create it
+        cursor.fetchone.side_effect = [None, (1,)]
+        schema_editor.execute.side_effect = DatabaseError("permission denied to create extension")
+
+        migration.create_trigram_indexes(None, schema_editor)
+        schema_editor.execute.assert_called_once_with("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        with patch.object(search, "_pg_trgm_installed", False):
+            self.assertEqual(self.usernames(q="alex")[0], "alex")
@@ -13,6 +13,9 @@ urlpatterns = [
     path("<uuid:conversation_id>/", views.chat_view, name="chat_view"),
     path("<uuid:conversation_id>/send/", views.send_message, name="send_message"),
     path("<uuid:conversation_id>/poll/", views.poll_messages, name="poll_messages"),
+    path("<uuid:conversation_id>/wait/", views.wait_messages, name="wait_messages"),
+    path("<uuid:conversation_id>/read/", views.mark_read, name="mark_read"),
+    path("<uuid:conversation_id>/history/", views.message_history, name="message_history"),
     # path("poll", views.start_conversation, name="start_conversation"),
     
     # mobile endpoints
@@ -21,5 +24,7 @@ urlpatterns = [
     path("api/start/<str:username>/", views.start_chat_api, name="api_start_chat"),
     path("api/conversations/<uuid:conversation_id>/send/", views.send_message, name="api_send_message"),
     path("api/conversations/<uuid:conversation_id>/poll/", views.poll_messages, name="api_poll_messages"),
+    path("api/conversations/<uuid:conversation_id>/wait/", views.wait_messages, name="api_wait_messages"),
+    path("api/conversations/<uuid:conversation_id>/read/", views.mark_read, name="api_mark_read"),
     path("api/users/search/", views.search_users_api, name="api_search_users"),
 ]
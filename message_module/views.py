@@ -1,5 +1,6 @@
 import time
-from django.shortcuts import render, get_object_or_404, redirect
+import uuid
+from django.shortcuts import render, get_object_or_404, redirect, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.utils import timezone
@@ -11,11 +12,27 @@ from profile_module.models import Profile
 from django.db.models import Prefetch
 from django.utils.html import escape
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q
+from django.db.models import Q, Subquery
+from django.db import transaction
+from common.pubsub import get_bus, publish
+from common.media import ALLOWED_IMAGE_TYPES, enqueue_upload
+from common.utils.validator_image import validate_image_size
+from django.core.exceptions import ValidationError
+from django.template.loader import render_to_string
+from common.utils.pagination import paginate_keyset
+from .selectors import unread_counts
+from .services import get_or_create_direct_conversation
+from profile_module.search import search_users
 
 
 logger = logging.getLogger(__name__)
 PAGE_SIZE = 20 
+# Longest time (seconds) a long-poll request is held open
+LONG_POLL_TIMEOUT = 25
+HISTORY_PAGE_SIZE = 30
+HISTORY_ORDERING = ("-created_at", "-id")
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
 
 @login_required
 def chat_view(request, conversation_id=None):
@@ -38,67 +55,80 @@ def chat_view(request, conversation_id=None):
     )
     .order_by('-last_message_at', '-created_at')
     )
-    logger.debug(f"Fetched {conversations.count()} conversations for user {user.username}.")
+    if conversation_id:
+        now = timezone.now()
+        _read_cursor_behind(conversation_id, user, now).update(last_read_at=now)
+    unread = {row["conversation_id"]: row["unread"] for row in unread_counts(user)}
     for c in conversations:
         participants = [m.user for m in c.members.all()]
         c.other_user = next((u for u in participants if u.id != user.id), None)
+        c.unread_count = unread.get(c.id, 0)
     
     if request.method == "POST":
         username = request.POST.get("username")
         if username:
             target_user = get_object_or_404(User, username=username)
-            existing_convo = (Conversation.objects
-                  .filter(members__user=user)
-                  .filter(members__user=target_user)
-                  .distinct()
-                  .first()
-                )
-            
-            if existing_convo:
-                logger.info(f"User {user.username} attempted to start a conversation with {target_user.username}, but it already exists.")
-                return redirect("message_module:chat_view", existing_convo.id)
-
-            new_convo = Conversation.objects.create(created_by=user)
-            new_convo.members.create(user=user)
-            new_convo.members.create(user=target_user)
-            logger.info(f"User {user.username} started new conversation {new_convo.id} with {target_user.username}.")
-            return redirect("message_module:chat_view", new_convo.id)
+            if target_user == user:
+                return redirect("message_module:chat_home")
+
+            convo, created = get_or_create_direct_conversation(user, target_user)
+            if created:
+                logger.info(f"User {user.username} started new conversation {convo.id} with {target_user.username}.")
+            return redirect("message_module:chat_view", convo.id)
 
     selected_conversation = None
     messages = []
     last_message_id = ""
+    older_cursor = None
 
     if conversation_id:
         try:
-            selected_conversation = get_object_or_404(Conversation, id=conversation_id)
-            selected_conversation.other_user = selected_conversation.get_participants().exclude(id=user.id).first()
-            messages = (
-                Message.objects
-                .filter(conversation=selected_conversation)
-                .select_related('sender__profile')
-                .order_by('created_at')
+            selected_conversation = get_object_or_404(
+                Conversation.objects.filter(members__user=user),
+                id=conversation_id
             )
-            last = messages.last()
-            last_message_id = str(last.id) if last else ""
-            logger.debug(f"Loaded {messages.count()} messages for conversation {selected_conversation.id}.")
+            selected_conversation.other_user = selected_conversation.get_participants().exclude(id=user.id).first()
+            messages, older_cursor = _message_history_page(selected_conversation)
+            last_message_id = str(messages[-1].id) if messages else ""
+            logger.debug(f"Loaded {len(messages)} messages for conversation {selected_conversation.id}.")
         except Exception:
             logger.error(f"Error loading conversation {conversation_id} for user {user.username}. Redirecting to chat home.")
             return redirect("message_module:chat_home")
 
 
-    users = User.objects.exclude(id=user.id).select_related('profile')    
-    logger.debug(f"Fetched {users.count()} users for chat view.")    
     context = {
         "conversations": conversations,
         "selected_conversation": selected_conversation,
         "messages": messages,
-        "users": users,
         "last_message_id": last_message_id,  
+        "older_cursor": older_cursor,
     }
     logger.info(f"User {user.username} accessed chat view.")
     return render(request, "chat.html", context)
 
 
+@login_required
+def message_history(request, conversation_id):
+    """Render a page of older messages for the chat view's infinite scroll.
+    Args:
+        request : http request object (``before`` is the cursor returned with the previous page).
+        conversation_id : ID of the conversation.
+    Returns:
+        JsonResponse: ``html`` of the messages, oldest first, and the ``before`` cursor of the next older page.
+    """
+    conversation = get_object_or_404(
+        Conversation.objects.filter(members__user=request.user),
+        id=conversation_id
+    )
+    try:
+        messages, older_cursor = _message_history_page(conversation, request.GET.get("before"))
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    html = render_to_string("chat_messages.html", {"messages": messages}, request=request)
+    return JsonResponse({"html": html, "before": older_cursor})
+
+
 @csrf_exempt
 @login_required
 @require_POST
@@ -124,20 +154,27 @@ def send_message(request, conversation_id):
 
     if image_file:
         logger.debug(f"Uploaded image content type: {image_file.content_type}.")
-        allowed = {"image/jpeg", "image/png", "image/webp", "image/gif"}
-        if image_file.content_type not in allowed:
+        if image_file.content_type not in ALLOWED_IMAGE_TYPES:
             logger.warning(f"User {request.user.username} attempted to upload unsupported image type in conversation {conversation.id}.")
             return JsonResponse({"error": "Unsupported image type"}, status=400)
+        try:
+            validate_image_size(image_file)
+        except ValidationError as e:
+            return JsonResponse({"error": e.messages[0]}, status=400)
 
 
     msg = Message.objects.create(
         conversation=conversation,
         sender=request.user,
         body=body,
-        image=image_file if image_file else None,
     )
+    if image_file:
+        # Uploaded in the background; the message carries image_status until then
+        enqueue_upload(msg, "image", image_file)
     logger.debug(f"Created message {msg.id} in conversation {conversation.id} by user {request.user.username}.")
     conversation.update_last_message(msg)
+    channel = _conversation_channel(conversation.id)
+    transaction.on_commit(lambda: publish(channel))
     
     logger.info(f"User {request.user.username} sent message {msg.id} in conversation {conversation.id}.")
     return JsonResponse({
@@ -145,49 +182,70 @@ def send_message(request, conversation_id):
         "sender": msg.sender.username,
         "body": escape(msg.body),
         "image_url": (msg.image.url if msg.image else None),
+        "image_status": msg.image_status,
         "created_at": timezone.localtime(msg.created_at).strftime("%Y-%m-%d %H:%M"),
     })
 
 
 
-@login_required
-def poll_messages(request, conversation_id):
-    """Fetch new messages for a conversation since the last known message ID.
-    Args:
-        request : http request object.
-        conversation_id : ID of the conversation to poll messages from.
-    Returns:
-        JsonResponse: A JSON response containing a list of new messages.
+def _conversation_channel(conversation_id) -> str:
+    return f"conversation:{conversation_id}"
+
+
+def _read_cursor_behind(conversation_id, user, read_at):
+    """Return the membership of ``user`` in the conversation if its read cursor is older than ``read_at``.
+    Updating through this queryset only ever moves ``last_read_at`` forward.
     """
-    conversation = get_object_or_404(Conversation, id=conversation_id)
-    logger.debug(f"User {request.user.username} is polling messages for conversation {conversation.id}.")
-    last_msg_id = (request.GET.get("last_msg_id") or "").strip()
-    logger.debug(f"Last known message ID from client: {last_msg_id}.")
+    return (
+        ConversationMember.objects
+        .filter(conversation_id=conversation_id, user=user)
+        .filter(Q(last_read_at__isnull=True) | Q(last_read_at__lt=read_at))
+    )
+
+
+def _messages_after(conversation, last_msg_id):
+    """Return the messages of ``conversation`` after ``last_msg_id`` (all of them if empty).
+    Messages are ordered by ``(created_at, id)`` like the history pages, so one sharing
+    the reference's timestamp is still delivered. The reference message is resolved
+    inside the same query, and an unknown id yields nothing.
+    """
+    messages = Message.objects.filter(conversation=conversation)
     if last_msg_id:
-        ref = Message.objects.filter(id=last_msg_id, conversation=conversation).only("created_at").first()
-        if ref:
-            logger.debug(f"Found reference message {ref.id} for polling in conversation {conversation.id}.")
-            new_messages = (Message.objects
-                            .filter(conversation=conversation, created_at__gt=ref.created_at)
-                            .select_related('sender__profile')  
-                            .order_by("created_at"))
-        else:
-            new_messages = Message.objects.none()
-    else:
-        new_messages = (Message.objects
-                        .filter(conversation=conversation)
-                        .select_related('sender__profile')
-                        .order_by("created_at"))
-    
-    logger.debug(f"Found {new_messages.count()} new messages for conversation {conversation.id}.")
+        try:
+            last_msg_id = uuid.UUID(last_msg_id)
+        except ValueError:
+            return Message.objects.none()
+        ref_created_at = Subquery(
+            Message.objects.filter(id=last_msg_id, conversation=conversation).values("created_at")[:1]
+        )
+        messages = messages.filter(
+            Q(created_at__gt=ref_created_at) | Q(created_at=ref_created_at, id__gt=last_msg_id)
+        )
+    return messages.select_related('sender__profile').order_by("created_at", "id")
+
+
+def _message_history_page(conversation, before=None):
+    """Return ``(messages, older_cursor)``: one page of history, oldest first.
+    Without ``before`` the page holds the newest messages. Pages are keyset-paginated over
+    ``(created_at, id)``, so loading older history costs the same however long the chat is.
+    Raises:
+        ValueError: If ``before`` is malformed.
+    """
+    rows = Message.objects.filter(conversation=conversation).select_related('sender__profile')
+    messages, older_cursor = paginate_keyset(rows, HISTORY_ORDERING, before, HISTORY_PAGE_SIZE)
+    messages.reverse()
+    return messages, older_cursor
 
-    def initial_for(user):
-        prof = getattr(user, 'profile', None)
-        base = (getattr(prof, 'display_name', None) or user.username or '').strip()
-        return (base[:1].upper() if base else 'U')
 
+def _initial_for(user):
+    prof = getattr(user, 'profile', None)
+    base = (getattr(prof, 'display_name', None) or user.username or '').strip()
+    return (base[:1].upper() if base else 'U')
+
+
+def _serialize_messages(messages, user):
     data = []
-    for msg in new_messages:
+    for msg in messages:
         try:
             prof = msg.sender.profile
 
@@ -199,17 +257,77 @@ def poll_messages(request, conversation_id):
             "id": str(msg.id),
             "sender": msg.sender.username,
             "sender_avatar": avatar_url,
-            "sender_initial": initial_for(msg.sender),
+            "sender_initial": _initial_for(msg.sender),
             "body": escape(msg.body),
             "image_url": (msg.image.url if msg.image else None),
-            "is_self": msg.sender == request.user,
+            "image_status": msg.image_status,
+            "is_self": msg.sender_id == user.id,
             "created_at": local_created.strftime("%Y-%m-%d %H:%M"),
         })
-    logger.debug(f"Prepared {len(data)} messages for JSON response in conversation {conversation.id}.")
-    logger.info(f"User {request.user.username} polled messages in conversation {conversation.id}, found {len(data)} new messages.")
+    return data
+
+
+@login_required
+async def poll_messages(request, conversation_id):
+    """Fetch new messages for a conversation since the last known message ID.
+    Args:
+        request : http request object.
+        conversation_id : ID of the conversation to poll messages from.
+    Returns:
+        JsonResponse: A JSON response containing a list of new messages, or 403 for non-members.
+    """
+    user = await request.auser()
+    conversation = await aget_object_or_404(Conversation, id=conversation_id)
+    if not await conversation.members.filter(user=user).aexists():
+        logger.warning(f"Unauthorized poll attempt by user {user.username} on conversation {conversation.id}.")
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    last_msg_id = (request.GET.get("last_msg_id") or "").strip()
+    messages = [msg async for msg in _messages_after(conversation, last_msg_id)]
+    data = _serialize_messages(messages, user)
+    logger.debug(f"User {user.username} polled messages in conversation {conversation.id}, found {len(data)} new messages.")
     return JsonResponse({"messages": data})
 
 
+@login_required
+async def wait_messages(request, conversation_id):
+    """Long-poll for new messages in a conversation.
+    Waits until ``send_message`` publishes on the conversation's channel or the timeout
+    expires, without querying messages and, under ASGI, without holding a thread.
+    The client passes back the ``version`` of the previous response; when it is missing
+    or outdated the new messages are returned right away.
+    Args:
+        request : http request object (``last_msg_id``, ``version`` and optional ``timeout`` in seconds).
+        conversation_id : ID of the conversation to wait on.
+    Returns:
+        JsonResponse: ``messages`` newer than ``last_msg_id`` (possibly empty) and the channel ``version``.
+    """
+    user = await request.auser()
+    conversation = await aget_object_or_404(
+        Conversation.objects.filter(members__user=user),
+        id=conversation_id
+    )
+    channel = _conversation_channel(conversation.id)
+    bus = get_bus()
+    # Read the version before the messages, so one sent in between shows up on the next call
+    version = await bus.aversion(channel)
+
+    if request.GET.get("version") == str(version):
+        try:
+            timeout = min(max(float(request.GET.get("timeout", LONG_POLL_TIMEOUT)), 0), LONG_POLL_TIMEOUT)
+        except ValueError:
+            timeout = LONG_POLL_TIMEOUT
+        new_version = await bus.await_change(channel, version, timeout)
+        if new_version == version:
+            return JsonResponse({"messages": [], "version": str(version)})
+        version = new_version
+
+    last_msg_id = (request.GET.get("last_msg_id") or "").strip()
+    messages = [msg async for msg in _messages_after(conversation, last_msg_id)]
+    data = _serialize_messages(messages, user)
+    logger.debug(f"User {user.username} woke up in conversation {conversation.id} with {len(data)} new messages.")
+    return JsonResponse({"messages": data, "version": str(version)})
+
+
 
 @login_required
 def start_chat(request, username: str):
@@ -220,44 +338,31 @@ def start_chat(request, username: str):
         logger.warning(f"User {request.user.username} attempted to start a chat with themselves.")
         return redirect("message_module:chat_home")
 
-    existing_convo = (
-        Conversation.objects
-        .filter(members__user=request.user)
-        .filter(members__user=target_user)
-        .distinct()
-        .first()
-    )
-    logger.debug(f"Existing conversation check between {request.user.username} and {target_user.username} returned: {'found' if existing_convo else 'not found'}.")
-    if existing_convo:
-        logger.info(f"User {request.user.username} attempted to start a conversation with {target_user.username}, but it already exists.")
-        return redirect("message_module:chat_view", existing_convo.id)
-
-    convo = Conversation.objects.create(created_by=request.user)
-    ConversationMember.objects.create(conversation=convo, user=request.user)
-    ConversationMember.objects.create(conversation=convo, user=target_user)
-    logger.info(f"User {request.user.username} started new conversation {convo.id} with {target_user.username}.")
+    convo, created = get_or_create_direct_conversation(request.user, target_user)
+    if created:
+        logger.info(f"User {request.user.username} started new conversation {convo.id} with {target_user.username}.")
     return redirect("message_module:chat_view", convo.id)
 
 
 @csrf_exempt
 @login_required
-def get_conversations_api(request):
+async def get_conversations_api(request):
     """Fetch the list of conversations for the logged-in user.
     Args:
         request: this is the http request object.
     Returns:
         JsonResponse: A JSON response containing a list of conversations.
     """
-    user = request.user
+    user = await request.auser()
     conversations = (
         Conversation.objects
         .filter(members__user=user)
         .prefetch_related('members__user__profile')
         .order_by('-last_message_at', '-created_at')
     )
-    logger.debug(f"Fetched {conversations.count()} conversations for user {user.username} via API.")
+    unread = {row["conversation_id"]: row["unread"] async for row in unread_counts(user)}
     data = []
-    for c in conversations:
+    async for c in conversations:
 
         other_user = next((m.user for m in c.members.all() if m.user.id != user.id), None)
         
@@ -275,6 +380,7 @@ def get_conversations_api(request):
             "other_user_avatar": avatar_url,
             "last_message": c.last_message_preview or "No messages yet",
             "last_message_at": c.last_message_at.strftime("%Y-%m-%d %H:%M") if c.last_message_at else None,
+            "unread_count": unread.get(c.id, 0),
         })
 
     logger.info(f"User {user.username} fetched conversation list, found {len(data)} conversations.")
@@ -282,8 +388,43 @@ def get_conversations_api(request):
 
 
 
+@csrf_exempt
 @login_required
-def get_messages_api(request, conversation_id):
+@require_POST
+async def mark_read(request, conversation_id):
+    """Mark a conversation as read up to a message (or up to now).
+    Args:
+        request: http request object (optional ``last_msg_id`` form field).
+        conversation_id: ID of the conversation to mark as read.
+    Returns:
+        JsonResponse: the member's ``last_read_at`` after the update.
+    """
+    user = await request.auser()
+    member = await aget_object_or_404(ConversationMember, conversation_id=conversation_id, user=user)
+
+    read_at = timezone.now()
+    last_msg_id = (request.POST.get("last_msg_id") or "").strip()
+    if last_msg_id:
+        try:
+            ref = await Message.objects.filter(id=uuid.UUID(last_msg_id), conversation_id=conversation_id).afirst()
+        except ValueError:
+            ref = None
+        if ref is None:
+            return JsonResponse({"error": "Unknown message"}, status=400)
+        read_at = ref.created_at
+
+    if await _read_cursor_behind(conversation_id, user, read_at).aupdate(last_read_at=read_at):
+        member.last_read_at = read_at
+    logger.debug(f"User {user.username} marked conversation {conversation_id} read up to {member.last_read_at}.")
+    return JsonResponse({
+        "status": "ok",
+        "last_read_at": member.last_read_at.isoformat(),
+    })
+
+
+
+@login_required
+async def get_messages_api(request, conversation_id):
     """Fetch messages for a specific conversation.
 
     Args:
@@ -293,10 +434,11 @@ def get_messages_api(request, conversation_id):
     Returns:
         JsonResponse: A JSON response containing a list of messages.
     """
-    conversation = get_object_or_404(Conversation, id=conversation_id)
-    logger.debug(f"User {request.user.username} is fetching messages for conversation {conversation.id} via API.")
-    if not conversation.members.filter(user=request.user).exists():
-        logger.warning(f"Unauthorized access attempt by user {request.user.username} to conversation {conversation.id}.")
+    user = await request.auser()
+    conversation = await aget_object_or_404(Conversation, id=conversation_id)
+    logger.debug(f"User {user.username} is fetching messages for conversation {conversation.id} via API.")
+    if not await conversation.members.filter(user=user).aexists():
+        logger.warning(f"Unauthorized access attempt by user {user.username} to conversation {conversation.id}.")
         return JsonResponse({"error": "Unauthorized"}, status=403)
     
     
@@ -305,15 +447,14 @@ def get_messages_api(request, conversation_id):
     
     if before_id:
         try:
-            ref_msg = Message.objects.get(id=before_id)
+            ref_msg = await Message.objects.aget(id=before_id)
             messages_query = messages_query.filter(created_at__lt=ref_msg.created_at)
         except Message.DoesNotExist:
             pass
 
 
     messages_queryset = messages_query.order_by('-created_at')[:PAGE_SIZE]
-    messages = list(reversed(messages_queryset))
-    logger.debug(f"Fetched {len(list(messages))} messages for conversation {conversation.id}.")
+    messages = list(reversed([msg async for msg in messages_queryset]))
     data = []
     for msg in messages:
         prof = getattr(msg.sender, 'profile', None)
@@ -323,13 +464,13 @@ def get_messages_api(request, conversation_id):
             "sender": msg.sender.username,
             "body": msg.body,
             "image_url": msg.image.url if msg.image else None,
-            "is_self": msg.sender == request.user,
+            "image_status": msg.image_status,
+            "is_self": msg.sender_id == user.id,
             "created_at": timezone.localtime(msg.created_at).strftime("%Y-%m-%d %H:%M"),
             "sender_avatar": avatar_url
         })
     logger.debug(f"Prepared {len(data)} messages for JSON response in conversation {conversation.id}.")
-    logger.info(f"User {request.user.username} fetched messages for conversation {conversation.id}, found {len(data)} messages.")
-    logger.debug(f"Messages data: {data}")
+    logger.info(f"User {user.username} fetched messages for conversation {conversation.id}, found {len(data)} messages.")
     return JsonResponse({"messages": data})
 
 
@@ -353,22 +494,12 @@ def start_chat_api(request, username):
         logger.warning(f"User {user.username} attempted to start a chat with themselves via API.")
         return JsonResponse({"error": "Cannot chat with self"}, status=400)
     
-    existing_convo = (
-        Conversation.objects
-        .filter(members__user=user)
-        .filter(members__user=target_user)
-        .distinct()
-        .first()
-    )
-    logger.debug(f"Existing conversation check between {user.username} and {target_user.username} via API returned: {'found' if existing_convo else 'not found'}.")
-    if existing_convo:
+    convo, created = get_or_create_direct_conversation(user, target_user)
+    if not created:
         return JsonResponse({
             "status": "exists", 
-            "conversation_id": str(existing_convo.id)
+            "conversation_id": str(convo.id)
         })
-    convo = Conversation.objects.create(created_by=user)
-    ConversationMember.objects.create(conversation=convo, user=user)
-    ConversationMember.objects.create(conversation=convo, user=target_user)
     logger.info(f"User {user.username} started new conversation {convo.id} with {target_user.username} via API.")
     return JsonResponse({
         "status": "created", 
@@ -379,36 +510,35 @@ def start_chat_api(request, username):
     
 @login_required
 def search_users_api(request):
+    """Ranked, cursor-paginated user search for the new-chat picker.
+    Args:
+        request : http request object with ``q``, optional ``cursor`` and ``limit``.
+    Returns:
+        JsonResponse: ``users`` plus ``next_cursor`` (``None`` on the last page).
+    """
     query = request.GET.get('q', '').strip()
-    user = request.user
-    
-    if not query:
-        users = User.objects.exclude(id=user.id).select_related('profile')
-    else:
-        users = User.objects.filter(
-            Q(username__icontains=query) | 
-            Q(profile__display_name__icontains=query)
-        ).exclude(id=user.id).select_related('profile')
-    
-    logger.debug(f"User {request.user.username} is searching users with query '{query}' via API, found {users.count()} users.")
-    
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+
+    try:
+        users, next_cursor = search_users(request.user, query, request.GET.get('cursor'), limit)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
     data = []
     for u in users:
-        avatar = None
-        if hasattr(u, 'profile') and u.profile.avatar_url:
-            avatar = u.profile.avatar_url.url
-        display_name = u.username
-        if hasattr(u, 'profile') and u.profile.display_name:
-            display_name = u.profile.display_name
+        profile = getattr(u, 'profile', None)
         data.append({
             "username": u.username,
-            "display_name": display_name,
-            "avatar_url": avatar,
-            "is_verified": getattr(u.profile, 'is_verified', False) if hasattr(u, 'profile') else False
+            "display_name": (profile.display_name if profile else None) or u.username,
+            "avatar_url": profile.avatar_url.url if profile and profile.avatar_url else None,
+            "is_verified": profile.is_verified if profile else False,
         })
-    
-    logger.info(f"User {request.user.username} searched users with query '{query}', found {len(data)} users.")
-    return JsonResponse({"users": data})
+
+    logger.debug(f"User {request.user.username} searched users with query '{query}', found {len(data)} users.")
+    return JsonResponse({"users": data, "next_cursor": next_cursor})
 
 
 
@@ -2,6 +2,8 @@
 ASGI config for movezz project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn movezz.asgi:application --workers 4``,
+so the async views (chat long-poll and the JSON APIs) wait without holding a thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
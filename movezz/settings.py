@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.humanize",
+    "django.contrib.postgres",
     "common",
     "auth_module",
     "broadcast_module",
@@ -157,6 +158,40 @@ else:
         }
     }
 
+# Cache configuration
+# Shared Redis cache when REDIS_URL is set, otherwise a per-process (or file based) fallback
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_DIR = os.getenv('CACHE_DIR')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'movezz',
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'KEY_PREFIX': 'movezz',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'movezz',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Pub/sub bus waking long-polling chat requests (see common/pubsub.py)
+PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND') or 'common.pubsub.CacheBus'
+
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
     'API_KEY': os.getenv('CLOUDINARY_API_KEY'),
@@ -211,6 +246,13 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Background media pipeline (see common/media.py): uploads are spooled here, then
+# pushed to MEDIA_BACKEND by MEDIA_UPLOAD_WORKERS threads per process
+MEDIA_SPOOL_DIR = Path(os.getenv('MEDIA_SPOOL_DIR') or MEDIA_ROOT / "spool")
+MEDIA_BACKEND = os.getenv('MEDIA_BACKEND') or 'common.media.CloudinaryBackend'
+MEDIA_LOCAL_BACKEND_DIR = MEDIA_ROOT / "uploads"
+MEDIA_UPLOAD_WORKERS = int(os.getenv('MEDIA_UPLOAD_WORKERS', '4'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Profile, UserSport, Follow, UserBadge
+from .models import Profile, UserSport, Follow, UserBadge, FollowSuggestion
 # Register your models here.
 admin.site.register(Profile)
 admin.site.register(UserSport)
 admin.site.register(Follow)
-admin.site.register(UserBadge)
\ No newline at end of file
+admin.site.register(UserBadge)
+admin.site.register(FollowSuggestion)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class ProfileModuleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'profile_module'
+
+    def ready(self):
+        import profile_module.signals
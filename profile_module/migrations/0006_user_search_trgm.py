@@ -0,0 +1,60 @@
+from django.db import DatabaseError, migrations, transaction
+
+# GIN trigram indexes backing profile_module.search on PostgreSQL. pg_trgm is only
+# installed when the server ships it and the migrating role may create it; without
+# it (and on other databases) no indexes are created and search uses the in-process
+# n-gram index instead.
+INDEXES = [
+    ("user_search_username_trgm", "auth_user", "username"),
+    ("user_search_display_name_trgm", "profile_module_profile", "display_name"),
+]
+
+
+def _has_pg_trgm(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _install_pg_trgm(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return False
+    try:
+        # A savepoint, so a refused CREATE EXTENSION does not abort the migration
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    if not _has_pg_trgm(schema_editor) and not _install_pg_trgm(schema_editor):
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('profile_module', '0005_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
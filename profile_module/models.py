@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from common.choices import MediaStatus
 from common.models import Sport, Badge
+from common.cache import bump_namespace
+from common.counters import clear_pending, increment
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
 from common.utils.validator_image import validate_image_size
@@ -15,19 +18,21 @@ class Profile(models.Model):
         bio (TextField): A brief biography of the user.
         link (TextField): A personal or professional link associated with the user.
         avatar_url (CloudinaryField): The URL of the user's avatar image.
+        avatar_url_status (CharField): Upload state of ``avatar_url`` (see ``common.media``).
         current_sport (ForeignKey): The user's current sport of interest.
         post_count (BigIntegerField): The number of posts made by the user.
         broadcast_count (BigIntegerField): The number of broadcasts made by the user.
-        following_count (BigIntegerField): The number of users this user is following.
-        followers_count (BigIntegerField): The number of users following this user.
+        following_count (BigIntegerField): The number of users this user is following (sharded counter).
+        followers_count (BigIntegerField): The number of users following this user (sharded counter).
         is_verified (BooleanField): Indicates if the user's profile is verified.
         created_at (DateTimeField): The date and time the profile was created.
         updated_at (DateTimeField): The date and time the profile was last updated.
     Methods:
         __str__(): Returns the display name or username of the user.
-        update_following_count(): Updates the following count based on Follow relationships.
-        update_followers_count(): Updates the followers count based on Follow relationships.
-        update_all_counts(): Updates both following and followers counts.
+        save(): Saves the profile and invalidates its cached header.
+        update_following_count(): Recomputes the following count from Follow relationships.
+        update_followers_count(): Recomputes the followers count from Follow relationships.
+        update_all_counts(): Recomputes both following and followers counts.
 
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
@@ -35,6 +40,7 @@ class Profile(models.Model):
     bio = models.TextField(blank=True, null=True)
     link = models.TextField(blank=True, null=True)
     avatar_url = CloudinaryField("avatar", blank=True, null=True, validators=[validate_image_size])
+    avatar_url_status = models.CharField(max_length=10, choices=MediaStatus.choices, default=MediaStatus.READY)
     current_sport = models.ForeignKey(Sport, on_delete=models.SET_NULL, null=True, blank=True)
     post_count = models.BigIntegerField(default=0)
     broadcast_count = models.BigIntegerField(default=0)
@@ -44,24 +50,41 @@ class Profile(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-followers_count"], name="profile_most_followed"),
+        ]
+
     def __str__(self):
         return self.display_name or str(self.user)
+
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        # Cached profile headers are keyed under the owner's namespace
+        bump_namespace(f"profile:{self.user_id}")
     
     def update_following_count(self) -> None:
-        self.following_count = Follow.objects.filter(follower=self.user).count()
-        self.updated_at = timezone.now()
-        self.save(update_fields=['following_count', 'updated_at'])
+        # One transaction, so an increment cannot land between the clear and the save
+        with transaction.atomic():
+            clear_pending(Profile, self.pk, "following_count")
+            self.following_count = Follow.objects.filter(follower=self.user).count()
+            self.updated_at = timezone.now()
+            self.save(update_fields=['following_count', 'updated_at'])
     
     def update_followers_count(self) -> None:
-        self.followers_count = Follow.objects.filter(followee=self.user).count()
-        self.updated_at = timezone.now()
-        self.save(update_fields=['followers_count', 'updated_at'])
+        with transaction.atomic():
+            clear_pending(Profile, self.pk, "followers_count")
+            self.followers_count = Follow.objects.filter(followee=self.user).count()
+            self.updated_at = timezone.now()
+            self.save(update_fields=['followers_count', 'updated_at'])
     
     def update_all_counts(self) -> None:
-        self.following_count = Follow.objects.filter(follower=self.user).count()
-        self.followers_count = Follow.objects.filter(followee=self.user).count()
-        self.updated_at = timezone.now()
-        self.save(update_fields=['following_count', 'followers_count', 'updated_at'])
+        with transaction.atomic():
+            clear_pending(Profile, self.pk, "following_count", "followers_count")
+            self.following_count = Follow.objects.filter(follower=self.user).count()
+            self.followers_count = Follow.objects.filter(followee=self.user).count()
+            self.updated_at = timezone.now()
+            self.save(update_fields=['following_count', 'followers_count', 'updated_at'])
 
 class UserSport(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -82,35 +105,28 @@ class Follow(models.Model):
         super().save(*args, **kwargs)
         
         if is_new:
-            try:
-                follower_profile = Profile.objects.get(user=self.follower)
-                follower_profile.update_following_count()
-            except Profile.DoesNotExist:
-                pass
-            
-            try:
-                followee_profile = Profile.objects.get(user=self.followee)
-                followee_profile.update_followers_count()
-            except Profile.DoesNotExist:
-                pass
+            from feeds_module.services import backfill_timeline
+            backfill_timeline(self.follower, self.followee)
+            FollowSuggestion.objects.filter(user=self.follower, suggested=self.followee).delete()
+
+            self._count(1)
 
     def delete(self, *args, **kwargs) -> None:
         follower_user = self.follower
         followee_user = self.followee
         
         super().delete(*args, **kwargs)
+
+        from feeds_module.services import prune_timeline
+        prune_timeline(follower_user, followee_user)
         
-        try:
-            follower_profile = Profile.objects.get(user=follower_user)
-            follower_profile.update_following_count()
-        except Profile.DoesNotExist:
-            pass
-        
-        try:
-            followee_profile = Profile.objects.get(user=followee_user)
-            followee_profile.update_followers_count()
-        except Profile.DoesNotExist:
-            pass
+        self._count(-1)
+
+    def _count(self, amount: int) -> None:
+        # Sharded so a popular account's followers do not queue on its profile row
+        increment(Profile, self.follower_id, "following_count", amount)
+        increment(Profile, self.followee_id, "followers_count", amount)
+        bump_namespace(f"profile:{self.follower_id}", f"profile:{self.followee_id}")
 
     class Meta:
         unique_together = ("follower", "followee")
@@ -122,3 +138,35 @@ class UserBadge(models.Model):
 
     class Meta:
         unique_together = ("user", "badge")
+
+
+class FollowSuggestion(models.Model):
+    """
+    A precomputed "people you may know" entry, written by the
+    ``compute_follow_suggestions`` batch job and read by the sidebars.
+    Attributes:
+        user (ForeignKey): The user the suggestion is shown to.
+        suggested (ForeignKey): The suggested account.
+        score (FloatField): Relevance of the suggestion; higher is better.
+        mutual_count (IntegerField): Number of followed accounts that follow ``suggested``.
+        expires_at (DateTimeField): When the suggestion is stale and gets recomputed.
+        created_at (DateTimeField): When the suggestion was computed.
+    Meta:
+        unique_together (tuple): Suggests an account at most once per user.
+        indexes (list): Serves the best-first lookup of a single user's suggestions.
+    """
+    user = models.ForeignKey(User, related_name="follow_suggestions", on_delete=models.CASCADE)
+    suggested = models.ForeignKey(User, related_name="suggested_to", on_delete=models.CASCADE)
+    score = models.FloatField(default=0)
+    mutual_count = models.IntegerField(default=0)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("user", "suggested")
+        indexes = [
+            models.Index(fields=["user", "-score"], name="profile_suggestion_best"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.suggested_id} ({self.score:g})"
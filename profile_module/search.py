@@ -0,0 +1,285 @@
+"""
+Ranked user search (chat user picker, typeahead).
+
+Candidates come from a trigram index instead of ``icontains`` scans:
+
+* on PostgreSQL with ``pg_trgm`` installed, word similarity served by the GIN indexes
+  created in ``profile_module/migrations/0006_user_search_trgm.py``;
+* elsewhere (SQLite in development, or PostgreSQL where the migration could not
+  install ``pg_trgm``), an in-process trigram index over usernames and display
+  names, kept in step through the ``"user-search"`` namespace and a short change log
+  in the cache (see ``_NgramIndex``).
+
+The bounded candidate set is then ranked exact > prefix > fuzzy, with boosts for
+accounts the viewer follows or has chatted with, and paged with an opaque cursor.
+
+Functions:
+    trigrams: Returns the pg_trgm-style trigrams of a string.
+    search_users: Returns one ranked page of users matching a query.
+    invalidate_user_search: Records that a user's searchable names changed.
+"""
+
+import threading
+import unicodedata
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from common.cache import bump_namespace, namespace_version
+from common.utils.pagination import decode_cursor, encode_cursor
+from .models import Follow, Profile
+
+SEARCH_NAMESPACE = "user-search"
+MIN_QUERY_LENGTH = 2
+CANDIDATE_LIMIT = 200
+SIMILARITY_THRESHOLD = 0.3
+# Changes a stale index replays one by one; further behind it is rebuilt
+MAX_REPLAYED_CHANGES = 500
+CHANGE_LOG_TIMEOUT = 3600
+
+EXACT, PREFIX, FUZZY, NO_MATCH = 3, 2, 1, 0
+FOLLOW_BOOST = 2
+CHAT_BOOST = 1
+
+
+def normalize(text: str | None) -> str:
+    """Casefold ``text`` and strip accents so "Éva" matches "eva"."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().strip()
+
+
+def trigrams(text: str | None) -> set[str]:
+    """Return the trigrams of every word of ``text``, padded the way pg_trgm pads them."""
+    grams = set()
+    for word in "".join(ch if ch.isalnum() else " " for ch in normalize(text)).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _word_similarity(query_grams: set[str], grams: set[str]) -> float:
+    # Share of the query's trigrams found in the name; close to pg_trgm's word_similarity
+    if not query_grams:
+        return 0.0
+    return len(query_grams & grams) / len(query_grams)
+
+
+class _NgramIndex:
+    """
+    In-process trigram index over active users' usernames and display names.
+    Each change bumps the ``"user-search"`` namespace and logs the changed user under
+    the new version; an index that finds itself behind replays the logged users and
+    falls back to a full rebuild when an entry is missing (expired, evicted or an
+    invalidation without a user). Other workers only see the versions and the log
+    through a shared cache backend (Redis, Memcached); with a per-process cache such as
+    the default ``LocMemCache`` each process only sees its own writes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version = None
+        self._postings: dict[str, set[int]] = {}
+        self._grams: dict[int, set[str]] = {}
+
+    def _rebuild(self) -> None:
+        self._postings, self._grams = {}, {}
+        rows = User.objects.filter(is_active=True).values_list("id", "username", "profile__display_name")
+        for user_id, username, display_name in rows.iterator(chunk_size=2000):
+            self._add(user_id, trigrams(username) | trigrams(display_name))
+
+    def _add(self, user_id: int, grams: set[str]) -> None:
+        self._grams[user_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(user_id)
+
+    def _apply(self, user_ids: set[int]) -> None:
+        """Re-index only ``user_ids``; deleted or deactivated users are dropped."""
+        for user_id in user_ids:
+            for gram in self._grams.pop(user_id, ()):
+                users = self._postings[gram]
+                users.discard(user_id)
+                if not users:
+                    del self._postings[gram]
+        rows = User.objects.filter(id__in=user_ids, is_active=True).values_list("id", "username", "profile__display_name")
+        for user_id, username, display_name in rows:
+            self._add(user_id, trigrams(username) | trigrams(display_name))
+
+    def _catch_up(self, version: int) -> None:
+        behind = version - self._version if self._version is not None else 0
+        if 0 < behind <= MAX_REPLAYED_CHANGES:
+            keys = [_change_key(v) for v in range(self._version + 1, version + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) == len(keys):
+                self._apply(set(changes.values()))
+                return
+        self._rebuild()
+
+    def candidates(self, query: str, limit: int) -> list[int]:
+        version = namespace_version(SEARCH_NAMESPACE)
+        with self._lock:
+            if version != self._version:
+                self._catch_up(version)
+                self._version = version
+            query_grams = trigrams(query)
+            hits: dict[int, int] = {}
+            for gram in query_grams:
+                for user_id in self._postings.get(gram, ()):
+                    hits[user_id] = hits.get(user_id, 0) + 1
+        threshold = SIMILARITY_THRESHOLD * len(query_grams)
+        matched = [user_id for user_id, count in hits.items() if count >= threshold]
+        matched.sort(key=lambda user_id: (-hits[user_id], user_id))
+        return matched[:limit]
+
+
+_local_index = _NgramIndex()
+
+
+def _change_key(version: int) -> str:
+    return f"{SEARCH_NAMESPACE}:change:{version}"
+
+
+def invalidate_user_search(user_id: int | None = None) -> None:
+    """
+    Record that ``user_id``'s username, display name or active flag changed.
+    Without ``user_id`` every index is rebuilt from scratch on its next search.
+    """
+    bump_namespace(SEARCH_NAMESPACE)
+    if user_id is not None:
+        # Two concurrent bumps may log under the same version; the missing entry then
+        # makes readers rebuild, which is always correct
+        cache.set(_change_key(namespace_version(SEARCH_NAMESPACE)), user_id, CHANGE_LOG_TIMEOUT)
+
+
+_pg_trgm_installed = None
+
+
+def _has_pg_trgm() -> bool:
+    """Whether the database provides ``pg_trgm``; checked once per process."""
+    global _pg_trgm_installed
+    if _pg_trgm_installed is None:
+        if connection.vendor != "postgresql":
+            _pg_trgm_installed = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _pg_trgm_installed = cursor.fetchone() is not None
+    return _pg_trgm_installed
+
+
+def _trigram_candidates(query: str, limit: int) -> list[int]:
+    if not _has_pg_trgm():
+        return _local_index.candidates(query, limit)
+
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    # Two single-table queries so each one can use its own GIN index
+    by_username = (
+        User.objects.filter(is_active=True, username__trigram_word_similar=query)
+        .annotate(similarity=TrigramWordSimilarity(query, "username"))
+        .order_by("-similarity", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    by_display_name = (
+        Profile.objects.filter(user__is_active=True, display_name__trigram_word_similar=query)
+        .annotate(similarity=TrigramWordSimilarity(query, "display_name"))
+        .order_by("-similarity", "user_id")
+        .values_list("user_id", flat=True)[:limit]
+    )
+    return list(dict.fromkeys([*by_username, *by_display_name]))[:limit]
+
+
+def _related_candidates(viewer: User, limit: int) -> list[int]:
+    """Accounts shown for an empty query: people the viewer follows or chats with."""
+    from message_module.models import ConversationMember
+
+    followed = Follow.objects.filter(follower=viewer).order_by("-created_at").values_list("followee_id", flat=True)
+    partners = (
+        ConversationMember.objects
+        .filter(conversation__members__user=viewer)
+        .exclude(user=viewer)
+        .values_list("user_id", flat=True)
+    )
+    return list(dict.fromkeys([*followed[:limit], *partners[:limit]]))[:limit]
+
+
+def _match_tier(query: str, username: str, display_name: str | None) -> int:
+    names = [normalize(username), normalize(display_name)]
+    if query in names:
+        return EXACT
+    words = [word for name in names for word in name.split()]
+    if any(name.startswith(query) for name in names if name) or any(word.startswith(query) for word in words):
+        return PREFIX
+    return FUZZY
+
+
+def _score(tier: int, boost: int, similarity: float) -> float:
+    # Tier dominates, then boost, then similarity (< 1) breaks ties inside a boost level
+    return round(tier * 100 + boost * 10 + similarity, 6)
+
+
+def search_users(viewer: User, query: str, cursor: str | None = None, limit: int = 20) -> tuple[list[User], str | None]:
+    """
+    Return one ranked page of users matching ``query``, excluding ``viewer``.
+    An empty query lists the accounts the viewer follows or has chatted with; queries
+    shorter than ``MIN_QUERY_LENGTH`` return nothing.
+    Args:
+        viewer: The searching user; drives the follow/chat boosts.
+        query: Free text matched against usernames and display names.
+        cursor: The cursor returned for the previous page, or ``None``.
+        limit: Page size.
+    Returns:
+        tuple: ``(users, next_cursor)`` with ``profile`` already loaded on each user.
+    Raises:
+        ValueError: If ``cursor`` is malformed.
+    """
+    from message_module.models import ConversationMember
+
+    after = decode_cursor(cursor, 2) if cursor else None
+    normalized = normalize(query)
+    if normalized:
+        if len(normalized) < MIN_QUERY_LENGTH:
+            return [], None
+        candidate_ids = _trigram_candidates(query.strip(), CANDIDATE_LIMIT)
+    else:
+        candidate_ids = _related_candidates(viewer, CANDIDATE_LIMIT)
+
+    candidate_ids = [user_id for user_id in candidate_ids if user_id != viewer.pk]
+    if not candidate_ids:
+        return [], None
+
+    followed = set(
+        Follow.objects.filter(follower=viewer, followee_id__in=candidate_ids).values_list("followee_id", flat=True)
+    )
+    chatted = set(
+        ConversationMember.objects
+        .filter(user_id__in=candidate_ids, conversation__members__user=viewer)
+        .values_list("user_id", flat=True)
+    )
+    names = {
+        user_id: (username, display_name)
+        for user_id, username, display_name in
+        User.objects.filter(id__in=candidate_ids).values_list("id", "username", "profile__display_name")
+    }
+
+    query_grams = trigrams(normalized)
+    ranked = []
+    for user_id, (username, display_name) in names.items():
+        boost = FOLLOW_BOOST * (user_id in followed) + CHAT_BOOST * (user_id in chatted)
+        if normalized:
+            tier = _match_tier(normalized, username, display_name)
+            similarity = _word_similarity(query_grams, trigrams(username) | trigrams(display_name))
+        else:
+            tier, similarity = NO_MATCH, 0.0
+        ranked.append((_score(tier, boost, similarity), user_id))
+    ranked.sort(key=lambda row: (-row[0], row[1]))
+
+    if after is not None:
+        try:
+            after_score, after_id = float(after[0]), int(after[1])
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor.") from exc
+        ranked = [row for row in ranked if (-row[0], row[1]) > (-after_score, after_id)]
+
+    page = ranked[:limit]
+    next_cursor = encode_cursor(list(page[-1])) if len(ranked) > limit else None
+    users = User.objects.select_related("profile").in_bulk([user_id for _, user_id in page])
+    return [users[user_id] for _, user_id in page if user_id in users], next_cursor
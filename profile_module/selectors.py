@@ -0,0 +1,39 @@
+"""
+Read-side helpers for profile_module.
+Functions:
+    suggested_accounts: Accounts shown in the "Friends Recommendation" sidebar.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.utils import timezone
+from .models import FollowSuggestion
+
+
+def suggested_accounts(user: User, limit: int = 2) -> list[User]:
+    """
+    Return up to ``limit`` accounts to suggest to ``user``.
+    Reads the precomputed ``FollowSuggestion`` rows (an index lookup on
+    ``profile_suggestion_best``). Until the batch job has produced fresh rows, and for
+    anonymous visitors, the most followed accounts not yet followed are returned instead.
+    """
+    if user.is_authenticated:
+        suggestions = (
+            FollowSuggestion.objects
+            .filter(user=user, expires_at__gt=timezone.now())
+            .select_related("suggested", "suggested__profile")
+            .order_by("-score")[:limit]
+        )
+        accounts = [suggestion.suggested for suggestion in suggestions]
+        if accounts:
+            return accounts
+        candidates = User.objects.exclude(pk=user.pk).exclude(follows_received__follower=user)
+    else:
+        candidates = User.objects.all()
+
+    return list(
+        candidates
+        .filter(is_active=True, profile__isnull=False)
+        .select_related("profile")
+        .order_by(F("profile__followers_count").desc(), "pk")[:limit]
+    )
@@ -0,0 +1,124 @@
+"""
+Write-side helpers for profile_module.
+Functions:
+    compute_follow_suggestions: Recomputes the "people you may know" list of one user.
+    refresh_follow_suggestions: Recomputes the lists that are missing or expired.
+"""
+
+import datetime
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from feeds_module.models import PostHashtag
+from .models import Follow, FollowSuggestion, UserSport
+
+SUGGESTION_TTL = datetime.timedelta(hours=24)
+SUGGESTIONS_PER_USER = 10
+# How many of the strongest candidates each signal contributes
+CANDIDATE_LIMIT = 200
+
+MUTUAL_WEIGHT = 3.0
+SPORT_WEIGHT = 1.0
+HASHTAG_WEIGHT = 0.5
+
+
+def _score_candidates(user: User) -> tuple[dict, dict]:
+    """Return ``(scores, mutual_counts)`` keyed by candidate user id."""
+    following = Follow.objects.filter(follower=user).values("followee_id")
+    scores = defaultdict(float)
+    mutual_counts = {}
+
+    # Friends of friends: accounts followed by the accounts ``user`` follows
+    mutuals = (
+        Follow.objects
+        .filter(follower_id__in=following)
+        .exclude(followee_id__in=following)
+        .exclude(followee=user)
+        .values("followee_id")
+        .annotate(total=Count("id"))
+        .order_by("-total")[:CANDIDATE_LIMIT]
+    )
+    for row in mutuals:
+        scores[row["followee_id"]] += MUTUAL_WEIGHT * row["total"]
+        mutual_counts[row["followee_id"]] = row["total"]
+
+    sports = (
+        UserSport.objects
+        .filter(sport_id__in=UserSport.objects.filter(user=user).values("sport_id"))
+        .exclude(user=user)
+        .exclude(user_id__in=following)
+        .values("user_id")
+        .annotate(total=Count("id"))
+        .order_by("-total")[:CANDIDATE_LIMIT]
+    )
+    for row in sports:
+        scores[row["user_id"]] += SPORT_WEIGHT * row["total"]
+
+    hashtags = (
+        PostHashtag.objects
+        .filter(hashtag_id__in=PostHashtag.objects.filter(post__user=user).values("hashtag_id"))
+        .exclude(post__user=user)
+        .exclude(post__user_id__in=following)
+        .values("post__user_id")
+        .annotate(total=Count("hashtag_id", distinct=True))
+        .order_by("-total")[:CANDIDATE_LIMIT]
+    )
+    for row in hashtags:
+        scores[row["post__user_id"]] += HASHTAG_WEIGHT * row["total"]
+
+    return scores, mutual_counts
+
+
+def compute_follow_suggestions(user: User, now: datetime.datetime | None = None) -> int:
+    """
+    Replace the stored suggestions of ``user`` with freshly scored ones.
+    Candidates come from the follow graph (friends of friends), shared ``UserSport``
+    rows and hashtags both users posted with; accounts ``user`` already follows are
+    never suggested.
+    Args:
+        user: the user to compute suggestions for.
+        now: the reference time, defaults to ``timezone.now()``.
+    Returns:
+        int: number of suggestions stored.
+    """
+    now = now or timezone.now()
+    scores, mutual_counts = _score_candidates(user)
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:SUGGESTIONS_PER_USER]
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user=user).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(
+                user=user,
+                suggested_id=suggested_id,
+                score=score,
+                mutual_count=mutual_counts.get(suggested_id, 0),
+                expires_at=now + SUGGESTION_TTL,
+                created_at=now,
+            )
+            for suggested_id, score in best
+        ])
+    return len(best)
+
+
+def refresh_follow_suggestions(force: bool = False, now: datetime.datetime | None = None) -> int:
+    """
+    Recompute the suggestions of every active user whose list has expired.
+    Args:
+        force: recompute every active user, fresh or not.
+        now: the reference time, defaults to ``timezone.now()``.
+    Returns:
+        int: number of users processed.
+    """
+    now = now or timezone.now()
+    users = User.objects.filter(is_active=True)
+    if not force:
+        users = users.exclude(follow_suggestions__expires_at__gt=now)
+
+    processed = 0
+    for user in users.distinct().iterator():
+        compute_follow_suggestions(user, now)
+        processed += 1
+    return processed
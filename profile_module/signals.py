@@ -0,0 +1,41 @@
+"""
+Signal receivers for profile_module.
+Keeps the in-process user search index in step with renames, and cached profile
+headers in step with the badges and sports they show.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from common.cache import bump_namespace
+from .models import Profile, UserBadge, UserSport
+from .search import invalidate_user_search
+
+SEARCHABLE_FIELDS = {
+    User: {"username", "is_active"},
+    Profile: {"display_name"},
+}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def invalidate_search_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate the search index when a searchable field may have changed."""
+    # Counter updates (last_login, followers_count, ...) pass update_fields and are skipped
+    if created or update_fields is None or SEARCHABLE_FIELDS[sender] & set(update_fields):
+        invalidate_user_search(instance.pk if sender is User else instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_search_on_delete(sender, instance, **kwargs):
+    """Drop deleted users from the search index."""
+    invalidate_user_search(instance.pk)
+
+
+@receiver(post_save, sender=UserBadge)
+@receiver(post_delete, sender=UserBadge)
+@receiver(post_save, sender=UserSport)
+@receiver(post_delete, sender=UserSport)
+def invalidate_profile_header(sender, instance, **kwargs):
+    """Drop the cached header of the profile whose badges or sport time changed."""
+    bump_namespace(f"profile:{instance.user_id}")
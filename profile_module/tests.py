@@ -1,13 +1,22 @@
 import json
+import tempfile
+from datetime import timedelta
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import Profile, Follow
+from .models import Profile, Follow, FollowSuggestion, UserBadge, UserSport
+from .selectors import suggested_accounts
+from .services import compute_follow_suggestions, refresh_follow_suggestions
+from .views import _get_profile_header
 from .forms import CreatePostForm
 from feeds_module.models import Post
 from broadcast_module.models import Event
-from common.models import Sport
+from common.models import Badge, Sport
+from common.counters import flush_counters
+from common.media import process_pending_uploads
+from django.utils import timezone
 
 class ProfileModelTests(TestCase):
     """
@@ -23,6 +32,7 @@ class ProfileModelTests(TestCase):
 
     def test_follow_updates_counts(self):
         Follow.objects.create(follower=self.user1, followee=self.user2)
+        flush_counters()
         
         self.profile1.refresh_from_db()
         self.profile2.refresh_from_db()
@@ -33,6 +43,7 @@ class ProfileModelTests(TestCase):
     def test_unfollow_updates_counts(self):
         follow = Follow.objects.create(follower=self.user1, followee=self.user2)
         follow.delete()
+        flush_counters()
         
         self.profile1.refresh_from_db()
         self.profile2.refresh_from_db()
@@ -160,4 +171,118 @@ class ProfileAPITests(TestCase):
         data = response.json()
         self.assertEqual(data['username'], 'api_user')
         self.assertEqual(len(data['posts']), 1)
-        self.assertEqual(data['posts'][0]['caption'], 'API Post')
\ No newline at end of file
+        self.assertEqual(data['posts'][0]['caption'], 'API Post')
+
+    def test_update_profile_uploads_avatar_in_background(self):
+        """The avatar is queued and the response reports it as pending until uploaded."""
+        self.client.login(username='api_user', password='password')
+        avatar = SimpleUploadedFile('avatar.png', b'png-bytes', content_type='image/png')
+        with tempfile.TemporaryDirectory() as tmp, self.settings(
+            MEDIA_BACKEND='common.media.LocalBackend', MEDIA_SPOOL_DIR=tmp, MEDIA_LOCAL_BACKEND_DIR=tmp, MEDIA_UPLOAD_WORKERS=0,
+        ):
+            response = self.client.post(reverse('profile_module:update_profile'), {'display_name': 'New Name', 'avatar': avatar})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['avatar_status'], 'pending')
+
+            self.assertEqual(process_pending_uploads(), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.display_name, 'New Name')
+        self.assertEqual(self.profile.avatar_url_status, 'ready')
+        self.assertTrue(self.profile.avatar_url)
+
+class ProfileCacheTests(TestCase):
+    """
+    Test suite for cached profile headers and their invalidation.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cached', password='password')
+        self.fan = User.objects.create_user(username='fan', password='password')
+        Profile.objects.get_or_create(user=self.user)
+        Profile.objects.get_or_create(user=self.fan)
+        self.client.login(username='fan', password='password')
+        self.url = reverse('profile_module:profile_detail_api', args=['cached'])
+
+    def test_follow_invalidates_cached_header(self):
+        self.assertEqual(self.client.get(self.url).json()['followers_count'], 0)
+
+        Follow.objects.create(follower=self.fan, followee=self.user)
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['followers_count'], 1)
+        self.assertTrue(data['is_following'])
+
+    def test_badge_and_sport_changes_invalidate_cached_header(self):
+        _get_profile_header(self.user)
+        badge = UserBadge.objects.create(user=self.user, badge=Badge.objects.create(code='first-run', name='First Run'))
+        self.assertEqual(_get_profile_header(self.user)['badges'], [badge])
+
+        sport = Sport.objects.create(name='Rowing')
+        Profile.objects.filter(user=self.user).update(current_sport=sport)
+        user_sport = UserSport.objects.create(user=self.user, sport=sport, time_elapsed=timedelta(hours=3))
+        self.assertEqual(_get_profile_header(self.user)['current_sport_duration'], timedelta(hours=3))
+
+        badge.delete()
+        user_sport.delete()
+        header = _get_profile_header(self.user)
+        self.assertEqual((header['badges'], header['current_sport_duration']), ([], timedelta(0)))
+
+    def test_profile_page_reuses_cached_header(self):
+        self.client.get(reverse('profile_module:profile_detail', args=['cached']))
+        with self.assertNumQueries(0):
+            header = _get_profile_header(self.user)
+        self.assertEqual(header['profile'].user_id, self.user.pk)
+
+
+class FollowSuggestionTests(TestCase):
+    """
+    Test suite for precomputed "people you may know" suggestions.
+    """
+    def setUp(self):
+        self.me = User.objects.create_user(username='me', password='password')
+        self.friend = User.objects.create_user(username='friend', password='password')
+        self.fof = User.objects.create_user(username='fof', password='password')
+        self.teammate = User.objects.create_user(username='teammate', password='password')
+        self.stranger = User.objects.create_user(username='stranger', password='password')
+        for user in (self.me, self.friend, self.fof, self.teammate, self.stranger):
+            Profile.objects.get_or_create(user=user)
+
+        Follow.objects.create(follower=self.me, followee=self.friend)
+        Follow.objects.create(follower=self.friend, followee=self.fof)
+        sport = Sport.objects.create(name='Padel')
+        UserSport.objects.create(user=self.me, sport=sport, time_elapsed=timedelta(0))
+        UserSport.objects.create(user=self.teammate, sport=sport, time_elapsed=timedelta(0))
+
+    def test_compute_ranks_friends_of_friends_first(self):
+        self.assertEqual(compute_follow_suggestions(self.me), 2)
+
+        with self.assertNumQueries(1):
+            suggested = suggested_accounts(self.me)
+        self.assertEqual(suggested, [self.fof, self.teammate])
+        self.assertEqual(FollowSuggestion.objects.get(user=self.me, suggested=self.fof).mutual_count, 1)
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.me, suggested__in=[self.friend, self.stranger]).exists())
+
+    def test_following_removes_suggestion(self):
+        compute_follow_suggestions(self.me)
+        Follow.objects.create(follower=self.me, followee=self.fof)
+
+        self.assertEqual(suggested_accounts(self.me), [self.teammate])
+
+    def test_expired_suggestions_fall_back_and_get_refreshed(self):
+        compute_follow_suggestions(self.me, now=timezone.now() - timedelta(days=2))
+
+        fallback = suggested_accounts(self.me)
+        self.assertNotIn(self.me, fallback)
+        self.assertNotIn(self.friend, fallback)
+
+        self.assertGreaterEqual(refresh_follow_suggestions(), 1)
+        self.assertEqual(suggested_accounts(self.me), [self.fof, self.teammate])
+
+    def test_sidebar_shows_suggestions(self):
+        compute_follow_suggestions(self.me)
+        self.client.login(username='me', password='password')
+
+        response = self.client.get(reverse('feeds_module:main_view'))
+
+        self.assertEqual(list(response.context['suggested_followers']), [self.fof, self.teammate])
@@ -15,7 +15,13 @@ from django.http import JsonResponse, Http404
 from django.conf import settings 
 from feeds_module.models import Post, PostHashtag, PostLike
 from feeds_module.forms import PostForm, PostImageForm
+from feeds_module.services import parse_hashtags, set_post_hashtags
+from feeds_module.search import index_post, unindex_post
 from broadcast_module.models import Event
+from common.cache import get_or_set
+from common.counters import add_pending, read_counters
+from common.media import enqueue_upload, validate_image
+from django.core.exceptions import ValidationError
 import base64
 from django.core.files.base import ContentFile
 from django.views.decorators.http import require_http_methods
@@ -50,6 +56,34 @@ def _get_or_create_profile(u: User) -> Profile:
     profile, _ = Profile.objects.get_or_create(user=u)
     return profile
 
+PROFILE_CACHE_TIMEOUT = 300
+
+def _get_profile_header(page_user: User) -> dict:
+    """Return the header data of ``page_user``'s profile page.
+    Cached under the ``"profile:<user id>"`` namespace, which ``Profile.save`` bumps on
+    profile updates, ``Follow`` on follower/following count changes and the
+    ``UserBadge``/``UserSport`` signal receivers when badges or sport times change.
+    """
+    def compute() -> dict:
+        profile = _get_or_create_profile(page_user)
+        badges = list(UserBadge.objects.select_related("badge").filter(user=page_user))
+
+        current_sport_duration = timedelta(0)
+        if profile.current_sport:
+            user = UserSport.objects.filter(user=page_user, sport=profile.current_sport).first()
+
+            if user and user.time_elapsed:
+                current_sport_duration = user.time_elapsed
+
+        return {
+            "profile": profile,
+            "badges": badges,
+            "current_sport_duration": current_sport_duration,
+            "counts": read_counters(Profile, profile.pk, "followers_count", "following_count"),
+        }
+
+    return get_or_set(f"profile:{page_user.pk}", ("header",), compute, PROFILE_CACHE_TIMEOUT)
+
 def profile_home(request):
     if request.user.is_authenticated:
         return redirect("profile_module:profile_detail", username=request.user.username)
@@ -57,20 +91,14 @@ def profile_home(request):
 
 def profile_detail(request, username: str):
     page_user = get_object_or_404(User, username=username)
-    profile = _get_or_create_profile(page_user)
-
-    badges = UserBadge.objects.select_related("badge").filter(user=page_user)
+    header = _get_profile_header(page_user)
+    profile = header["profile"]
+    badges = header["badges"]
+    current_sport_duration = header["current_sport_duration"]
 
     form = PostForm()
     image_form = PostImageForm()
 
-    current_sport_duration = timedelta(0)
-    if profile.current_sport:
-        user = UserSport.objects.filter(user=page_user, sport=profile.current_sport).first()
-    
-        if user and user.time_elapsed:
-            current_sport_duration = user.time_elapsed
-
     is_following = False
     if request.user.is_authenticated and request.user != page_user:
         is_following = Follow.objects.filter(follower=request.user, followee=page_user).exists()
@@ -101,8 +129,8 @@ def profile_detail(request, username: str):
         "is_following": is_following,
         "post_count": profile.post_count,
         "broadcast_count": profile.broadcast_count,
-        "followers_count": profile.followers_count,
-        "following_count": profile.following_count,
+        "followers_count": header["counts"]["followers_count"],
+        "following_count": header["counts"]["following_count"],
         "format_short_number": format_short_number,
         "format_hours_minutes": format_hours_minutes,
         "active_tab": active_tab,
@@ -130,10 +158,10 @@ def follow_toggle_ajax(request, username: str):
     else:
         following = True
 
-    try:
-        target.profile.refresh_from_db()
-        followers_count = target.profile.followers_count
-    except Profile.DoesNotExist:
+    counts = read_counters(Profile, target.pk, "followers_count")
+    if counts is not None:
+        followers_count = counts["followers_count"]
+    else:
         followers_count = Follow.objects.filter(followee=target).count()
 
     return JsonResponse({"following": following, "followers_count": followers_count})
@@ -159,7 +187,8 @@ def post_detail(request, username: str, pk):
     post = get_object_or_404(Post, pk=pk, user__username=username)
     is_owner = request.user.is_authenticated and request.user == post.user
 
-    more_posts = Post.objects.filter(user=post.user).exclude(pk=post.pk).order_by("-created_at")[:6]
+    more_posts = list(Post.objects.filter(user=post.user).exclude(pk=post.pk).order_by("-created_at")[:6])
+    add_pending([post, *more_posts], "likes_count", "comments_count")
 
     def image(p):
         return getattr(getattr(p, "image", None), "url", None) or getattr(p, "image_url", None) or getattr(p, "photo_url", None)
@@ -192,6 +221,10 @@ def post_update_ajax(request, pk):
         postingan.updated_at = timezone.now()
         update_fields.append("updated_at")
     postingan.save(update_fields=update_fields or None)
+    if "hashtags" in request.POST:
+        # Only the tags that were added or removed are relinked and recounted
+        set_post_hashtags(postingan, parse_hashtags(request.POST["hashtags"]))
+    index_post(postingan)
     return JsonResponse({"ok": True, "caption": caption})
 
 @csrf_exempt
@@ -201,6 +234,7 @@ def post_delete_ajax(request, pk):
     postingan = get_object_or_404(Post, pk=pk)
     if request.user != postingan.user:
         return JsonResponse({"detail": "Forbidden"}, status=403)
+    unindex_post(postingan.pk)
     postingan.delete()
     return JsonResponse({"ok": True})
 
@@ -226,28 +260,33 @@ def create_broadcast_ajax(request):
 
 @login_required
 def profile_detail_api(request, username):
-    profile = get_object_or_404(Profile, user__username=username)
+    page_user = get_object_or_404(User, username=username)
 
-    is_following = False
-    if request.user.is_authenticated and request.user != profile.user:
-        is_following = Follow.objects.filter(follower=request.user, followee=profile.user).exists()
+    def compute() -> dict:
+        profile = get_object_or_404(Profile.objects.select_related("current_sport"), user=page_user)
+        counts = read_counters(Profile, profile.pk, "followers_count", "following_count")
+        return {
+            "username": page_user.username,
+            "display_name": profile.display_name,
+            "bio": profile.bio,
+            "link": profile.link,
+            "avatar_url": profile.avatar_url.url if profile.avatar_url else None,
+            "current_sport": profile.current_sport.name if profile.current_sport else None,
+            "post_count": profile.post_count,
+            "broadcast_count": profile.broadcast_count,
+            "following_count": counts["following_count"],
+            "followers_count": counts["followers_count"],
+            "is_verified": profile.is_verified,
+            "created_at": profile.created_at.isoformat(),
+            "updated_at": profile.updated_at.isoformat(),
+        }
+
+    data = dict(get_or_set(f"profile:{page_user.pk}", ("api",), compute, PROFILE_CACHE_TIMEOUT))
 
-    data = {
-        "username": profile.user.username,
-        "display_name": profile.display_name,
-        "bio": profile.bio,
-        "link": profile.link,
-        "avatar_url": profile.avatar_url.url if profile.avatar_url else None,
-        "current_sport": profile.current_sport.name if profile.current_sport else None,
-        "post_count": profile.post_count,
-        "broadcast_count": profile.broadcast_count,
-        "following_count": profile.following_count,
-        "followers_count": profile.followers_count,
-        "is_verified": profile.is_verified,
-        "is_following": is_following,
-        "created_at": profile.created_at.isoformat(),
-        "updated_at": profile.updated_at.isoformat(),
-    }
+    is_following = False
+    if request.user.is_authenticated and request.user != page_user:
+        is_following = Follow.objects.filter(follower=request.user, followee=page_user).exists()
+    data["is_following"] = is_following
 
     return JsonResponse(data, status=200)
 
@@ -259,6 +298,7 @@ def user_posts_api(request, username):
         .order_by("-created_at")
         .prefetch_related("images")
     )
+    add_pending(posts, "likes_count", "comments_count")
 
     post_list = []
 
@@ -372,25 +412,22 @@ def update_profile(request):
 
     if avatar_file:
         try:
-            ext = avatar_file.name.split('.')[-1]
-            filename = f"avatar_{request.user.id}_{int(timezone.now().timestamp())}.{ext}"
-            avatar_file.name = filename 
-            
-            # Assign langsung
-            profile.avatar_url = avatar_file
-            
-        except Exception as e:
-            return JsonResponse({"status": "error", "message": f"Invalid avatar: {str(e)}"}, status=400)
+            validate_image(avatar_file)
+        except ValidationError as e:
+            return JsonResponse({"status": "error", "message": f"Invalid avatar: {e.messages[0]}"}, status=400)
 
     profile.updated_at = timezone.now()
     profile.save()
-    
-    profile.refresh_from_db()
+
+    if avatar_file:
+        # The old avatar stays until the upload is ready (avatar_status)
+        enqueue_upload(profile, "avatar_url", avatar_file)
 
     return JsonResponse({
         "status": "success",
         "username": request.user.username,
         "display_name": profile.display_name,
         "avatar_url": profile.avatar_url.url if profile.avatar_url else None,
+        "avatar_status": profile.avatar_url_status,
         "bio": profile.bio,
     })
\ No newline at end of file
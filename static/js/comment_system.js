@@ -23,41 +23,124 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    function createCommentEl(comment, postId) {
+        const commentEl = document.createElement('div');
+        commentEl.dataset.commentId = comment.id;
+        commentEl.innerHTML = `
+            <div class="flex items-start gap-2">
+                <div class="avatar">
+                    <div class="w-8 h-8 rounded-full overflow-hidden">
+                        ${createCommentAvatar(comment)}
+                    </div>
+                </div>
+                <div>
+                    <div class="bg-base-200 rounded-lg p-2">
+                        <p class="font-bold">${comment.author}</p>
+                        <p>${comment.text}</p>
+                    </div>
+                    <button type="button" class="reply-btn text-xs opacity-70 ml-2" data-post-id="${postId}" data-comment-id="${comment.parent_id || comment.id}" data-author="${comment.author}">Reply</button>
+                </div>
+            </div>
+        `;
+        if (!comment.parent_id) {
+            const repliesEl = document.createElement('div');
+            repliesEl.classList.add('replies', 'ml-10', 'mt-2', 'space-y-2');
+            (comment.replies || []).forEach(reply => repliesEl.appendChild(createCommentEl(reply, postId)));
+            commentEl.appendChild(repliesEl);
+
+            const hidden = (comment.reply_count || 0) - (comment.replies || []).length;
+            if (hidden > 0) {
+                commentEl.appendChild(createMoreButton('view-replies-btn', `View ${hidden} more replies`, { commentId: comment.id, postId: postId }));
+            }
+        }
+        return commentEl;
+    }
+
+    function createMoreButton(className, label, data) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.classList.add(className, 'text-xs', 'opacity-70', 'ml-10');
+        button.textContent = label;
+        Object.assign(button.dataset, data);
+        return button;
+    }
+
+    function loadComments(postId, cursor) {
+        const commentList = document.getElementById(`comment-list-${postId}`);
+        const params = new URLSearchParams({ post_id: postId });
+        if (cursor) params.set('cursor', cursor);
+
+        fetch(`/feeds/get_comments/?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'success') {
+                    if (!cursor) commentList.innerHTML = '';
+                    data.comments.forEach(comment => commentList.appendChild(createCommentEl(comment, postId)));
+                    if (data.next_cursor) {
+                        commentList.appendChild(createMoreButton('load-more-comments-btn', 'Load more comments', { postId: postId, cursor: data.next_cursor }));
+                    }
+                }
+            });
+    }
+
+    function loadReplies(button) {
+        const threadEl = button.closest('[data-comment-id]');
+        const repliesEl = threadEl.querySelector('.replies');
+        const params = new URLSearchParams();
+        if (button.dataset.cursor) params.set('cursor', button.dataset.cursor);
+
+        fetch(`/feeds/comments/${button.dataset.commentId}/replies/?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'success') {
+                    // The first page repeats the preview, so it replaces it
+                    if (!button.dataset.cursor) repliesEl.innerHTML = '';
+                    data.replies.forEach(reply => repliesEl.appendChild(createCommentEl(reply, button.dataset.postId)));
+                    if (data.next_cursor) {
+                        button.dataset.cursor = data.next_cursor;
+                        button.textContent = 'View more replies';
+                    } else {
+                        button.remove();
+                    }
+                }
+            });
+    }
+
     document.body.addEventListener('click', function(event) {
         const commentBtn = event.target.closest('.comment-btn');
         if (commentBtn) {
             const postId = commentBtn.dataset.postId;
             const commentSection = document.getElementById(`comment-section-${postId}`);
-            const commentList = document.getElementById(`comment-list-${postId}`);
 
             if (commentSection.classList.contains('hidden')) {
                 commentSection.classList.remove('hidden');
-                fetch(`/feeds/get_comments/?post_id=${postId}`)
-                    .then(response => response.json())
-                    .then(data => {
-                        if (data.status === 'success') {
-                            commentList.innerHTML = '';
-                            data.comments.forEach(comment => {
-                                const commentEl = document.createElement('div');
-                                commentEl.classList.add('flex', 'items-start', 'gap-2');
-                                commentEl.innerHTML = `
-                                    <div class="avatar">
-                                        <div class="w-8 h-8 rounded-full overflow-hidden">
-                                            ${createCommentAvatar(comment)}
-                                        </div>
-                                    </div>
-                                    <div class="bg-base-200 rounded-lg p-2">
-                                        <p class="font-bold">${comment.author}</p>
-                                        <p>${comment.text}</p>
-                                    </div>
-                                `;
-                                commentList.appendChild(commentEl);
-                            });
-                        }
-                    });
+                loadComments(postId);
             } else {
                 commentSection.classList.add('hidden');
             }
+            return;
+        }
+
+        const loadMoreBtn = event.target.closest('.load-more-comments-btn');
+        if (loadMoreBtn) {
+            loadMoreBtn.remove();
+            loadComments(loadMoreBtn.dataset.postId, loadMoreBtn.dataset.cursor);
+            return;
+        }
+
+        const viewRepliesBtn = event.target.closest('.view-replies-btn');
+        if (viewRepliesBtn) {
+            loadReplies(viewRepliesBtn);
+            return;
+        }
+
+        const replyBtn = event.target.closest('.reply-btn');
+        if (replyBtn) {
+            const form = document.querySelector(`.add-comment-form[data-post-id="${replyBtn.dataset.postId}"]`);
+            const input = form.querySelector('input[name="comment_text"]');
+            form.dataset.parentId = replyBtn.dataset.commentId;
+            input.placeholder = `Reply to ${replyBtn.dataset.author}...`;
+            input.focus();
         }
     });
 
@@ -66,6 +149,7 @@ document.addEventListener('DOMContentLoaded', function () {
         if (addCommentForm) {
             event.preventDefault();
             const postId = addCommentForm.dataset.postId;
+            const parentId = addCommentForm.dataset.parentId;
             const commentText = addCommentForm.querySelector('input[name="comment_text"]').value;
             const commentList = document.getElementById(`comment-list-${postId}`);
             const commentsCountSpan = document.querySelector(`.comment-btn[data-post-id="${postId}"] .comments-count`);
@@ -73,6 +157,7 @@ document.addEventListener('DOMContentLoaded', function () {
             const formData = new FormData();
             formData.append('post_id', postId);
             formData.append('comment_text', commentText);
+            if (parentId) formData.append('parent_id', parentId);
 
             fetch(`/feeds/add_comment/`, {
                 method: 'POST',
@@ -85,21 +170,11 @@ document.addEventListener('DOMContentLoaded', function () {
             .then(data => {
                 if (data.status === 'success') {
                     const comment = data.comment;
-                    const commentEl = document.createElement('div');
-                    commentEl.classList.add('flex', 'items-start', 'gap-2');
-                    commentEl.innerHTML = `
-                        <div class="avatar">
-                            <div class="w-8 h-8 rounded-full overflow-hidden">
-                                ${createCommentAvatar(comment)}
-                            </div>
-                        </div>
-                        <div class="bg-base-200 rounded-lg p-2">
-                            <p class="font-bold">${comment.author}</p>
-                            <p>${comment.text}</p>
-                        </div>
-                    `;
-                    commentList.appendChild(commentEl);
+                    const threadEl = comment.parent_id && commentList.querySelector(`[data-comment-id="${comment.parent_id}"] .replies`);
+                    (threadEl || commentList).appendChild(createCommentEl(comment, postId));
                     addCommentForm.reset();
+                    delete addCommentForm.dataset.parentId;
+                    addCommentForm.querySelector('input[name="comment_text"]').placeholder = 'Add a comment...';
                     commentsCountSpan.textContent = data.comments_count;
                 }
             });
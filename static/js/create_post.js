@@ -11,11 +11,28 @@
         finalFormTextarea.value = ''; 
       }
 
+      fillPostCoordinates();
+
       const modal = document.getElementById("post-modal");
       if (modal) {
         modal.showModal();
       }
     }
+
+    // Attach the device location (when the user allows it) so the post shows up in "near me"
+    function fillPostCoordinates() {
+      const latInput = document.querySelector('#post-form-final input[name="location_lat"]');
+      const lngInput = document.querySelector('#post-form-final input[name="location_lng"]');
+      if (!latInput || !lngInput || !navigator.geolocation) return;
+
+      navigator.geolocation.getCurrentPosition((position) => {
+        latInput.value = position.coords.latitude.toFixed(6);
+        lngInput.value = position.coords.longitude.toFixed(6);
+      }, () => {
+        latInput.value = '';
+        lngInput.value = '';
+      });
+    }
   
     const hashtagContainer = document.getElementById('hashtag-container');
     const hashtagInput = document.getElementById('hashtag-input');
@@ -2,19 +2,20 @@ document.addEventListener('DOMContentLoaded', function () {
     const loadMoreBtn = document.getElementById('load-more-btn');
     if (!loadMoreBtn) return;
 
-    let page = 1;
+    let cursor = loadMoreBtn.dataset.cursor;
     const postList = document.getElementById('post-list');
     const activeTab = new URLSearchParams(window.location.search).get('tab') || 'foryou';
     const loadMoreUrl = loadMoreBtn.dataset.url;
 
     loadMoreBtn.addEventListener('click', function () {
-        page++;
-        fetch(`${loadMoreUrl}?page=${page}&tab=${activeTab}`)
+        const params = new URLSearchParams({ cursor: cursor, tab: activeTab });
+        fetch(`${loadMoreUrl}?${params}`)
             .then(response => response.json())
             .then(data => {
                 if (data.html) {
                     postList.insertAdjacentHTML('beforeend', data.html);
                 }
+                cursor = data.next_cursor;
                 if (!data.has_next) {
                     loadMoreBtn.style.display = 'none';
                 }